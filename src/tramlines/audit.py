@@ -0,0 +1,346 @@
+"""
+Decision audit log.
+
+Every tool call that reaches the gateway gets one JSON Lines record: when it
+was made, by which session, to which tool, a digest of its arguments, the
+decision and the rule behind it, and how long the policy, the upstream and
+the whole call took. Calls only enqueue a tuple; a background thread turns
+records into JSON and writes them in batches, syncing them to disk according
+to the fsync policy.
+
+Each process writes its own rolling segments, `audit-<start ms>-<pid>.jsonl`,
+so worker processes never interleave their writes. When a segment is sealed,
+a sidecar `.idx` file lists which blocks of it hold each session, tool, rule
+and decision, and the time range of every block, so queries can read just
+those blocks instead of scanning the whole log.
+"""
+
+import asyncio
+import atexit
+import hashlib
+import json
+import os
+import queue
+import threading
+import time
+from pathlib import Path
+from typing import Any, BinaryIO, NamedTuple
+
+from tramlines.logger import logger
+from tramlines.response_cache import canonical_arguments
+
+DEFAULT_AUDIT_DIR = Path.home() / ".tramlines" / "audit"
+
+# How a call was decided, as recorded in the "decision" field
+DECISIONS = ("allow", "block", "result_block", "invalid", "error")
+
+# never: leave syncing to the OS; batch: fsync after every batch written;
+# interval: fsync at most once every fsync_interval seconds
+FSYNC_POLICIES = ("never", "batch", "interval")
+
+# What a call does when the queue is full: drop its record, or wait for room
+BACKPRESSURE_POLICIES = ("drop", "wait")
+
+# Most records written by one write() call
+_MAX_BATCH = 1000
+
+# Records are indexed by the block of about this many bytes they start in
+INDEX_BLOCK_SIZE = 64 * 1024
+
+# Record fields the segment index maps to blocks, by their JSON names
+INDEXED_FIELDS = ("session", "tool", "rule", "decision")
+
+_STOP = object()
+
+
+class AuditRecord(NamedTuple):
+    """The decision on one tool call, as queued for writing."""
+
+    timestamp: float
+    session_id: str
+    tool: str
+    arguments: dict[str, Any]
+    decision: str
+    rule: str | None = None
+    duration_ms: float | None = None
+    policy_ms: float | None = None
+    upstream_ms: float | None = None
+
+
+def arguments_digest(arguments: dict[str, Any]) -> str:
+    """A short digest identifying a call's arguments without recording them."""
+    return hashlib.sha256(canonical_arguments(arguments).encode()).hexdigest()[:16]
+
+
+def encode_record(record: AuditRecord) -> bytes:
+    """One compact JSON line; fields without a value are left out."""
+    fields = {
+        "ts": round(record.timestamp, 6),
+        "session": record.session_id,
+        "tool": record.tool,
+        "args": arguments_digest(record.arguments),
+        "decision": record.decision,
+        "rule": record.rule,
+        "ms": record.duration_ms,
+        "policy_ms": record.policy_ms,
+        "upstream_ms": record.upstream_ms,
+    }
+    line = {key: value for key, value in fields.items() if value is not None}
+    return json.dumps(line, separators=(",", ":")).encode() + b"\n"
+
+
+class SegmentIndex:
+    """
+    The sidecar index of one audit segment.
+
+    `blocks` holds [start offset, end offset, first ts, last ts] of each
+    block of records; `keys` maps each indexed field to the blocks that hold
+    each of its values.
+    """
+
+    def __init__(self, block_size: int = INDEX_BLOCK_SIZE):
+        self.block_size = block_size
+        self.records = 0
+        self.blocks: list[list[float]] = []
+        self.keys: dict[str, dict[str, list[int]]] = {
+            field: {} for field in INDEXED_FIELDS
+        }
+
+    def add(self, offset: int, length: int, record: AuditRecord) -> None:
+        """Index a record written at offset."""
+        block = self.blocks[-1] if self.blocks else None
+        if block is None or block[1] - block[0] >= self.block_size:
+            block = [offset, offset, record.timestamp, record.timestamp]
+            self.blocks.append(block)
+        block[1] = offset + length
+        block[2] = min(block[2], record.timestamp)
+        block[3] = max(block[3], record.timestamp)
+        number = len(self.blocks) - 1
+        values = (record.session_id, record.tool, record.rule, record.decision)
+        for field, value in zip(INDEXED_FIELDS, values):
+            if value is None:
+                continue
+            blocks = self.keys[field].setdefault(value, [])
+            if not blocks or blocks[-1] != number:
+                blocks.append(number)
+        self.records += 1
+
+    def save(self, path: Path) -> None:
+        """Write the index next to its segment, replacing any older one."""
+        temporary = path.with_suffix(".tmp")
+        temporary.write_text(
+            json.dumps(
+                {"records": self.records, "blocks": self.blocks, "keys": self.keys},
+                separators=(",", ":"),
+            )
+        )
+        os.replace(temporary, path)
+
+    @classmethod
+    def load(cls, path: Path) -> "SegmentIndex":
+        data = json.loads(path.read_text())
+        index = cls()
+        index.records = data["records"]
+        index.blocks = data["blocks"]
+        index.keys = data["keys"]
+        return index
+
+
+class AuditLog:
+    """
+    Appends audit records to segments in `directory` from a background thread.
+
+    A segment is sealed and indexed once it reaches `segment_bytes` or has
+    been open for `segment_seconds`, and when the log is closed. At most
+    `max_queued` records wait to be written; beyond that, calls either drop
+    their record or wait for room, per `backpressure`.
+    """
+
+    def __init__(
+        self,
+        directory: Path = DEFAULT_AUDIT_DIR,
+        fsync: str = "batch",
+        fsync_interval: float = 1.0,
+        max_queued: int = 10_000,
+        backpressure: str = "drop",
+        segment_bytes: int = 64 * 1024 * 1024,
+        segment_seconds: float = 3600.0,
+    ):
+        if fsync not in FSYNC_POLICIES:
+            raise ValueError(f"Fsync policy must be one of {FSYNC_POLICIES}")
+        if backpressure not in BACKPRESSURE_POLICIES:
+            raise ValueError(
+                f"Backpressure policy must be one of {BACKPRESSURE_POLICIES}"
+            )
+        self.directory = Path(directory)
+        self.segment_bytes = segment_bytes
+        self.segment_seconds = segment_seconds
+        self.fsync = fsync
+        self.fsync_interval = fsync_interval
+        self.backpressure = backpressure
+        self._queue: queue.Queue = queue.Queue(maxsize=max_queued)
+        self._thread: threading.Thread | None = None
+        self._lock = threading.Lock()
+        self._exit_hook = False
+        self._last_sync = 0.0
+        self._unsynced = False
+        # Writer thread state for the open segment
+        self.segment: Path | None = None
+        self._file: BinaryIO | None = None
+        self._index = SegmentIndex()
+        self._opened_at = 0.0
+        self.written = 0
+        self.dropped = 0
+        self.waits = 0
+        self.batches = 0
+
+    async def record(self, record: AuditRecord) -> None:
+        """Queue a record for writing, applying backpressure if the queue is full."""
+        if self._thread is None or not self._thread.is_alive():
+            self._start()
+        try:
+            self._queue.put_nowait(record)
+            return
+        except queue.Full:
+            if self.backpressure == "drop":
+                self.dropped += 1
+                return
+        self.waits += 1
+        while True:
+            await asyncio.sleep(0.001)
+            try:
+                self._queue.put_nowait(record)
+                return
+            except queue.Full:
+                continue
+
+    def flush(self, timeout: float = 5.0) -> None:
+        """Wait until every record queued so far has been written."""
+        if self._thread is None or not self._thread.is_alive():
+            return
+        done = threading.Event()
+        self._queue.put(done)
+        done.wait(timeout)
+
+    def close(self, timeout: float = 5.0) -> None:
+        """Write out queued records and stop the writer thread."""
+        thread = self._thread
+        if thread is None or not thread.is_alive():
+            return
+        self._queue.put(_STOP)
+        thread.join(timeout)
+
+    def stats(self) -> dict:
+        """Get audit log statistics."""
+        return {
+            "queued": self._queue.qsize(),
+            "written": self.written,
+            "dropped": self.dropped,
+            "waits": self.waits,
+            "batches": self.batches,
+            "segment": str(self.segment) if self.segment else None,
+        }
+
+    # ---------------------------------------------------------------------
+    # Writer thread
+    # ---------------------------------------------------------------------
+
+    def _start(self) -> None:
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._thread = threading.Thread(
+                target=self._run, name="tramlines-audit-writer", daemon=True
+            )
+            self._thread.start()
+            if not self._exit_hook:
+                atexit.register(self.close)
+                self._exit_hook = True
+
+    def _run(self) -> None:
+        self.directory.mkdir(mode=0o700, parents=True, exist_ok=True)
+        while True:
+            try:
+                # With interval syncing, wake up to sync the last records
+                # even if no more arrive
+                batch = [self._queue.get(timeout=self._sync_timeout())]
+            except queue.Empty:
+                self._sync()
+                continue
+            while len(batch) < _MAX_BATCH:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            records = [item for item in batch if isinstance(item, AuditRecord)]
+            try:
+                if records:
+                    self._write_batch(records)
+                if any(item is _STOP for item in batch):
+                    self._seal()
+            except Exception as e:
+                logger.error(f"AUDIT_ERROR | Failed to write audit records: {e}")
+            for item in batch:
+                if isinstance(item, threading.Event):
+                    item.set()
+            if any(item is _STOP for item in batch):
+                return
+
+    def _open_segment(self) -> None:
+        now = time.time()
+        started = int(now * 1000)
+        # Segment names sort by start time; never reopen a sealed segment
+        while (self.directory / f"audit-{started}-{os.getpid()}.jsonl").exists():
+            started += 1
+        self.segment = self.directory / f"audit-{started}-{os.getpid()}.jsonl"
+        fd = os.open(self.segment, os.O_WRONLY | os.O_CREAT | os.O_APPEND, 0o600)
+        self._file = open(fd, "ab")
+        self._index = SegmentIndex()
+        self._opened_at = now
+
+    def _seal(self) -> None:
+        """Close the open segment and write its index."""
+        if self._file is None or self.segment is None:
+            return
+        self._sync()
+        self._file.close()
+        self._file = None
+        self._index.save(self.segment.with_suffix(".idx"))
+
+    def _sync_timeout(self) -> float | None:
+        if self.fsync == "interval" and self._unsynced:
+            return self.fsync_interval
+        return None
+
+    def _sync(self) -> None:
+        if self._file is not None and self._unsynced and self.fsync != "never":
+            os.fsync(self._file.fileno())
+            self._last_sync = time.monotonic()
+        self._unsynced = False
+
+    def _write_batch(self, records: list[AuditRecord]) -> None:
+        if self._file is None:
+            self._open_segment()
+        assert self._file is not None
+        offset = self._file.tell()
+        lines = []
+        for record in records:
+            line = encode_record(record)
+            self._index.add(offset, len(line), record)
+            offset += len(line)
+            lines.append(line)
+        self._file.write(b"".join(lines))
+        self._file.flush()
+        self._unsynced = True
+        if self.fsync == "batch" or (
+            self.fsync == "interval"
+            and time.monotonic() - self._last_sync >= self.fsync_interval
+        ):
+            self._sync()
+        self.written += len(records)
+        self.batches += 1
+        if (
+            offset >= self.segment_bytes
+            or time.time() - self._opened_at >= self.segment_seconds
+        ):
+            self._seal()
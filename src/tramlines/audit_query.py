@@ -0,0 +1,236 @@
+"""
+Queries over the decision audit log.
+
+Sealed segments are read through their sidecar index: only the blocks that
+hold every requested session, tool, rule and decision, and that overlap the
+requested time range, are read from the memory-mapped segment and parsed.
+Segments without an index yet, such as the one a running gateway is writing,
+are scanned, skipping lines that cannot match before parsing them.
+"""
+
+import argparse
+import json
+import mmap
+import re
+import sys
+import time
+from collections import Counter
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Iterator
+
+from tramlines.audit import (
+    DECISIONS,
+    DEFAULT_AUDIT_DIR,
+    INDEXED_FIELDS,
+    SegmentIndex,
+)
+
+_RELATIVE_TIME = re.compile(r"^(\d+(?:\.\d+)?)([smhdw])$")
+_UNIT_SECONDS = {"s": 1, "m": 60, "h": 3600, "d": 86400, "w": 7 * 86400}
+
+
+def parse_time(value: str, now: float | None = None) -> float:
+    """Parse epoch seconds, an ISO 8601 time, or an age such as 7d or 12h."""
+    match = _RELATIVE_TIME.match(value)
+    if match:
+        age = float(match.group(1)) * _UNIT_SECONDS[match.group(2)]
+        return (time.time() if now is None else now) - age
+    try:
+        return float(value)
+    except ValueError:
+        pass
+    try:
+        return datetime.fromisoformat(value).timestamp()
+    except ValueError:
+        raise ValueError(
+            f"Invalid time '{value}', expected epoch seconds, ISO 8601 or an "
+            "age such as 30m, 12h or 7d"
+        ) from None
+
+
+def segments(directory: Path) -> list[Path]:
+    """The audit segments in a directory, oldest first."""
+
+    def started(path: Path) -> int:
+        return int(path.stem.split("-")[1])
+
+    return sorted(directory.glob("audit-*.jsonl"), key=started)
+
+
+def _candidate_blocks(
+    index: SegmentIndex,
+    filters: dict[str, str],
+    since: float | None,
+    until: float | None,
+) -> list[list[float]]:
+    numbers: set[int] | None = None
+    for field, value in filters.items():
+        blocks = set(index.keys[field].get(value, ()))
+        numbers = blocks if numbers is None else numbers & blocks
+        if not numbers:
+            return []
+    candidates = range(len(index.blocks)) if numbers is None else sorted(numbers)
+    return [
+        index.blocks[number]
+        for number in candidates
+        if (since is None or index.blocks[number][3] >= since)
+        and (until is None or index.blocks[number][2] <= until)
+    ]
+
+
+def _matches(
+    record: dict, filters: dict[str, str], since: float | None, until: float | None
+) -> bool:
+    if any(record.get(field) != value for field, value in filters.items()):
+        return False
+    timestamp = record["ts"]
+    return (since is None or timestamp >= since) and (
+        until is None or timestamp <= until
+    )
+
+
+def query(
+    directory: Path = DEFAULT_AUDIT_DIR,
+    session: str | None = None,
+    tool: str | None = None,
+    rule: str | None = None,
+    decision: str | None = None,
+    since: float | None = None,
+    until: float | None = None,
+) -> Iterator[dict[str, Any]]:
+    """Yield matching audit records, oldest segment first."""
+    values = (session, tool, rule, decision)
+    filters = {
+        field: value
+        for field, value in zip(INDEXED_FIELDS, values)
+        if value is not None
+    }
+    # Fragments every matching line must contain, to skip the rest unparsed
+    needles = [
+        f'"{field}":{json.dumps(value)}'.encode() for field, value in filters.items()
+    ]
+
+    for segment in segments(Path(directory)):
+        index_path = segment.with_suffix(".idx")
+        with segment.open("rb") as file:
+            try:
+                mapped = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+            except ValueError:
+                # Empty segment
+                continue
+            with mapped:
+                if index_path.exists():
+                    ranges = [
+                        (int(block[0]), int(block[1]))
+                        for block in _candidate_blocks(
+                            SegmentIndex.load(index_path), filters, since, until
+                        )
+                    ]
+                else:
+                    ranges = [(0, len(mapped))]
+                for start, end in ranges:
+                    for line in _lines(mapped, start, end, needles):
+                        try:
+                            record = json.loads(line)
+                        except ValueError:
+                            # A line cut short by a crash
+                            continue
+                        if _matches(record, filters, since, until):
+                            yield record
+
+
+def _lines(
+    mapped: mmap.mmap, start: int, end: int, needles: list[bytes]
+) -> Iterator[bytes]:
+    """
+    Yield the lines between start and end that contain every needle.
+
+    With needles, searching for the first one skips straight to the lines
+    that may match, so only those are copied out of the mapping.
+    """
+    position = start
+    while position < end:
+        if needles:
+            found = mapped.find(needles[0], position, end)
+            if found < 0:
+                return
+            line_start = mapped.rfind(b"\n", position, found) + 1 or position
+        else:
+            found = line_start = position
+        line_end = mapped.find(b"\n", found, end)
+        if line_end < 0:
+            line_end = end
+        line = mapped[line_start:line_end]
+        if all(needle in line for needle in needles[1:]):
+            yield line
+        position = line_end + 1
+
+
+def main(argv: list[str] | None = None) -> None:
+    """CLI entrypoint for `tl audit query`."""
+    parser = argparse.ArgumentParser(
+        prog="tl audit", description="Query the Tramlines decision audit log"
+    )
+    commands = parser.add_subparsers(dest="command", required=True)
+    query_parser = commands.add_parser("query", help="Find or count audit records")
+    query_parser.add_argument(
+        "--dir",
+        type=Path,
+        default=DEFAULT_AUDIT_DIR,
+        help="Audit log directory (default: %(default)s)",
+    )
+    query_parser.add_argument("--session", help="Only calls from this session")
+    query_parser.add_argument("--tool", help="Only calls to this tool")
+    query_parser.add_argument("--rule", help="Only calls decided by this rule")
+    query_parser.add_argument(
+        "--decision",
+        choices=DECISIONS,
+        help="Only calls with this decision",
+    )
+    query_parser.add_argument(
+        "--since", help="Only calls at or after this time (epoch, ISO 8601 or 7d)"
+    )
+    query_parser.add_argument(
+        "--until", help="Only calls at or before this time (epoch, ISO 8601 or 7d)"
+    )
+    query_parser.add_argument(
+        "--count", action="store_true", help="Print the number of matching calls"
+    )
+    query_parser.add_argument(
+        "--group-by",
+        choices=INDEXED_FIELDS,
+        help="Print the number of matching calls for each value of a field",
+    )
+    query_parser.add_argument(
+        "--limit", type=int, default=None, help="Print at most this many records"
+    )
+    args = parser.parse_args(argv)
+
+    try:
+        since = parse_time(args.since) if args.since else None
+        until = parse_time(args.until) if args.until else None
+    except ValueError as e:
+        print(f"❌ {e}", file=sys.stderr)
+        sys.exit(1)
+
+    records = query(
+        args.dir,
+        session=args.session,
+        tool=args.tool,
+        rule=args.rule,
+        decision=args.decision,
+        since=since,
+        until=until,
+    )
+    if args.group_by:
+        counts = Counter(record.get(args.group_by) for record in records)
+        for value, count in counts.most_common():
+            print(f"{count}\t{value}")
+    elif args.count:
+        print(sum(1 for _ in records))
+    else:
+        for number, record in enumerate(records):
+            if args.limit is not None and number >= args.limit:
+                break
+            print(json.dumps(record, separators=(",", ":")))
@@ -13,10 +13,28 @@ import sys
 from pathlib import Path
 from typing import Any
 
+from tramlines import audit_query, tracing
+from tramlines.audit import (
+    BACKPRESSURE_POLICIES,
+    DEFAULT_AUDIT_DIR,
+    FSYNC_POLICIES,
+    AuditLog,
+)
+from tramlines.daemon import DEFAULT_SOCKET_PATH, run_daemon
 from tramlines.guardrail.dsl.evaluator import load_policy_from_file
 from tramlines.guardrail.dsl.types import Policy
-from tramlines.logger import logger
+from tramlines.logger import LEVELS, logger
+from tramlines.metrics import (
+    SESSION_STORE_GAUGES,
+    export_metrics_file,
+    serve_metrics,
+)
 from tramlines.proxy import create_guarded_proxy
+from tramlines.response_cache import SCOPES, ResponseCache
+from tramlines.result_limits import DEFAULT_SPILL_DIR, OVERFLOW_MODES, ResultLimiter
+from tramlines.session_store import SqliteSessionStore
+from tramlines.tracing import DEFAULT_TRACE_PATH, FileSpanExporter, Tracer
+from tramlines.workers import serve_with_workers
 
 POLICY_DIR = Path(__file__).parent / "guardrail" / "policies"
 
@@ -124,6 +142,8 @@ def _combine_policies(
 ) -> Policy | None:
     """Load policies from path and names, then combine them into a single policy."""
     all_rules = []
+    scan_fields: list[str] = []
+    skip_fields: list[str] = []
     loaded_policy_names = []
 
     # 1. Load from --policy-path
@@ -131,6 +151,8 @@ def _combine_policies(
         try:
             custom_policy = load_policy_from_file(custom_policy_path)
             all_rules.extend(custom_policy.rules)
+            scan_fields.extend(custom_policy.scan_fields)
+            skip_fields.extend(custom_policy.skip_fields)
             loaded_policy_names.append(f"Custom ({custom_policy.name})")
         except Exception as e:
             logger.error(
@@ -143,6 +165,8 @@ def _combine_policies(
         if name in available_policies:
             policy = available_policies[name]
             all_rules.extend(policy.rules)
+            scan_fields.extend(policy.scan_fields)
+            skip_fields.extend(policy.skip_fields)
             loaded_policy_names.append(policy.name)
         else:
             logger.warning(
@@ -158,6 +182,8 @@ def _combine_policies(
         name="Combined Guardrail Policy",
         description="A combination of all enabled guardrail policies.",
         rules=all_rules,
+        scan_fields=scan_fields,
+        skip_fields=skip_fields,
     )
 
     logger.info(
@@ -169,6 +195,38 @@ def _combine_policies(
     return final_policy
 
 
+def _parse_cache_ttls(entries: list[str], default_ttl: float) -> dict[str, float]:
+    """Parse `name` or `name=ttl` entries into a name -> TTL map."""
+    ttls = {}
+    for entry in entries:
+        name, _, ttl = entry.partition("=")
+        try:
+            ttls[name] = float(ttl) if ttl else default_ttl
+        except ValueError:
+            print(
+                f"❌ Invalid cache TTL in '{entry}', expected NAME=SECONDS",
+                file=sys.stderr,
+            )
+            sys.exit(1)
+    return ttls
+
+
+def _parse_result_limits(entries: list[str]) -> dict[str, int]:
+    """Parse `name=size` entries into a name -> size cap map."""
+    limits = {}
+    for entry in entries:
+        name, _, size = entry.partition("=")
+        try:
+            limits[name] = int(size)
+        except ValueError:
+            print(
+                f"❌ Invalid result size limit in '{entry}', expected TOOL=CHARACTERS",
+                file=sys.stderr,
+            )
+            sys.exit(1)
+    return limits
+
+
 def _list_policies(available_policies: dict[str, Policy]) -> None:
     """Prints a formatted list of available policies and exits."""
     print("\nAvailable Guardrail Policies:")
@@ -185,13 +243,23 @@ def _list_policies(available_policies: dict[str, Policy]) -> None:
     sys.exit(0)
 
 
-def app() -> None:  # pragma: no cover
+# Seconds the HTTP transport waits for open connections to finish on shutdown
+GRACEFUL_SHUTDOWN_SECONDS = 30
+
+
+def app(argv: list[str] | None = None) -> None:  # pragma: no cover
     """CLI entrypoint for running the Tramlines proxy server."""
+    if argv is None:
+        argv = sys.argv[1:]
+    if argv[:1] == ["audit"]:
+        audit_query.main(argv[1:])
+        return
 
     available_policies = _discover_policies()
 
     parser = argparse.ArgumentParser(
-        description="Tramlines MCP Proxy (GuardedFastMCPProxy)"
+        description="Tramlines MCP Proxy (GuardedFastMCPProxy)",
+        epilog="Run `tl audit query --help` to search the decision audit log.",
     )
     parser.add_argument(
         "--config-path",
@@ -221,7 +289,255 @@ def app() -> None:  # pragma: no cover
         default=[],
         help="List of tool names to disable at discovery",
     )
-    args = parser.parse_args()
+    parser.add_argument(
+        "--session-db",
+        type=str,
+        default="",
+        help="Path to a SQLite database for sharing session histories across "
+        "gateway processes (default: keep histories in this process)",
+    )
+    parser.add_argument(
+        "--upstream-pool-size",
+        type=int,
+        default=1,
+        help="Persistent sessions to keep open to each upstream MCP server",
+    )
+    parser.add_argument(
+        "--upstream-spares",
+        type=int,
+        default=0,
+        help="Initialized standby sessions per upstream server, used to replace "
+        "a crashed session without a cold start",
+    )
+    parser.add_argument(
+        "--upstream-timeout",
+        type=float,
+        default=30.0,
+        help="Seconds allowed for each upstream server to start and connect",
+    )
+    parser.add_argument(
+        "--upstream-ready-timeout",
+        type=float,
+        default=10.0,
+        help="Longest wait for upstream servers before accepting clients; "
+        "slower servers keep starting in the background",
+    )
+    parser.add_argument(
+        "--lazy-upstreams",
+        action="store_true",
+        help="Start each upstream server only when one of its tools is called, "
+        "answering tool listings from the cached catalogue until then",
+    )
+    parser.add_argument(
+        "--upstream-idle-timeout",
+        type=float,
+        default=None,
+        help="Stop upstream servers that have served no request for this many "
+        "seconds (default: keep them running)",
+    )
+    parser.add_argument(
+        "--discovery-ttl",
+        type=float,
+        default=300.0,
+        help="Seconds to serve tools/resources/prompts listings from memory; "
+        "upstream list-change notifications refresh them sooner (0 disables)",
+    )
+    parser.add_argument(
+        "--no-argument-validation",
+        dest="validate_arguments",
+        action="store_false",
+        help="Forward tool arguments without checking them against the tool's "
+        "inputSchema first",
+    )
+    parser.add_argument(
+        "--cache-tools",
+        nargs="*",
+        default=[],
+        metavar="TOOL[=TTL]",
+        help="Cache results of these side-effect-free tools",
+    )
+    parser.add_argument(
+        "--cache-servers",
+        nargs="*",
+        default=[],
+        metavar="SERVER[=TTL]",
+        help="Cache results of the tools these servers annotate as read-only",
+    )
+    parser.add_argument(
+        "--cache-ttl",
+        type=float,
+        default=30.0,
+        help="Default seconds to keep a cached tool result (default: 30)",
+    )
+    parser.add_argument(
+        "--cache-size",
+        type=int,
+        default=1024,
+        help="Most tool results to keep cached (default: 1024)",
+    )
+    parser.add_argument(
+        "--cache-scope",
+        choices=SCOPES,
+        default="session",
+        help="Share cached results within one session or across all sessions",
+    )
+    parser.add_argument(
+        "--coalesce-tools",
+        nargs="*",
+        default=[],
+        metavar="TOOL",
+        help="Share one upstream execution between identical concurrent calls "
+        "to these tools, in addition to those annotated idempotent or read-only",
+    )
+    parser.add_argument(
+        "--no-coalescing",
+        dest="coalesce",
+        action="store_false",
+        help="Send every tool call upstream, even identical concurrent ones",
+    )
+    parser.add_argument(
+        "--max-result-size",
+        type=int,
+        default=None,
+        metavar="CHARACTERS",
+        help="Largest tool result to forward whole (default: unlimited)",
+    )
+    parser.add_argument(
+        "--result-size-limits",
+        nargs="*",
+        default=[],
+        metavar="TOOL=CHARACTERS",
+        help="Per-tool result size caps, overriding --max-result-size "
+        "(0 leaves a tool unlimited)",
+    )
+    parser.add_argument(
+        "--result-overflow",
+        choices=OVERFLOW_MODES,
+        default="truncate",
+        help="Drop the part of a result over its cap, or spill it to a file "
+        "on this host for local clients (stdio or --daemon only)",
+    )
+    parser.add_argument(
+        "--spill-dir",
+        type=str,
+        default=str(DEFAULT_SPILL_DIR),
+        help="Directory for spilled results (default: %(default)s)",
+    )
+    parser.add_argument(
+        "--audit-log",
+        nargs="?",
+        const=str(DEFAULT_AUDIT_DIR),
+        default=None,
+        metavar="DIR",
+        help="Write a JSON Lines record of every tool call decision, in indexed "
+        f"segments queried with `tl audit query` (default: {DEFAULT_AUDIT_DIR})",
+    )
+    parser.add_argument(
+        "--audit-fsync",
+        choices=FSYNC_POLICIES,
+        default="batch",
+        help="When audit records are synced to disk: never, after every batch "
+        "written, or at most once a second (default: batch)",
+    )
+    parser.add_argument(
+        "--audit-backpressure",
+        choices=BACKPRESSURE_POLICIES,
+        default="drop",
+        help="Whether calls drop their audit record or wait when the audit "
+        "queue is full (default: drop)",
+    )
+    parser.add_argument(
+        "--transport",
+        choices=["stdio", "http"],
+        default="stdio",
+        help="Serve MCP over stdio (one client) or streamable HTTP",
+    )
+    parser.add_argument(
+        "--host", type=str, default="127.0.0.1", help="HTTP transport bind address"
+    )
+    parser.add_argument("--port", type=int, default=8000, help="HTTP transport port")
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=1,
+        help="Number of HTTP worker processes; MCP sessions stay pinned to one worker",
+    )
+    parser.add_argument(
+        "--daemon",
+        action="store_true",
+        help="Run as a shared local daemon that stdio clients attach to with "
+        "tl-connect",
+    )
+    parser.add_argument(
+        "--socket",
+        type=str,
+        # Same default as tl-connect, so the two meet on the same socket
+        default=os.environ.get("TRAMLINES_SOCKET", str(DEFAULT_SOCKET_PATH)),
+        help="Unix socket path for --daemon "
+        f"(default: $TRAMLINES_SOCKET or {DEFAULT_SOCKET_PATH})",
+    )
+    parser.add_argument(
+        "--metrics-port",
+        type=int,
+        default=None,
+        help="Serve Prometheus metrics at http://127.0.0.1:PORT/metrics",
+    )
+    parser.add_argument(
+        "--metrics-file",
+        type=str,
+        default=None,
+        metavar="PATH",
+        help="Rewrite Prometheus metrics to this file every 15 seconds; "
+        "{pid} in the path is replaced by the process ID",
+    )
+    parser.add_argument(
+        "--trace-file",
+        type=str,
+        nargs="?",
+        const=str(DEFAULT_TRACE_PATH),
+        default=None,
+        metavar="PATH",
+        help="Trace tool calls, appending them to this file as OTLP/JSON "
+        "(default path: %(const)s); {pid} in the path is replaced by the "
+        "process ID",
+    )
+    parser.add_argument(
+        "--trace-sample-ratio",
+        type=float,
+        default=1.0,
+        help="Fraction of tool calls to trace, unless the client's traceparent "
+        "decides (default: 1.0)",
+    )
+    parser.add_argument(
+        "--log-level",
+        choices=list(LEVELS),
+        default=None,
+        help="Least severe log lines to write (default: $TRAMLINES_LOG_LEVEL or INFO)",
+    )
+    parser.add_argument(
+        "--log-max-size",
+        type=int,
+        default=10,
+        metavar="MB",
+        help="Rotate the log file once it reaches this size (default: 10)",
+    )
+    parser.add_argument(
+        "--log-backups",
+        type=int,
+        default=5,
+        help="Compressed rotated log files to keep (default: 5)",
+    )
+    args = parser.parse_args(argv)
+    if args.result_overflow == "spill" and args.transport == "http" and not args.daemon:
+        # Spill notes name a path on this host, which remote clients cannot read
+        parser.error("--result-overflow spill needs a local client: stdio or --daemon")
+    if not 0.0 <= args.trace_sample_ratio <= 1.0:
+        parser.error("--trace-sample-ratio must be between 0 and 1")
+    logger.configure(
+        level=args.log_level,
+        max_bytes=args.log_max_size * 1024 * 1024,
+        backups=args.log_backups,
+    )
 
     if args.list_policies:
         _list_policies(available_policies)
@@ -230,6 +546,25 @@ def app() -> None:  # pragma: no cover
     mcp_config = _load_mcp_config(args.config_path)
     logger.info(f"CONFIG_LOADED | MCP Config: {mcp_config}")
 
+    if args.transport == "http" and args.workers > 1:
+        print(
+            f"🚀 Tramlines Proxy starting {args.workers} workers on "
+            f"http://{args.host}:{args.port}",
+            file=sys.stderr,
+        )
+        serve_with_workers(
+            app,
+            argv,
+            host=args.host,
+            port=args.port,
+            workers=args.workers,
+            graceful_timeout=GRACEFUL_SHUTDOWN_SECONDS,
+            metrics_port=args.metrics_port,
+            # Every worker reads the whole shared session database
+            shared_metrics=SESSION_STORE_GAUGES if args.session_db else (),
+        )
+        return
+
     # Show disabled tools info
     if args.disable_tools:
         print(
@@ -244,11 +579,83 @@ def app() -> None:  # pragma: no cover
         available_policies=available_policies,
     )
 
+    session_store = SqliteSessionStore(args.session_db) if args.session_db else None
+
+    response_cache = None
+    if args.cache_tools or args.cache_servers:
+        response_cache = ResponseCache(
+            tools=_parse_cache_ttls(args.cache_tools, args.cache_ttl),
+            servers=_parse_cache_ttls(args.cache_servers, args.cache_ttl),
+            max_entries=args.cache_size,
+            scope=args.cache_scope,
+        )
+
+    result_limiter = None
+    if args.max_result_size or args.result_size_limits:
+        result_limiter = ResultLimiter(
+            max_size=args.max_result_size,
+            tools=_parse_result_limits(args.result_size_limits),
+            overflow=args.result_overflow,
+            spill_dir=Path(args.spill_dir),
+        )
+
+    audit_log = None
+    if args.audit_log:
+        audit_log = AuditLog(
+            Path(args.audit_log),
+            fsync=args.audit_fsync,
+            backpressure=args.audit_backpressure,
+        )
+
     # Create the guarded proxy directly
     proxy = create_guarded_proxy(
-        mcp_config=mcp_config, policy=policy, disabled_tools=args.disable_tools
+        mcp_config=mcp_config,
+        policy=policy,
+        disabled_tools=args.disable_tools,
+        session_store=session_store,
+        upstream_pool_size=args.upstream_pool_size,
+        upstream_spares=args.upstream_spares,
+        upstream_timeout=args.upstream_timeout,
+        upstream_ready_timeout=args.upstream_ready_timeout,
+        lazy_upstreams=args.lazy_upstreams,
+        upstream_idle_timeout=args.upstream_idle_timeout,
+        discovery_ttl=args.discovery_ttl,
+        validate_arguments=args.validate_arguments,
+        response_cache=response_cache,
+        coalesce=args.coalesce,
+        coalesce_tools=args.coalesce_tools,
+        result_limiter=result_limiter,
+        audit_log=audit_log,
     )
 
+    if args.metrics_port is not None:
+        try:
+            serve_metrics(args.metrics_port)
+        except OSError as e:
+            logger.warning(
+                f"METRICS_ERROR | Cannot serve metrics on port {args.metrics_port}: {e}"
+            )
+    if args.metrics_file:
+        export_metrics_file(Path(args.metrics_file.format(pid=os.getpid())))
+    if args.trace_file:
+        exporter = FileSpanExporter(Path(args.trace_file.format(pid=os.getpid())))
+        tracing.configure(Tracer(exporter, sample_ratio=args.trace_sample_ratio))
+        logger.info(
+            f"TRACE_INIT | {exporter.path} | sample ratio {args.trace_sample_ratio}"
+        )
+
     print("🚀 Tramlines Proxy Ready", file=sys.stderr)
-    print("   Transport: stdio", file=sys.stderr)
-    proxy.run(transport="stdio")
+    if args.daemon:
+        print(f"   Transport: daemon on {args.socket}", file=sys.stderr)
+        run_daemon(proxy, args.socket)
+    elif args.transport == "http":
+        print(f"   Transport: http://{args.host}:{args.port}", file=sys.stderr)
+        proxy.run(
+            transport="streamable-http",
+            host=args.host,
+            port=args.port,
+            uvicorn_config={"timeout_graceful_shutdown": GRACEFUL_SHUTDOWN_SECONDS},
+        )
+    else:
+        print("   Transport: stdio", file=sys.stderr)
+        proxy.run(transport="stdio")
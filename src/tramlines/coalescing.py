@@ -0,0 +1,87 @@
+"""
+Request coalescing for identical in-flight tool calls.
+
+When the same idempotent tool is called with the same arguments while an
+earlier call is still running, the later callers wait for that call instead
+of sending their own, and every caller receives its result. Only the upstream
+execution is shared: each call still passes through the guardrails and is
+recorded in its own session's history.
+"""
+
+import asyncio
+from typing import Any, Awaitable, Callable, Iterable
+
+from tramlines.response_cache import canonical_arguments
+from tramlines.schema import tool_key
+
+
+class RequestCoalescer:
+    """
+    Shares one upstream execution between identical concurrent tool calls.
+
+    Tools are coalesced if named in `tools`, or if their listing annotations
+    declare them idempotent or read-only.
+    """
+
+    def __init__(self, tools: Iterable[str] = ()):
+        self.tools = set(tools)
+        self._annotated: set[str] = set()
+        self._in_flight: dict[tuple[str, str], asyncio.Future] = {}
+        self.executions = 0
+        self.coalesced = 0
+
+    def update_tools(self, tools: Iterable[Any]) -> None:
+        """Learn which tools are idempotent from a fresh tool listing."""
+        annotated = set()
+        for tool in tools:
+            annotations = getattr(tool, "annotations", None)
+            if (
+                getattr(annotations, "idempotentHint", None) is True
+                or getattr(annotations, "readOnlyHint", None) is True
+            ):
+                annotated.add(tool_key(tool))
+        self._annotated = annotated
+
+    def applies_to(self, tool_name: str) -> bool:
+        """Whether calls to this tool may share an execution."""
+        return tool_name in self.tools or tool_name in self._annotated
+
+    async def run(
+        self,
+        tool_name: str,
+        arguments: dict,
+        execute: Callable[[], Awaitable[Any]],
+    ) -> Any:
+        """Run execute(), or join an identical call that is already running."""
+        if not self.applies_to(tool_name):
+            return await execute()
+
+        key = (tool_name, canonical_arguments(arguments))
+        execution = self._in_flight.get(key)
+        if execution is None:
+            # Runs as its own task, so a caller giving up does not cancel it
+            # for the others still waiting
+            execution = asyncio.ensure_future(execute())
+            self._in_flight[key] = execution
+            execution.add_done_callback(lambda _: self._finish(key, execution))
+            self.executions += 1
+        else:
+            self.coalesced += 1
+
+        result = await asyncio.shield(execution)
+        return list(result) if isinstance(result, list) else result
+
+    def _finish(self, key: tuple[str, str], execution: asyncio.Future) -> None:
+        if self._in_flight.get(key) is execution:
+            del self._in_flight[key]
+        # Retrieve the exception even if every caller was cancelled
+        if not execution.cancelled():
+            execution.exception()
+
+    def stats(self) -> dict:
+        """Get coalescing statistics."""
+        return {
+            "in_flight": len(self._in_flight),
+            "executions": self.executions,
+            "coalesced": self.coalesced,
+        }
@@ -0,0 +1,155 @@
+"""
+Shared local daemon.
+
+One long-running gateway process owns the detection models, the upstream MCP
+servers and the session store, and serves any number of local clients over a
+Unix domain socket. Each socket connection is one MCP session speaking the
+same newline-delimited JSON-RPC as the stdio transport, so a client only needs
+the thin `tl-connect` shim (see `tramlines.shim`) in place of a full gateway.
+"""
+
+import os
+import socket
+import uuid
+from pathlib import Path
+
+import anyio
+import mcp.types as mt
+from anyio.abc import SocketStream
+from anyio.streams.buffered import BufferedByteReceiveStream
+from fastmcp import FastMCP
+from mcp.server.lowlevel import NotificationOptions
+from mcp.shared.message import SessionMessage
+from pydantic import ValidationError
+
+from tramlines.logger import logger
+from tramlines.middleware import connection_session_id
+
+DEFAULT_SOCKET_PATH = Path.home() / ".tramlines" / "tramlines.sock"
+
+# Largest single JSON-RPC message accepted from a client
+MAX_MESSAGE_BYTES = 64 * 1024 * 1024
+
+
+def _socket_in_use(path: Path) -> bool:
+    """Checks whether a live daemon is already accepting on path."""
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        try:
+            sock.connect(str(path))
+        except OSError:
+            return False
+    return True
+
+
+class LocalDaemon:
+    """Serves a gateway proxy to local clients over a Unix domain socket."""
+
+    def __init__(self, server: FastMCP, socket_path: str | Path = DEFAULT_SOCKET_PATH):
+        self.server = server
+        self.socket_path = Path(socket_path)
+        self.active_connections = 0
+        self.total_connections = 0
+
+    async def serve(self) -> None:
+        """Listen on the socket until cancelled."""
+        self.socket_path.parent.mkdir(parents=True, exist_ok=True)
+        if self.socket_path.exists():
+            if _socket_in_use(self.socket_path):
+                raise RuntimeError(
+                    f"A Tramlines daemon is already listening on {self.socket_path}"
+                )
+            # Left behind by a daemon that did not shut down cleanly
+            self.socket_path.unlink()
+
+        listener = await anyio.create_unix_listener(self.socket_path)
+        # Only the owning user may attach to the gateway
+        os.chmod(self.socket_path, 0o600)
+        logger.info(f"DAEMON_START | Listening on {self.socket_path}")
+        try:
+            async with listener:
+                await listener.serve(self._serve_connection)
+        finally:
+            self.socket_path.unlink(missing_ok=True)
+            logger.info("DAEMON_STOP | Socket removed")
+
+    async def _serve_connection(self, stream: SocketStream) -> None:
+        session_id = f"local-{uuid.uuid4().hex}"
+        # Tool calls handled for this connection inherit this context
+        connection_session_id.set(session_id)
+        self.active_connections += 1
+        self.total_connections += 1
+        logger.info(
+            f"DAEMON_CONNECT | session_id={session_id} | "
+            f"active={self.active_connections}"
+        )
+
+        read_writer, read_stream = anyio.create_memory_object_stream[
+            SessionMessage | Exception
+        ](0)
+        write_stream, write_reader = anyio.create_memory_object_stream[SessionMessage](
+            0
+        )
+
+        async def socket_reader() -> None:
+            buffered = BufferedByteReceiveStream(stream)
+            async with read_writer:
+                while True:
+                    try:
+                        line = await buffered.receive_until(b"\n", MAX_MESSAGE_BYTES)
+                    except (
+                        anyio.EndOfStream,
+                        anyio.IncompleteRead,
+                        anyio.BrokenResourceError,
+                    ):
+                        return
+                    except anyio.DelimiterNotFound as e:
+                        await read_writer.send(e)
+                        return
+                    if not line.strip():
+                        continue
+                    try:
+                        message = mt.JSONRPCMessage.model_validate_json(line)
+                    except ValidationError as e:
+                        await read_writer.send(e)
+                        continue
+                    await read_writer.send(SessionMessage(message))
+
+        async def socket_writer() -> None:
+            async with write_reader:
+                async for session_message in write_reader:
+                    data = session_message.message.model_dump_json(
+                        by_alias=True, exclude_none=True
+                    )
+                    try:
+                        await stream.send(data.encode() + b"\n")
+                    except (anyio.BrokenResourceError, anyio.ClosedResourceError):
+                        # Client went away mid-response
+                        return
+
+        mcp_server = self.server._mcp_server
+        try:
+            async with stream, anyio.create_task_group() as tg:
+                tg.start_soon(socket_reader)
+                tg.start_soon(socket_writer)
+                await mcp_server.run(
+                    read_stream,
+                    write_stream,
+                    mcp_server.create_initialization_options(
+                        NotificationOptions(tools_changed=True)
+                    ),
+                )
+                tg.cancel_scope.cancel()
+        finally:
+            self.active_connections -= 1
+            logger.info(
+                f"DAEMON_DISCONNECT | session_id={session_id} | "
+                f"active={self.active_connections}"
+            )
+
+
+def run_daemon(server: FastMCP, socket_path: str | Path = DEFAULT_SOCKET_PATH) -> None:
+    """Run the daemon in the foreground until interrupted."""
+    try:
+        anyio.run(LocalDaemon(server, socket_path).serve)
+    except KeyboardInterrupt:
+        pass
@@ -1,8 +1,36 @@
 from __future__ import annotations
 
-from typing import Pattern
+import re
+from typing import Any, Callable, Pattern
 
+from .paths import compile_path
 from .predicates import HistoryQueryBuilder, StringValueBuilder
+from .results import DetectorResultScanner, RegexResultScanner, ResultScanner
+
+
+def _as_text(value: Any) -> str:
+    """Renders an argument as text, with JSON booleans as "true" or "false"."""
+    if value is None:
+        return ""
+    if isinstance(value, bool):
+        return "true" if value else "false"
+    return str(value)
+
+
+def _argument_builder(path: str, typed: bool = False) -> StringValueBuilder:
+    """Builds a value builder reading the argument at path from a call."""
+    accessor = compile_path(path)
+
+    def extractor(call, hist):
+        value = accessor.resolve(call)
+        if typed:
+            return value
+        if accessor.is_wildcard:
+            return [_as_text(item) for item in value]
+        return _as_text(value)
+
+    return StringValueBuilder(extractor, match_any=accessor.is_wildcard)
+
 
 # --- Call (Live) Context ---
 
@@ -15,16 +43,24 @@ class _CallContext:
     @property
     def name(self) -> StringValueBuilder:
         """Accesses the tool's name."""
-        return StringValueBuilder(lambda call, hist: call.name)
+        return StringValueBuilder(lambda call, hist: call.name, name_only=True)
+
+    def arg(self, path: str) -> StringValueBuilder:
+        """
+        Accesses an argument by key or path, e.g. `params.sql` or `items[*].url`.
 
-    def arg(self, key: str) -> StringValueBuilder:
-        """Accesses a specific argument by its key."""
+        Values are compared as text, and a missing argument reads as "". A
+        wildcard path matches if any of the values it selects matches.
+        """
+        return _argument_builder(path)
 
-        def extractor(call, hist):
-            value = call.arguments.get(key)
-            return str(value) if value is not None else ""
+    def typed_arg(self, path: str) -> StringValueBuilder:
+        """
+        Accesses an argument by key or path, keeping its original type.
 
-        return StringValueBuilder(extractor)
+        Numbers compare as numbers, and a missing argument never matches.
+        """
+        return _argument_builder(path, typed=True)
 
 
 call = _CallContext()
@@ -44,14 +80,13 @@ class _HistoricalCallContext:
         """Accesses the historical call's name."""
         return StringValueBuilder(lambda call, hist: call.name)
 
-    def arg(self, key: str) -> StringValueBuilder:
-        """Accesses a specific argument from the historical call."""
+    def arg(self, path: str) -> StringValueBuilder:
+        """Accesses an argument of the historical call by key or path."""
+        return _argument_builder(path)
 
-        def extractor(call, hist):
-            value = call.arguments.get(key)
-            return str(value) if value is not None else ""
-
-        return StringValueBuilder(extractor)
+    def typed_arg(self, path: str) -> StringValueBuilder:
+        """Accesses an argument of the historical call, keeping its type."""
+        return _argument_builder(path, typed=True)
 
 
 # --- History Context ---
@@ -81,3 +116,32 @@ class _HistoryContext:
 
 
 history = _HistoryContext()
+
+
+# --- Result Context (for on_result rules) ---
+
+
+class _ResultContext:
+    """
+    The top-level context object for building scanners over a tool's result.
+    """
+
+    def matches(self, pattern: str | Pattern[str]) -> ResultScanner:
+        """Matches a regex (case-insensitive if given as a string)."""
+        return RegexResultScanner(pattern)
+
+    def contains(self, *terms: str) -> ResultScanner:
+        """Matches if any of the terms occurs, ignoring case."""
+        return RegexResultScanner(
+            "|".join(re.escape(term) for term in terms),
+            max_match_length=max(len(term) for term in terms),
+        )
+
+    def detected_by(
+        self, detect: Callable[[str], bool], window: int = 4096, overlap: int = 256
+    ) -> ResultScanner:
+        """Matches if a text detector flags any window of the result."""
+        return DetectorResultScanner(detect, window, overlap)
+
+
+result = _ResultContext()
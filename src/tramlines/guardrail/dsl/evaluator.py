@@ -2,12 +2,19 @@ from __future__ import annotations
 
 import importlib.util
 import sys
+import time
 from dataclasses import dataclass
 from pathlib import Path
+from typing import Iterable
 
-from tramlines.guardrail.dsl.types import ActionType, Policy
+import mcp.types as mt
+
+from tramlines import tracing
+from tramlines.guardrail.dsl.results import ResultScan, result_chunks
+from tramlines.guardrail.dsl.types import ActionType, Policy, Rule
 from tramlines.logger import logger
-from tramlines.session import CallHistory
+from tramlines.metrics import RULE_SECONDS
+from tramlines.session import CallHistory, ToolCall
 
 
 @dataclass
@@ -113,24 +120,125 @@ def evaluate_call(policy: Policy, history: CallHistory) -> EvaluationResult:
     call = history[-1]
 
     for rule in policy.rules:
+        if rule.on_result:
+            continue
+        started = time.perf_counter()
         try:
-            if rule.condition(call, history):
-                if rule.action_type == ActionType.BLOCK:
-                    # Block actions are final
-                    return EvaluationResult(
-                        action_type=ActionType.BLOCK,
-                        violated_rule=rule.name,
-                        message=rule.message,
-                    )
-                elif rule.action_type == ActionType.ALLOW:
-                    # Allow actions stop processing for this phase
-                    return EvaluationResult(action_type=ActionType.ALLOW)
-
+            with tracing.span("rule", {"tramlines.rule": rule.name}):
+                matched = rule.condition(call, history)
         except Exception as e:
             logger.error(f"GUARDRAIL_ERROR | Error evaluating rule '{rule.name}': {e}")
             # Decide on a default behavior for errors, e.g., fail-safe (block)
             # For now, we'll log and continue, which is fail-open
             continue
+        finally:
+            RULE_SECONDS.labels(rule.name, "call").observe(
+                time.perf_counter() - started
+            )
+        if matched:
+            if rule.action_type == ActionType.BLOCK:
+                # Block actions are final
+                return EvaluationResult(
+                    action_type=ActionType.BLOCK,
+                    violated_rule=rule.name,
+                    message=rule.message,
+                )
+            elif rule.action_type == ActionType.ALLOW:
+                # Allow actions stop processing for this phase
+                return EvaluationResult(action_type=ActionType.ALLOW)
 
     # If no rule was triggered, default to allow
     return EvaluationResult(action_type=ActionType.ALLOW)
+
+
+def static_block_rule(policy: Policy, tool_name: str) -> Rule | None:
+    """
+    Finds the rule that blocks every call to a tool, whatever its arguments.
+
+    Returns the first BLOCK rule whose condition depends only on the tool name
+    and matches tool_name, provided no earlier rule could allow the call;
+    otherwise None. Such a tool can never succeed, so it need not be offered.
+    """
+    probe = ToolCall(name=tool_name, arguments={})
+    probe_history = CallHistory()
+    probe_history.add_call(probe)
+
+    for rule in policy.rules:
+        if rule.on_result:
+            continue
+        if getattr(rule.condition, "name_only", False) is not True:
+            if rule.action_type == ActionType.ALLOW:
+                # May allow some calls to this tool, depending on context
+                return None
+            continue
+        try:
+            matched = rule.condition(probe, probe_history)
+        except Exception:
+            # Evaluation of this rule fails open at call time as well
+            continue
+        if matched:
+            return rule if rule.action_type == ActionType.BLOCK else None
+    return None
+
+
+def has_result_rules(policy: Policy) -> bool:
+    """Check whether a policy has any result-phase rules."""
+    return any(rule.on_result for rule in policy.rules)
+
+
+def evaluate_result(
+    policy: Policy, call: ToolCall, history: CallHistory, content: Iterable[mt.Content]
+) -> EvaluationResult:
+    """
+    Evaluates result-phase rules against the result of a finished tool call.
+
+    Every applicable rule scans the result in a single pass over its text,
+    chunk by chunk; the first rule to match blocks the result and the rest of
+    it is not read.
+    """
+    scans: list[tuple[Rule, ResultScan]] = []
+    for rule in policy.rules:
+        if rule.result_scanner is None:
+            continue
+        try:
+            if rule.condition(call, history):
+                scans.append((rule, rule.result_scanner.scan()))
+        except Exception as e:
+            logger.error(f"GUARDRAIL_ERROR | Error evaluating rule '{rule.name}': {e}")
+    if not scans:
+        return EvaluationResult(action_type=ActionType.ALLOW)
+
+    def blocked(rule: Rule) -> EvaluationResult:
+        return EvaluationResult(
+            action_type=ActionType.BLOCK, violated_rule=rule.name, message=rule.message
+        )
+
+    # Rule name -> seconds spent scanning, recorded once the scan is over
+    spent = dict.fromkeys((rule.name for rule, _ in scans), 0.0)
+
+    def step(rule: Rule, scan: ResultScan, chunk: str | None) -> bool:
+        started = time.perf_counter()
+        try:
+            return scan.feed(chunk) if chunk is not None else scan.finish()
+        except Exception as e:
+            logger.error(
+                f"GUARDRAIL_ERROR | Error scanning result for '{rule.name}': {e}"
+            )
+            # Fail open for this rule, without retrying it on every chunk
+            scans.remove((rule, scan))
+            return False
+        finally:
+            spent[rule.name] += time.perf_counter() - started
+
+    try:
+        for chunk in result_chunks(content):
+            for rule, scan in list(scans):
+                if step(rule, scan, chunk):
+                    return blocked(rule)
+        for rule, scan in list(scans):
+            if step(rule, scan, None):
+                return blocked(rule)
+        return EvaluationResult(action_type=ActionType.ALLOW)
+    finally:
+        for name, seconds in spent.items():
+            RULE_SECONDS.labels(name, "result").observe(seconds)
@@ -0,0 +1,98 @@
+from __future__ import annotations
+
+import re
+from functools import lru_cache
+from typing import Any, Pattern
+
+from tramlines.session import ToolCall
+
+# A path is a sequence of keys and list indices; WILDCARD matches any of either
+WILDCARD = "*"
+
+_TOKEN = re.compile(r"\.?([^.\[\]]+)|\[(\d+|\*)\]")
+
+
+def _parse_steps(path: str) -> tuple[str | int, ...]:
+    """Split a path such as `items[*].url` into ("items", "*", "url")."""
+    steps: list[str | int] = []
+    position = 0
+    while position < len(path):
+        match = _TOKEN.match(path, position)
+        if match is None or (position == 0 and path.startswith(".")):
+            raise ValueError(f"Invalid argument path: {path!r}")
+        key, index = match.groups()
+        if key is not None:
+            steps.append(key)
+        else:
+            steps.append(WILDCARD if index == WILDCARD else int(index))
+        position = match.end()
+    if not steps:
+        raise ValueError("Argument path cannot be empty")
+    return tuple(steps)
+
+
+def _leaf_path_pattern(steps: tuple[str | int, ...]) -> Pattern[str]:
+    """Build a regex matching the flattened leaf paths a wildcard path selects."""
+    parts = []
+    for i, step in enumerate(steps):
+        if isinstance(step, int):
+            parts.append(rf"\[{step}\]")
+            continue
+        separator = r"\." if i else ""
+        if step == WILDCARD:
+            parts.append(rf"(?:{separator}[^.\[]+|\[\d+\])")
+        else:
+            parts.append(separator + re.escape(step))
+    return re.compile("".join(parts))
+
+
+class ArgumentPath:
+    """
+    A compiled accessor for a value inside a tool call's arguments.
+
+    Paths use dotted keys and bracketed list indices, e.g. `params.sql` or
+    `items[0].url`. A `*` step, as in `items[*].url`, selects every element and
+    makes the accessor return a list of all matching scalar values, resolved
+    from the call's cached flattened arguments.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._steps = _parse_steps(path)
+        self.is_wildcard = WILDCARD in self._steps
+        self._leaf_pattern = (
+            _leaf_path_pattern(self._steps) if self.is_wildcard else None
+        )
+
+    def resolve(self, call: ToolCall) -> Any:
+        """
+        Returns the value at this path, or None if it does not exist.
+
+        Wildcard paths return a (possibly empty) list of matching leaf values.
+        """
+        if self._leaf_pattern is not None:
+            pattern = self._leaf_pattern
+            return [leaf.value for leaf in call.leaves if pattern.fullmatch(leaf.path)]
+
+        # Keys that themselves contain dots or brackets are looked up verbatim
+        if self.path in call.arguments:
+            return call.arguments[self.path]
+
+        value: Any = call.arguments
+        for step in self._steps:
+            if isinstance(step, int):
+                if not isinstance(value, list) or step >= len(value):
+                    return None
+            elif not isinstance(value, dict) or step not in value:
+                return None
+            value = value[step]
+        return value
+
+    def __repr__(self) -> str:
+        return f"ArgumentPath({self.path!r})"
+
+
+@lru_cache(maxsize=1024)
+def compile_path(path: str) -> ArgumentPath:
+    """Parse a path once; repeated uses of the same path share one accessor."""
+    return ArgumentPath(path)
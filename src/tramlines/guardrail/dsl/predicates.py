@@ -5,6 +5,7 @@ from abc import ABC, abstractmethod
 from datetime import datetime, timedelta
 from typing import Any, Callable, Generic, List, Pattern, TypeVar
 
+from tramlines.guardrail.dsl.paths import compile_path
 from tramlines.guardrail.dsl.types import CallHistory, Predicate, ToolCall
 
 T = TypeVar("T")
@@ -41,6 +42,10 @@ def _parse_time_window(window: str) -> timedelta:
 class BasePredicate(Predicate, ABC):
     """Base implementation for all predicates with logical operators."""
 
+    # True when the outcome depends on nothing but the live call's tool name,
+    # so it can be decided for a tool before any call is made
+    name_only: bool = False
+
     def __and__(self, other: Predicate) -> Predicate:
         return AndPredicate(self, other)
 
@@ -58,10 +63,15 @@ class BasePredicate(Predicate, ABC):
 # --- Composite Predicates ---
 
 
+def _is_name_only(*predicates: Predicate) -> bool:
+    return all(getattr(p, "name_only", False) is True for p in predicates)
+
+
 class AndPredicate(BasePredicate):
     def __init__(self, left: Predicate, right: Predicate):
         self._left = left
         self._right = right
+        self.name_only = _is_name_only(left, right)
 
     def __call__(self, call: ToolCall, history: CallHistory) -> bool:
         return self._left(call, history) and self._right(call, history)
@@ -71,6 +81,7 @@ class OrPredicate(BasePredicate):
     def __init__(self, left: Predicate, right: Predicate):
         self._left = left
         self._right = right
+        self.name_only = _is_name_only(left, right)
 
     def __call__(self, call: ToolCall, history: CallHistory) -> bool:
         return self._left(call, history) or self._right(call, history)
@@ -79,6 +90,7 @@ class OrPredicate(BasePredicate):
 class NotPredicate(BasePredicate):
     def __init__(self, predicate: Predicate):
         self._predicate = predicate
+        self.name_only = _is_name_only(predicate)
 
     def __call__(self, call: ToolCall, history: CallHistory) -> bool:
         return not self._predicate(call, history)
@@ -88,28 +100,48 @@ class NotPredicate(BasePredicate):
 
 
 class ValueBuilder(Generic[T]):
-    """Creates predicates when comparison operators are used."""
+    """
+    Creates predicates when comparison operators are used.
+
+    With match_any, the extractor yields a list of values and the predicate
+    holds if the comparison holds for any of them. With name_only, the
+    extractor reads nothing but the live call's tool name.
+    """
 
-    def __init__(self, extractor: Callable[[ToolCall, CallHistory], T | None]):
+    def __init__(
+        self,
+        extractor: Callable[[ToolCall, CallHistory], T | None],
+        match_any: bool = False,
+        name_only: bool = False,
+    ):
         self._extractor = extractor
+        self._match_any = match_any
+        self._name_only = name_only
+
+    def _compare(
+        self, comparison: Callable[[Any, Any], bool], target: Any
+    ) -> Predicate:
+        return ComparisonPredicate(
+            self._extractor, comparison, target, self._match_any, self._name_only
+        )
 
     def __eq__(self, other: Any) -> Predicate:  # type: ignore[override]
-        return ComparisonPredicate(self._extractor, lambda a, b: a == b, other)
+        return self._compare(lambda a, b: a == b, other)
 
     def __ne__(self, other: Any) -> Predicate:  # type: ignore[override]
-        return ComparisonPredicate(self._extractor, lambda a, b: a != b, other)
+        return self._compare(lambda a, b: a != b, other)
 
     def __gt__(self, other: Any) -> Predicate:
-        return ComparisonPredicate(self._extractor, lambda a, b: a > b, other)
+        return self._compare(lambda a, b: a > b, other)
 
     def __lt__(self, other: Any) -> Predicate:
-        return ComparisonPredicate(self._extractor, lambda a, b: a < b, other)
+        return self._compare(lambda a, b: a < b, other)
 
     def __ge__(self, other: Any) -> Predicate:
-        return ComparisonPredicate(self._extractor, lambda a, b: a >= b, other)
+        return self._compare(lambda a, b: a >= b, other)
 
     def __le__(self, other: Any) -> Predicate:
-        return ComparisonPredicate(self._extractor, lambda a, b: a <= b, other)
+        return self._compare(lambda a, b: a <= b, other)
 
 
 class StringValueBuilder(ValueBuilder[str]):
@@ -117,22 +149,19 @@ class StringValueBuilder(ValueBuilder[str]):
 
     def matches(self, pattern: str | Pattern[str]) -> Predicate:
         regex = re.compile(pattern) if isinstance(pattern, str) else pattern
-        return ComparisonPredicate(
-            self._extractor,
+        return self._compare(
             lambda val, p: bool(p.search(val) if isinstance(val, str) else False),
             regex,
         )
 
     def is_in(self, values: List[str]) -> Predicate:
-        return ComparisonPredicate(
-            self._extractor,
+        return self._compare(
             lambda val, v_list: val in v_list if isinstance(val, str) else False,
             values,
         )
 
     def contains(self, *terms: str) -> Predicate:
-        return ComparisonPredicate(
-            self._extractor,
+        return self._compare(
             lambda val, terms: (
                 any(term in val for term in terms) if isinstance(val, str) else False
             ),
@@ -140,8 +169,7 @@ class StringValueBuilder(ValueBuilder[str]):
         )
 
     def startswith(self, *prefixes: str) -> Predicate:
-        return ComparisonPredicate(
-            self._extractor,
+        return self._compare(
             lambda val, prefixes: (
                 val.startswith(prefixes) if isinstance(val, str) else False
             ),
@@ -149,8 +177,7 @@ class StringValueBuilder(ValueBuilder[str]):
         )
 
     def endswith(self, *suffixes: str) -> Predicate:
-        return ComparisonPredicate(
-            self._extractor,
+        return self._compare(
             lambda val, suffixes: (
                 val.endswith(suffixes) if isinstance(val, str) else False
             ),
@@ -169,15 +196,24 @@ class ComparisonPredicate(BasePredicate, Generic[T]):
         extractor: Callable[[ToolCall, CallHistory], T | None],
         comparison: Callable[[T, Any], bool],
         target: Any,
+        match_any: bool = False,
+        name_only: bool = False,
     ):
         self._extractor = extractor
         self._comparison = comparison
         self._target = target
+        self._match_any = match_any
+        self.name_only = name_only
 
     def __call__(self, call: ToolCall, history: CallHistory) -> bool:
         value = self._extractor(call, history)
         if value is None:
             return False
+        if self._match_any:
+            return any(self._compare(item) for item in value)  # type: ignore[attr-defined]
+        return self._compare(value)
+
+    def _compare(self, value: T) -> bool:
         try:
             return self._comparison(value, self._target)
         except (TypeError, ValueError):
@@ -278,23 +314,25 @@ class HistoricalCallBuilder:
 
         return StringValueBuilder(extractor)
 
-    def arg(self, key: str) -> StringValueBuilder:
-        """Get an argument from the historical call."""
+    def arg(self, path: str) -> StringValueBuilder:
+        """Get an argument from the historical call by key or path."""
+        accessor = compile_path(path)
 
-        def extractor(call: ToolCall, hist: CallHistory) -> str | None:
+        def extractor(call: ToolCall, hist: CallHistory) -> Any:
             match = self._find_matching_call(call, hist)
-            if match:
-                return match.arguments.get(key)
-            return None
+            return accessor.resolve(match) if match else None
 
-        return StringValueBuilder(extractor)
+        return StringValueBuilder(extractor, match_any=accessor.is_wildcard)
 
 
 class CustomPredicate(BasePredicate):
     """A wrapper for a raw Python function to be used as a predicate."""
 
-    def __init__(self, func: Callable[[ToolCall, CallHistory], bool]):
+    def __init__(
+        self, func: Callable[[ToolCall, CallHistory], bool], name_only: bool = False
+    ):
         self._func = func
+        self.name_only = name_only
 
     def __call__(self, call: ToolCall, history: CallHistory) -> bool:
         return self._func(call, history)
@@ -303,7 +341,9 @@ class CustomPredicate(BasePredicate):
 # --- Convenience Function ---
 
 
-def custom(func: Callable[[ToolCall, CallHistory], bool]) -> Predicate:
+def custom(
+    func: Callable[[ToolCall, CallHistory], bool], name_only: bool = False
+) -> Predicate:
     """
     Provides a clean escape hatch to use a raw Python function for complex logic
     that cannot be expressed by the declarative DSL.
@@ -313,8 +353,10 @@ def custom(func: Callable[[ToolCall, CallHistory], bool]) -> Predicate:
 
     Args:
         func: The Python function to wrap in a predicate.
+        name_only: Declares that the function reads only `call.name`, so a
+            blocking rule using it can hide matching tools from discovery.
 
     Returns:
         A Predicate instance that can be used in a .when() clause.
     """
-    return CustomPredicate(func)
+    return CustomPredicate(func, name_only)
@@ -0,0 +1,132 @@
+from __future__ import annotations
+
+import re
+from abc import ABC, abstractmethod
+from typing import Callable, Iterable, Iterator, Pattern
+
+import mcp.types as mt
+
+# Size of the pieces result text is fed to scanners in
+RESULT_CHUNK_SIZE = 8 * 1024
+
+
+class ResultScan(ABC):
+    """The state of one scanner over one tool result."""
+
+    @abstractmethod
+    def feed(self, chunk: str) -> bool:
+        """Scan the next piece of result text; True on a match."""
+
+    def finish(self) -> bool:
+        """Scan anything still buffered once the result has ended."""
+        return False
+
+
+class ResultScanner(ABC):
+    """
+    A detector for tool results, applied incrementally.
+
+    Each result gets a fresh scan that sees the result text one chunk at a
+    time and keeps only a bounded amount of it, so memory does not grow with
+    the size of the result and scanning stops at the first match.
+    """
+
+    @abstractmethod
+    def scan(self) -> ResultScan:
+        """Start scanning a new result."""
+
+
+class _RegexScan(ResultScan):
+    def __init__(self, regex: Pattern[str], overlap: int):
+        self._regex = regex
+        self._overlap = overlap
+        self._tail = ""
+
+    def feed(self, chunk: str) -> bool:
+        text = self._tail + chunk
+        if self._regex.search(text):
+            return True
+        # Keep enough of the end to catch matches that span two chunks
+        self._tail = text[-self._overlap :] if self._overlap else ""
+        return False
+
+
+class RegexResultScanner(ResultScanner):
+    """Matches a regex anywhere in the result, including across chunks."""
+
+    def __init__(self, pattern: str | Pattern[str], max_match_length: int = 256):
+        self.regex = (
+            re.compile(pattern, re.IGNORECASE) if isinstance(pattern, str) else pattern
+        )
+        self.max_match_length = max_match_length
+
+    def scan(self) -> ResultScan:
+        return _RegexScan(self.regex, self.max_match_length - 1)
+
+
+class _WindowScan(ResultScan):
+    def __init__(self, detect: Callable[[str], bool], window: int, overlap: int):
+        self._detect = detect
+        self._window = window
+        self._overlap = overlap
+        self._buffer = ""
+        self._scanned = False
+
+    def feed(self, chunk: str) -> bool:
+        self._buffer += chunk
+        while len(self._buffer) >= self._window:
+            if self._detect(self._buffer[: self._window]):
+                return True
+            self._scanned = True
+            self._buffer = self._buffer[self._window - self._overlap :]
+        return False
+
+    def finish(self) -> bool:
+        # After a full window, the first `overlap` characters left over were
+        # already scanned as the end of that window
+        unscanned = len(self._buffer) - (self._overlap if self._scanned else 0)
+        return unscanned > 0 and self._detect(self._buffer)
+
+
+class DetectorResultScanner(ResultScanner):
+    """
+    Runs a text detector such as `detect_prompt` over overlapping windows.
+
+    Model-based detectors have a bounded input size anyway; windows of that
+    size, overlapping so nothing is missed at a boundary, let them scan
+    results of any length in bounded memory.
+    """
+
+    def __init__(
+        self, detect: Callable[[str], bool], window: int = 4096, overlap: int = 256
+    ):
+        if not 0 <= overlap < window:
+            raise ValueError("Overlap must be smaller than the window")
+        self.detect = detect
+        self.window = window
+        self.overlap = overlap
+
+    def scan(self) -> ResultScan:
+        return _WindowScan(self.detect, self.window, self.overlap)
+
+
+def result_chunks(
+    content: Iterable[mt.Content], chunk_size: int = RESULT_CHUNK_SIZE
+) -> Iterator[str]:
+    """
+    Yields the text of a tool result's content blocks in pieces.
+
+    Text blocks and embedded text resources are scanned; images, audio and
+    binary resources carry no text and are skipped.
+    """
+    for block in content:
+        if isinstance(block, mt.TextContent):
+            text = block.text
+        elif isinstance(block, mt.EmbeddedResource) and isinstance(
+            block.resource, mt.TextResourceContents
+        ):
+            text = block.resource.text
+        else:
+            continue
+        for start in range(0, len(text), chunk_size):
+            yield text[start : start + chunk_size]
@@ -1,5 +1,7 @@
 from __future__ import annotations
 
+from .predicates import custom
+from .results import ResultScanner
 from .types import ActionType, Predicate, Rule
 
 
@@ -11,6 +13,7 @@ class RuleBuilder:
     def __init__(self, name: str):
         self._name = name
         self._condition: Predicate | None = None
+        self._result_scanner: ResultScanner | None = None
 
     def when(self, condition: Predicate) -> RuleBuilder:
         """
@@ -25,7 +28,24 @@ class RuleBuilder:
         self._condition = condition
         return self
 
+    def on_result(self, scanner: ResultScanner) -> RuleBuilder:
+        """
+        Moves the rule to the result phase: once the tool has run, the rule
+        acts if the scanner matches its result. A `.when()` condition, if set,
+        selects which calls' results are scanned.
+
+        Args:
+            scanner: A result scanner, e.g. `result.matches(...)`.
+
+        Returns:
+            The RuleBuilder instance for chaining.
+        """
+        self._result_scanner = scanner
+        return self
+
     def _ensure_condition(self) -> Predicate:
+        if self._condition is None and self._result_scanner is not None:
+            return custom(lambda call, history: True)
         if self._condition is None:
             raise ValueError(
                 "A rule must have a `.when()` condition before an action is set."
@@ -42,6 +62,7 @@ class RuleBuilder:
             condition=self._ensure_condition(),
             action_type=ActionType.BLOCK,
             message=message,
+            result_scanner=self._result_scanner,
         )
 
     def allow(self) -> Rule:
@@ -49,6 +70,8 @@ class RuleBuilder:
         Finalizes the rule with an ALLOW action.
         If the condition is met, evaluation of other rules in the same phase stops.
         """
+        if self._result_scanner is not None:
+            raise ValueError("Result-phase rules can only block.")
         return Rule(
             name=self._name,
             condition=self._ensure_condition(),
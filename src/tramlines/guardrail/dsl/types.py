@@ -4,6 +4,8 @@ from dataclasses import dataclass, field
 from enum import Enum
 from typing import List, Protocol
 
+from tramlines.guardrail.dsl.results import ResultScanner
+
 # --- Import shared types from session module ---
 from tramlines.session import CallHistory, ToolCall
 
@@ -40,18 +42,36 @@ class Rule:
     """
     A single, immutable security rule.
     It consists of a name, a condition (predicate), and the action to take.
+
+    Rules with a result_scanner belong to the result phase: they apply once
+    the tool has run, to calls matching the condition, and act if the scanner
+    matches the tool's result.
     """
 
     name: str
     condition: Predicate
     action_type: ActionType
     message: str | None = None
+    result_scanner: ResultScanner | None = None
+
+    @property
+    def on_result(self) -> bool:
+        """Whether the rule applies to the tool's result rather than the call."""
+        return self.result_scanner is not None
 
 
 @dataclass
 class Policy:
-    """A collection of rules that are evaluated in order."""
+    """
+    A collection of rules that are evaluated in order.
+
+    `scan_fields` and `skip_fields` override how tool schemas classify argument
+    fields for `ToolCall.text_leaves`: fields listed by path, e.g. `title` or
+    `items[*].note`, are always or never scanned by text detectors.
+    """
 
     name: str
     rules: List[Rule] = field(default_factory=list)
     description: str | None = None
+    scan_fields: List[str] = field(default_factory=list)
+    skip_fields: List[str] = field(default_factory=list)
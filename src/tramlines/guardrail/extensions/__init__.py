@@ -0,0 +1,4 @@
+from collections import Counter
+
+# Detector name -> number of texts it has scanned since startup
+detector_invocations: Counter[str] = Counter()
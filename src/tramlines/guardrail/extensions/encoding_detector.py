@@ -6,7 +6,79 @@ Detects potentially encoded or obfuscated content that could be used to bypass s
 
 import re
 
+from tramlines.guardrail.extensions import detector_invocations
+from tramlines.metrics import timed_detector
 
+# Base64-looking runs, filtered further by _is_suspicious_base64
+_BASE64 = r"(?P<base64>[A-Za-z0-9+/]{16,}={0,2})"
+
+# All encoding signatures combined into one alternation so text is scanned once.
+# Escape sequences are only flagged once several of the same kind have been seen.
+_ENCODING_PATTERN = re.compile(
+    _BASE64
+    + r"|\\(?:(?P<hex_escape>x[0-9A-Fa-f]{2})"  # \x hex escapes
+    + r"|(?P<unicode_escape>u[0-9A-Fa-f]{4}))"  # unicode escape sequences
+    + r"|(?P<url_escape>%[0-9A-Fa-f]{2})"  # URL-style hex
+    + r"|(?P<html_entity>&#x[0-9A-Fa-f]+;)"  # HTML hex entities
+)
+
+# Every escape sequence starts with one of these characters; text without any
+# of them only needs the much cheaper base64 scan.
+_ESCAPE_LEADS = ("\\", "%", "&")
+_BASE64_PATTERN = re.compile(_BASE64)
+
+# Number of escape sequences of one kind needed before the text is flagged
+_ESCAPE_THRESHOLDS = {
+    "hex_escape": 3,
+    "url_escape": 3,
+    "html_entity": 3,
+    "unicode_escape": 3,
+}
+
+# Substrings that mark a base64-looking run as a domain or URL component
+_BASE64_FALSE_POSITIVES = ("com", "org", "net", "example", "api", "http", "www")
+
+# Minimum length for a base64 run to be suspicious rather than a short token
+_BASE64_MIN_LENGTH = 20
+
+# Fraction of non-ASCII characters above which text is considered obfuscated
+_NON_ASCII_RATIO = 0.5
+
+
+def _is_suspicious_base64(run: str) -> bool:
+    """Checks whether a base64-looking run is long and not a domain or URL part."""
+    if len(run) < _BASE64_MIN_LENGTH:
+        return False
+    lowered = run.lower()
+    return not any(word in lowered for word in _BASE64_FALSE_POSITIVES)
+
+
+def _has_excessive_non_ascii(content: str) -> bool:
+    """Checks the non-ASCII character ratio without a per-character Python loop."""
+    if len(content) <= 20 or content.isascii():
+        return False
+    ascii_count = len(content.encode("ascii", "ignore"))
+    return (len(content) - ascii_count) / len(content) > _NON_ASCII_RATIO
+
+
+def _has_encoded_sequences(content: str) -> bool:
+    """Scans content once, stopping as soon as any threshold is crossed."""
+    has_escapes = any(lead in content for lead in _ESCAPE_LEADS)
+    pattern = _ENCODING_PATTERN if has_escapes else _BASE64_PATTERN
+    counts = dict.fromkeys(_ESCAPE_THRESHOLDS, 0)
+    for match in pattern.finditer(content):
+        kind = match.lastgroup
+        if kind == "base64":
+            if _is_suspicious_base64(match.group()):
+                return True
+        elif kind is not None:
+            counts[kind] += 1
+            if counts[kind] >= _ESCAPE_THRESHOLDS[kind]:
+                return True
+    return False
+
+
+@timed_detector("encoding")
 def detect_encoding(text: str) -> bool:
     """
     Detects suspicious encoding or obfuscation in text.
@@ -17,54 +89,12 @@ def detect_encoding(text: str) -> bool:
     Returns:
         bool: True if encoding detected, False if safe
     """
-    if not text or not text.strip():
+    if not text:
         return False
 
     content = str(text).strip()
+    if not content:
+        return False
 
-    # Check for base64 patterns - but be more specific
-    # Must be longer and not contain common words/domains
-    base64_pattern = r"[A-Za-z0-9+/]{16,}={0,2}"
-    base64_matches = re.findall(base64_pattern, content)
-    if base64_matches:
-        # Filter out common false positives like domain names, URLs
-        for match in base64_matches:
-            # Skip if it looks like a domain or URL component
-            if any(
-                word in match.lower()
-                for word in ["com", "org", "net", "example", "api", "http", "www"]
-            ):
-                continue
-            # Skip short matches that might be legitimate tokens
-            if len(match) < 20:
-                continue
-            return True
-
-    # Check for hex encoding - require multiple consecutive hex sequences
-    hex_patterns = [
-        r"\\x[0-9A-Fa-f]{2}",  # \x hex escapes
-        r"%[0-9A-Fa-f]{2}",  # URL-style hex
-        r"&#x[0-9A-Fa-f]+;",  # HTML hex entities
-    ]
-    for pattern in hex_patterns:
-        matches = re.findall(pattern, content)
-        # Only flag if there are multiple consecutive hex sequences
-        if len(matches) >= 3:
-            return True
-
-    # Check for excessive URL encoding (more than 8 encoded chars)
-    url_encoded = re.findall(r"%[0-9A-Fa-f]{2}", content)
-    if len(url_encoded) >= 8:
-        return True
-
-    # Check for unicode escape sequences (multiple required)
-    unicode_matches = re.findall(r"\\u[0-9A-Fa-f]{4}", content)
-    if len(unicode_matches) >= 3:
-        return True
-
-    # Check for excessive non-ASCII characters (but allow normal international text)
-    non_ascii_count = sum(1 for char in content if ord(char) > 127)
-    if len(content) > 20 and non_ascii_count / len(content) > 0.5:
-        return True
-
-    return False
+    detector_invocations["encoding"] += 1
+    return _has_excessive_non_ascii(content) or _has_encoded_sequences(content)
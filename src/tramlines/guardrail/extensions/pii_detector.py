@@ -5,6 +5,9 @@ Uses Microsoft Presidio for detecting personally identifiable information (PII).
 Provides comprehensive detection of emails, phone numbers, credit cards, SSNs, and more.
 """
 
+from tramlines.guardrail.extensions import detector_invocations
+from tramlines.metrics import timed_detector
+
 # Global imports and instance creation for performance
 try:
     from presidio_analyzer import AnalyzerEngine
@@ -19,6 +22,7 @@ except Exception:
     _analyzer = None
 
 
+@timed_detector("pii")
 def detect_pii(text: str) -> bool:
     """
     Detects personally identifiable information in text.
@@ -31,6 +35,7 @@ def detect_pii(text: str) -> bool:
     """
     if not text or not text.strip():
         return False
+    detector_invocations["pii"] += 1
 
     # Return False if analyzer couldn't be initialized
     if _analyzer is None:
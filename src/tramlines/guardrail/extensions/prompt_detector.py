@@ -4,6 +4,9 @@ Prompt Injection Detection Extension
 Uses LlamaFirewall's PromptGuard for detecting jailbreak attempts and prompt injections.
 """
 
+from tramlines.guardrail.extensions import detector_invocations
+from tramlines.metrics import timed_detector
+
 # Global imports and instance creation for performance
 try:
     from llamafirewall import LlamaFirewall, Role, ScannerType, UserMessage
@@ -23,6 +26,7 @@ except Exception:
     _firewall = None
 
 
+@timed_detector("prompt")
 def detect_prompt(text: str) -> bool:
     """
     Detects prompt injection attacks in text.
@@ -35,6 +39,7 @@ def detect_prompt(text: str) -> bool:
     """
     if not text or not text.strip():
         return False
+    detector_invocations["prompt"] += 1
 
     # Return False if firewall couldn't be initialized
     if _firewall is None:
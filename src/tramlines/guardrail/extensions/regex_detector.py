@@ -1,30 +1,75 @@
 """
 Regex Threat Detection Extension
 
-Uses LlamaFirewall's RegexScanner for pattern-based threat detection.
+Pattern-based threat detection using a single precompiled alternation, so every
+string is scanned exactly once regardless of how many patterns are configured.
 """
 
-import asyncio
+import re
 
-# Global imports and instance creation for performance
-try:
-    from llamafirewall.llamafirewall_data_types import ScanDecision as LlamaDecision
-    from llamafirewall.llamafirewall_data_types import UserMessage
-    from llamafirewall.scanners.regex_scanner import RegexScanner
+from tramlines.guardrail.extensions import detector_invocations
+from tramlines.metrics import timed_detector
 
-    # Create global scanner instance to avoid reloading models
-    _scanner: RegexScanner | None = RegexScanner()
-except ImportError:
-    # Handle missing llamafirewall dependencies gracefully
-    _scanner = None
-except Exception:
-    # Handle any other initialization errors (e.g., model loading issues)
-    _scanner = None
+# Threat patterns, kept in sync with LlamaFirewall's RegexScanner defaults
+THREAT_PATTERNS: dict[str, str] = {
+    # Prompt injection patterns
+    "Prompt injection": r"ignore previous instructions|ignore all instructions",
+    # PII detection
+    "Email address": r"\b[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Z|a-z]{2,}\b",
+    "Phone number": r"\b(?:\+\d{1,2}\s?)?\(?\d{3}\)?[\s.-]?\d{3}[\s.-]?\d{4}\b",
+    "Credit card": r"\b(?:\d{4}[- ]?){3}\d{4}\b",
+    "Social security number": r"\b\d{3}-\d{2}-\d{4}\b",
+}
+
+
+class RegexScanner:
+    """Scans text against a set of named patterns in a single pass."""
+
+    def __init__(self, patterns: dict[str, str] = THREAT_PATTERNS) -> None:
+        # Named groups must be identifiers, so map each pattern to a positional
+        # group name and keep the human-readable name for reporting.
+        self._names = {f"p{i}": name for i, name in enumerate(patterns)}
+        combined = "|".join(
+            f"(?P<p{i}>{pattern})" for i, pattern in enumerate(patterns.values())
+        )
+        self._regex = re.compile(combined, re.IGNORECASE | re.DOTALL)
+
+    def scan(self, text: str) -> str | None:
+        """
+        Returns the name of the first pattern that matches text, or None.
+
+        "First" is positional: the leftmost match in text wins.
+        """
+        match = self._regex.search(text)
+        if match is None or match.lastgroup is None:
+            return None
+        return self._names[match.lastgroup]
+
+
+# Global scanner instance, compiled once at import time
+_scanner = RegexScanner()
+
+
+@timed_detector("regex")
+def match_regex(text: str) -> str | None:
+    """
+    Finds which threat pattern, if any, occurs in text.
+
+    Args:
+        text: The text to analyze
+
+    Returns:
+        The name of the matched pattern, or None if no pattern matched
+    """
+    if not text or not text.strip():
+        return None
+    detector_invocations["regex"] += 1
+    return _scanner.scan(text)
 
 
 def detect_regex(text: str) -> bool:
     """
-    Detect potential regex-based threats in text using LlamaFirewall's RegexScanner.
+    Detect potential regex-based threats in text.
 
     Args:
         text: The text to analyze
@@ -32,20 +77,4 @@ def detect_regex(text: str) -> bool:
     Returns:
         True if potential threats are detected, False otherwise
     """
-    if not text or not text.strip():
-        return False
-
-    if _scanner is None:
-        # Gracefully handle missing dependencies
-        return False
-
-    try:
-        # Create a user message and scan it using asyncio.run() as in official example
-        message = UserMessage(text)
-        result = asyncio.run(_scanner.scan(message))
-
-        # Return True if scanner decided to block
-        return bool(result.decision == LlamaDecision.BLOCK)
-    except Exception:
-        # Return False on any scanning errors to avoid blocking valid content
-        return False
+    return match_regex(text) is not None
@@ -5,8 +5,6 @@ This policy scans all string arguments in every tool call for Personally
 Identifiable Information (PII) and blocks the call if any is found.
 """
 
-from typing import Any
-
 from tramlines.guardrail.dsl.predicates import custom
 from tramlines.guardrail.dsl.rules import rule
 from tramlines.guardrail.dsl.types import Policy
@@ -16,24 +14,10 @@ from tramlines.session import CallHistory, ToolCall
 
 def _contains_pii_in_args(current_call: ToolCall, session_history: CallHistory) -> bool:
     """
-    Recursively scans arguments of a tool call for PII in string values.
+    Scans the free-text leaves of a tool call's arguments for PII; identifier
+    and enum fields of the tool's schema are skipped.
     """
-
-    def scan_value(value: Any) -> bool:
-        if isinstance(value, str):
-            if detect_pii(value):
-                return True
-        elif isinstance(value, dict):
-            for v in value.values():
-                if scan_value(v):
-                    return True
-        elif isinstance(value, list):
-            for item in value:
-                if scan_value(item):
-                    return True
-        return False
-
-    return scan_value(current_call.arguments)
+    return any(detect_pii(leaf.value) for leaf in current_call.text_leaves)
 
 
 # The main policy object to be imported
@@ -5,8 +5,6 @@ This policy scans all string arguments in every tool call for known malicious
 or sensitive patterns using a regex scanner and blocks the call if any are found.
 """
 
-from typing import Any
-
 from tramlines.guardrail.dsl.predicates import custom
 from tramlines.guardrail.dsl.rules import rule
 from tramlines.guardrail.dsl.types import Policy
@@ -18,25 +16,10 @@ def _contains_known_patterns_in_args(
     current_call: ToolCall, session_history: CallHistory
 ) -> bool:
     """
-    Recursively scans arguments of a tool call for malicious/sensitive patterns
-    in string values using regex.
+    Scans the string leaves of a tool call's arguments for malicious/sensitive
+    patterns using regex.
     """
-
-    def scan_value(value: Any) -> bool:
-        if isinstance(value, str):
-            if detect_regex(value):
-                return True
-        elif isinstance(value, dict):
-            for v in value.values():
-                if scan_value(v):
-                    return True
-        elif isinstance(value, list):
-            for item in value:
-                if scan_value(item):
-                    return True
-        return False
-
-    return scan_value(current_call.arguments)
+    return any(detect_regex(leaf.value) for leaf in current_call.string_leaves)
 
 
 # The main policy object to be imported
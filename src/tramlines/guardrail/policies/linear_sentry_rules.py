@@ -3,9 +3,12 @@ Linear & Sentry Prompt Injection Protection Policy
 
 This policy scans all parameters of Linear and Sentry tool calls for
 prompt injection attempts and blocks any calls containing harmful input.
+The issues and events these tools return are scanned too, since indirect
+prompt injection arrives in tool results.
 Uses LlamaFirewall's PromptGuard to detect jailbreak attempts and malicious prompts.
 """
 
+from tramlines.guardrail.dsl.context import call, result
 from tramlines.guardrail.dsl.predicates import custom
 from tramlines.guardrail.dsl.rules import rule
 from tramlines.guardrail.dsl.types import Policy
@@ -38,17 +41,8 @@ def _contains_harmful_input_predicate(
     if current_call.name not in LINEAR_TOOLS + SENTRY_TOOLS:
         return False
 
-    # Check all parameter values for harmful content
-    for param_value in current_call.arguments.values():
-        if isinstance(param_value, str) and detect_prompt(param_value):
-            return True
-        # Also check nested structures like lists of strings
-        elif isinstance(param_value, list):
-            for item in param_value:
-                if isinstance(item, str) and detect_prompt(item):
-                    return True
-
-    return False
+    # Check free-text values, including those in nested lists and dicts
+    return any(detect_prompt(leaf.value) for leaf in current_call.text_leaves)
 
 
 def _linear_after_sentry_predicate(
@@ -105,6 +99,12 @@ policy = Policy(
         .block(
             "Access denied: Harmful or malicious input detected in tool parameters. Please ensure your input does not contain prompt injection attempts."
         ),
+        rule("Block harmful content in Linear/Sentry results")
+        .when(call.name.is_in(LINEAR_TOOLS + SENTRY_TOOLS))
+        .on_result(result.detected_by(detect_prompt))
+        .block(
+            "Access denied: The tool result contains a prompt injection attempt and was withheld."
+        ),
         rule("Block Linear calls after Sentry calls")
         .when(custom(_linear_after_sentry_predicate))
         .block(
@@ -4,6 +4,9 @@ Neon Database Policy
 This policy blocks the run_sql tool if it is called twice in any session.
 """
 
+import re
+
+from tramlines.guardrail.dsl.context import call
 from tramlines.guardrail.dsl.predicates import custom
 from tramlines.guardrail.dsl.rules import rule
 from tramlines.guardrail.dsl.types import Policy
@@ -14,21 +17,10 @@ NEON_DATABASE_TOOLS = [
 ]
 
 
-def _sql_contains_delete_command(
-    current_call: ToolCall, session_history: CallHistory
-) -> bool:
-    """
-    Check if the current run_sql call contains a DELETE command in the SQL statement.
-    """
-    # Only check run_sql calls
-    if current_call.name != "mcp_tramlines-proxy_run_sql":
-        return False
-
-    # Get the SQL parameter from the call
-    sql_statement = current_call.arguments.get("params", {}).get("sql", "")
-
-    # Check if SQL contains DELETE command (case insensitive)
-    return "DELETE" in sql_statement.upper()
+# Matches run_sql calls whose SQL statement contains a DELETE command
+_sql_contains_delete_command = (call.name == "mcp_tramlines-proxy_run_sql") & (
+    call.arg("params.sql").matches(re.compile("DELETE", re.IGNORECASE))
+)
 
 
 def _run_sql_called_twice(current_call: ToolCall, session_history: CallHistory) -> bool:
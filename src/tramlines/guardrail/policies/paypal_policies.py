@@ -105,7 +105,8 @@ create_policy_block_rule = (
     rule("Block create_policy tool")
     .when(
         custom(
-            lambda current_call, session_history: current_call.name == "create_policy"
+            lambda current_call, session_history: current_call.name == "create_policy",
+            name_only=True,
         )
     )
     .block("The create_policy tool is disabled and cannot be used.")
@@ -117,7 +118,7 @@ policy = Policy(
     description="Blocks all PayPal tools that cause mutations, allowing only read-only operations like listing and getting invoices.",
     rules=[
         rule("Block PayPal mutation tools")
-        .when(custom(_is_mutation_tool_predicate))
+        .when(custom(_is_mutation_tool_predicate, name_only=True))
         .block(
             "Access denied: PayPal mutation operations are not allowed. Only read-only operations (list_invoices, get_invoice) are permitted."
         ),
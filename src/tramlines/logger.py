@@ -1,6 +1,29 @@
+import atexit
+import gzip
+import os
+import queue
+import re
+import shutil
 import sys
+import threading
 import time
 from pathlib import Path
+from typing import IO, Any
+
+LEVELS = {"DEBUG": 10, "INFO": 20, "WARNING": 30, "ERROR": 40}
+
+# Lines at or above this level are rate limited per tag (the upper-case word
+# before the first " | "), so an error repeated on every call cannot flood the
+# log. Untagged lines share one limit, so message text cannot grow the table.
+_RATE_LIMITED_LEVEL = LEVELS["WARNING"]
+_TAG = re.compile(r"[A-Z][A-Z0-9_]*")
+_UNTAGGED = "untagged"
+
+# Rate windows tracked before those that have ended are dropped
+_MAX_RATE_KEYS = 1024
+
+# Marks the end of the queue when the writer thread is asked to stop
+_STOP = object()
 
 # ---------------------------------------------------------------------------
 # Simple singleton logger implementation
@@ -8,44 +31,316 @@ from pathlib import Path
 
 
 class _TramlinesLogger:
-    def __init__(self) -> None:
+    """
+    Writes log lines to ~/.tramlines/logs/tramlines.log and to stderr.
+
+    Callers only filter by level and enqueue; a background thread formats the
+    lines, writes them in batches with one flush per batch, and rotates the
+    file when it grows past `max_bytes` or every `rotate_interval` seconds,
+    keeping the last `backups` rotated files gzipped.
+    """
+
+    def __init__(
+        self,
+        log_dir: Path | None = None,
+        level: str | None = None,
+        max_bytes: int = 10 * 1024 * 1024,
+        rotate_interval: float = 24 * 3600.0,
+        backups: int = 5,
+        rate_limit: int = 10,
+        rate_window: float = 60.0,
+        max_queued: int = 10_000,
+        echo: bool = True,
+    ) -> None:
         self.tramlines_home = Path.home() / ".tramlines"
-        self.log_dir = self.tramlines_home / "logs"
+        self.log_dir = log_dir or self.tramlines_home / "logs"
         self.log_dir.mkdir(parents=True, exist_ok=True)
         self.log_file = self.log_dir / "tramlines.log"
+        self.level = LEVELS[
+            (level or os.environ.get("TRAMLINES_LOG_LEVEL") or "INFO").upper()
+        ]
+        self.max_bytes = max_bytes
+        self.rotate_interval = rotate_interval
+        self.backups = backups
+        self.rate_limit = rate_limit
+        self.rate_window = rate_window
+        self.echo = echo
+
+        self._queue: queue.Queue = queue.Queue(maxsize=max_queued)
+        self._thread: threading.Thread | None = None
+        self._lock = threading.Lock()
+        # Tag -> [window start, lines in window, lines suppressed]
+        self._rates: dict[tuple[str, str], list] = {}
+        self._dropped = 0
+        self._exit_hook = False
+
+        # Writer thread state
+        self._file: IO[str] | None = None
+        self._size = 0
+        self._period = 0
+        self._stamp_second = -1
+        self._stamp = ""
+
+    # ---------------------------------------------------------------------
+    # Configuration
+    # ---------------------------------------------------------------------
+
+    def configure(self, level: str | None = None, **settings: Any) -> None:
+        """Change the level or rotation settings, e.g. from the CLI."""
+        if level is not None:
+            self.level = LEVELS[level.upper()]
+        for name, value in settings.items():
+            if not hasattr(self, name):
+                raise AttributeError(f"Unknown logger setting {name!r}")
+            setattr(self, name, value)
+
+    def is_enabled(self, level: str) -> bool:
+        """Whether lines at this level are written at all."""
+        return LEVELS[level] >= self.level
 
     # ---------------------------------------------------------------------
     # Logging helpers
     # ---------------------------------------------------------------------
 
-    def _write(self, level: str, message: str) -> None:  # noqa: D401
-        """Compose and emit a single log line."""
+    def _write(self, level: str, message: str, args: tuple) -> None:  # noqa: D401
+        """Queue a single log line for the writer thread."""
+        if LEVELS[level] < self.level:
+            return
+        created = time.time()
+        if LEVELS[level] >= _RATE_LIMITED_LEVEL and not self._admit(level, message):
+            return
+        if self._thread is None or not self._thread.is_alive():
+            self._start()
         try:
-            timestamp = time.strftime("%Y-%m-%d %H:%M:%S")
-            log_message = f"{timestamp} | {level} | {message}"
+            self._queue.put_nowait((created, level, message, args))
+        except queue.Full:
+            # Never block a request on logging; report the loss later
+            self._dropped += 1
 
-            # File output --------------------------------------------------
-            with self.log_file.open("a") as fp:
-                fp.write(log_message + "\n")
+    def _admit(self, level: str, message: str) -> bool:
+        """Apply the per-tag rate limit, noting how many lines were held back."""
+        head, separator, _ = message.partition(" | ")
+        tag = head if separator and _TAG.fullmatch(head) else _UNTAGGED
+        key = (level, tag)
+        now = time.monotonic()
+        with self._lock:
+            state = self._rates.get(key)
+            if state is None or now - state[0] >= self.rate_window:
+                suppressed = state[2] if state is not None else 0
+                if state is None and len(self._rates) >= _MAX_RATE_KEYS:
+                    self._drop_ended_windows(now)
+                self._rates[key] = [now, 1, 0]
+                if suppressed:
+                    self._queue_summary(key, suppressed)
+                return True
+            if state[1] < self.rate_limit:
+                state[1] += 1
+                return True
+            state[2] += 1
+            return False
 
-            # Stderr echo --------------------------------------------------
-            print(log_message, file=sys.stderr)
-        except Exception:  # pragma: no cover – never fail on logging
-            print(message, file=sys.stderr)
+    def _drop_ended_windows(self, now: float) -> None:
+        ended = [
+            key
+            for key, state in self._rates.items()
+            if now - state[0] >= self.rate_window
+        ]
+        for key in ended:
+            suppressed = self._rates.pop(key)[2]
+            if suppressed:
+                self._queue_summary(key, suppressed)
+
+    def _queue_summary(self, key: tuple[str, str], suppressed: int) -> None:
+        level, tag = key
+        message = (
+            f"LOG_SUPPRESSED | {suppressed} more '{tag}' lines in "
+            f"{self.rate_window:g}s were not written"
+        )
+        try:
+            self._queue.put_nowait((time.time(), level, message, ()))
+        except queue.Full:
+            self._dropped += 1
 
     # Public helpers -------------------------------------------------------
+    #
+    # Messages may use %-style placeholders; arguments are only formatted, on
+    # the writer thread, if the line is written at all.
+
+    def debug(self, message: str, *args: object) -> None:  # noqa: D401
+        self._write("DEBUG", message, args)
+
+    def info(self, message: str, *args: object) -> None:  # noqa: D401
+        self._write("INFO", message, args)
 
-    def debug(self, message: str) -> None:  # noqa: D401
-        self._write("DEBUG", message)
+    def warning(self, message: str, *args: object) -> None:  # noqa: D401
+        self._write("WARNING", message, args)
 
-    def info(self, message: str) -> None:  # noqa: D401
-        self._write("INFO", message)
+    def error(self, message: str, *args: object) -> None:  # noqa: D401
+        self._write("ERROR", message, args)
 
-    def warning(self, message: str) -> None:  # noqa: D401
-        self._write("WARNING", message)
+    def flush(self, timeout: float = 5.0) -> None:
+        """Wait until every line queued so far has been written."""
+        if self._thread is None or not self._thread.is_alive():
+            return
+        done = threading.Event()
+        self._queue.put(done)
+        done.wait(timeout)
+
+    def close(self, timeout: float = 5.0) -> None:
+        """Write out pending lines, including rate limit summaries, and stop."""
+        with self._lock:
+            pending = [(key, state[2]) for key, state in self._rates.items()]
+            self._rates.clear()
+        for key, suppressed in pending:
+            if suppressed:
+                self._queue_summary(key, suppressed)
+        thread = self._thread
+        if thread is None or not thread.is_alive():
+            return
+        self._queue.put(_STOP)
+        thread.join(timeout)
+
+    # ---------------------------------------------------------------------
+    # Writer thread
+    # ---------------------------------------------------------------------
+
+    def _start(self) -> None:
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._thread = threading.Thread(
+                target=self._run, name="tramlines-log-writer", daemon=True
+            )
+            self._thread.start()
+            if not self._exit_hook:
+                atexit.register(self.close)
+                self._exit_hook = True
+
+    def _run(self) -> None:
+        while True:
+            batch = [self._queue.get()]
+            # Take whatever else is already waiting, up to a bound
+            while len(batch) < 1000:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            stop = self._write_batch(batch)
+            if stop:
+                self._close_file()
+                return
+
+    def _write_batch(self, batch: list) -> bool:
+        lines = []
+        waiters = []
+        stop = False
+        if self._dropped:
+            dropped, self._dropped = self._dropped, 0
+            lines.append(
+                self._format(
+                    time.time(), "WARNING", "LOG_DROPPED | %d lines", (dropped,)
+                )
+            )
+        for item in batch:
+            if item is _STOP:
+                stop = True
+            elif isinstance(item, threading.Event):
+                waiters.append(item)
+            else:
+                lines.append(self._format(*item))
+
+        if lines:
+            text = "".join(lines)
+            try:
+                self._write_file(text, batch_time=time.time())
+            except Exception:  # pragma: no cover – never fail on logging
+                pass
+            if self.echo:
+                try:
+                    sys.stderr.write(text)
+                    sys.stderr.flush()
+                except Exception:  # pragma: no cover – never fail on logging
+                    pass
+        for waiter in waiters:
+            waiter.set()
+        return stop
+
+    def _format(self, created: float, level: str, message: str, args: tuple) -> str:
+        if args:
+            try:
+                message = message % args
+            except Exception:  # pragma: no cover – never fail on logging
+                message = f"{message} {args}"
+        second = int(created)
+        if second != self._stamp_second:
+            self._stamp_second = second
+            self._stamp = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(second))
+        return f"{self._stamp} | {level} | {message}\n"
+
+    def _period_of(self, timestamp: float) -> int:
+        # Counted in local time, so daily rotation happens at local midnight
+        offset = time.localtime(timestamp).tm_gmtoff
+        return int((timestamp + offset) // self.rotate_interval)
+
+    def _write_file(self, text: str, batch_time: float) -> None:
+        if self._file is not None and self._replaced():
+            # Another process rotated the file
+            self._close_file()
+        if self._file is None:
+            self._open_file()
+        if self._size and (
+            self._size + len(text) > self.max_bytes
+            or self._period_of(batch_time) != self._period
+        ):
+            self._rotate()
+            self._open_file()
+        assert self._file is not None
+        self._file.write(text)
+        self._file.flush()
+        self._size += len(text)
+
+    def _open_file(self) -> None:
+        self._file = self.log_file.open("a")
+        stat = os.fstat(self._file.fileno())
+        self._size = stat.st_size
+        self._period = self._period_of(stat.st_mtime if stat.st_size else time.time())
+
+    def _replaced(self) -> bool:
+        assert self._file is not None
+        try:
+            return os.stat(self.log_file).st_ino != os.fstat(self._file.fileno()).st_ino
+        except FileNotFoundError:
+            return True
+
+    def _close_file(self) -> None:
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def _rotate(self) -> None:
+        """Compress the current file into a dated backup and prune old ones."""
+        self._close_file()
+        stamp = time.strftime("%Y%m%d-%H%M%S")
+        backup = self.log_dir / f"tramlines-{stamp}.log.gz"
+        counter = 1
+        while backup.exists():
+            backup = self.log_dir / f"tramlines-{stamp}-{counter}.log.gz"
+            counter += 1
+        rotated = self.log_file.with_suffix(".log.rotating")
+        try:
+            os.replace(self.log_file, rotated)
+        except FileNotFoundError:
+            return
+        with rotated.open("rb") as source, gzip.open(backup, "wb") as target:
+            shutil.copyfileobj(source, target)
+        rotated.unlink()
 
-    def error(self, message: str) -> None:  # noqa: D401
-        self._write("ERROR", message)
+        backups = sorted(
+            self.log_dir.glob("tramlines-*.log.gz"),
+            key=lambda path: (path.stat().st_mtime, path.name),
+        )
+        for old in backups[: max(len(backups) - self.backups, 0)]:
+            old.unlink(missing_ok=True)
 
 
 # Export a single shared instance that the rest of the codebase can import.
@@ -0,0 +1,476 @@
+"""
+Gateway metrics in the Prometheus text exposition format.
+
+Metrics are registered once in a Registry and updated in place: an update is
+a dict lookup for the label values and an addition, with no locks. Updates
+come from the event loop thread, so they are not contended; the rare update
+from a worker thread may at worst lose an increment. Values kept elsewhere,
+such as session and cache statistics, are read by callbacks when the metrics
+are rendered, so they cost nothing on the request path.
+
+The rendered text can be served on a local HTTP endpoint for scraping, or
+written to a file periodically for the node_exporter textfile collector.
+"""
+
+import functools
+import os
+import threading
+import time
+import urllib.request
+from bisect import bisect_left
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Callable, Iterable, Sequence, TypeVar
+
+from tramlines import tracing
+from tramlines.logger import logger
+
+# Upper bounds, in seconds, of the default latency histogram buckets
+LATENCY_BUCKETS = (
+    0.0001,
+    0.00025,
+    0.0005,
+    0.001,
+    0.0025,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+    30.0,
+)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Tool label for calls to tools the gateway has not listed
+UNKNOWN_TOOL = "unknown"
+
+# Gauges read from the session store; with a store shared by several worker
+# processes, each of them reports the whole store
+SESSION_STORE_GAUGES = ("tramlines_active_sessions", "tramlines_history_calls")
+
+M = TypeVar("M", bound="Metric")
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _label_text(names: Sequence[str], values: Sequence[str]) -> str:
+    if not names:
+        return ""
+    pairs = ",".join(
+        f'{name}="{_escape(str(value))}"' for name, value in zip(names, values)
+    )
+    return "{" + pairs + "}"
+
+
+def _number(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if value != int(value) else str(int(value))
+
+
+class _CounterValue:
+    __slots__ = ("value",)
+
+    def __init__(self) -> None:
+        self.value = 0.0
+
+    def inc(self, amount: float = 1.0) -> None:
+        self.value += amount
+
+
+class _GaugeValue(_CounterValue):
+    __slots__ = ()
+
+    def set(self, value: float) -> None:
+        self.value = value
+
+    def dec(self, amount: float = 1.0) -> None:
+        self.value -= amount
+
+
+class _HistogramValue:
+    __slots__ = ("buckets", "counts", "sum", "count")
+
+    def __init__(self, buckets: tuple[float, ...]) -> None:
+        self.buckets = buckets
+        # counts[i] observations fell in bucket i; the last is +Inf
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+
+class Metric:
+    """A named metric family, with one value per combination of label values."""
+
+    type = "untyped"
+
+    def __init__(self, name: str, help: str, labels: Sequence[str] = ()):
+        self.name = name
+        self.help = help
+        self.label_names = tuple(labels)
+        self._values: dict[tuple[str, ...], object] = {}
+
+    def _new_value(self) -> object:
+        raise NotImplementedError
+
+    def labels(self, *values: str):
+        """The value for these label values, created on first use."""
+        value = self._values.get(values)
+        if value is None:
+            if len(values) != len(self.label_names):
+                raise ValueError(
+                    f"{self.name} takes labels {self.label_names}, got {values}"
+                )
+            # setdefault, so two threads creating it at once share one value
+            value = self._values.setdefault(values, self._new_value())
+        return value
+
+    def samples(self) -> Iterable[tuple[str, tuple[str, ...], float]]:
+        """(suffix, label values, value) for every sample of the family."""
+        raise NotImplementedError
+
+    def render(self) -> str:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.type}"]
+        for suffix, label_values, value in self.samples():
+            names = self.label_names
+            if suffix == "_bucket":
+                names = (*names, "le")
+            lines.append(
+                f"{self.name}{suffix}{_label_text(names, label_values)} "
+                f"{_number(value)}"
+            )
+        return "\n".join(lines) + "\n"
+
+
+class Counter(Metric):
+    """A value that only goes up, such as a number of calls."""
+
+    type = "counter"
+
+    def _new_value(self) -> _CounterValue:
+        return _CounterValue()
+
+    def inc(self, amount: float = 1.0) -> None:
+        """Increment the unlabelled value."""
+        self.labels().inc(amount)
+
+    def samples(self):
+        # Copied first: rendering runs on another thread than the updates
+        for label_values, value in list(self._values.items()):
+            yield "", label_values, value.value  # type: ignore[attr-defined]
+
+
+class Gauge(Counter):
+    """A value that goes up and down, such as a number of open sessions."""
+
+    type = "gauge"
+
+    def _new_value(self) -> _GaugeValue:
+        return _GaugeValue()
+
+    def set(self, value: float) -> None:
+        """Set the unlabelled value."""
+        self.labels().set(value)
+
+
+class Histogram(Metric):
+    """A distribution of observed values, such as latencies in seconds."""
+
+    type = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        help: str,
+        labels: Sequence[str] = (),
+        buckets: Sequence[float] = LATENCY_BUCKETS,
+    ):
+        super().__init__(name, help, labels)
+        self.buckets = tuple(sorted(buckets))
+
+    def _new_value(self) -> _HistogramValue:
+        return _HistogramValue(self.buckets)
+
+    def observe(self, value: float) -> None:
+        """Record an observation of the unlabelled value."""
+        self.labels().observe(value)
+
+    def samples(self):
+        for label_values, value in list(self._values.items()):
+            cumulative = 0
+            bounds = (*self.buckets, float("inf"))
+            for bound, count in zip(bounds, value.counts):  # type: ignore[attr-defined]
+                cumulative += count
+                yield "_bucket", (*label_values, _number(bound)), cumulative
+            yield "_sum", label_values, value.sum  # type: ignore[attr-defined]
+            yield "_count", label_values, value.count  # type: ignore[attr-defined]
+
+
+class CallbackMetric(Metric):
+    """A counter or gauge whose values are read from elsewhere when rendered."""
+
+    def __init__(
+        self,
+        name: str,
+        help: str,
+        callback: Callable[[], float | dict[tuple[str, ...], float]],
+        labels: Sequence[str] = (),
+        type: str = "gauge",
+    ):
+        super().__init__(name, help, labels)
+        self.type = type
+        self.callback = callback
+
+    def samples(self):
+        values = self.callback()
+        if not isinstance(values, dict):
+            values = {(): values}
+        for label_values, value in values.items():
+            yield "", label_values, value
+
+
+class Registry:
+    """The set of metrics exposed together."""
+
+    def __init__(self) -> None:
+        self._metrics: dict[str, Metric] = {}
+
+    def register(self, metric: M) -> M:
+        """Add a metric, replacing any earlier one of the same name."""
+        self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, help: str, labels: Sequence[str] = ()) -> Counter:
+        return self.register(Counter(name, help, labels))
+
+    def gauge(self, name: str, help: str, labels: Sequence[str] = ()) -> Gauge:
+        return self.register(Gauge(name, help, labels))
+
+    def histogram(
+        self,
+        name: str,
+        help: str,
+        labels: Sequence[str] = (),
+        buckets: Sequence[float] = LATENCY_BUCKETS,
+    ) -> Histogram:
+        return self.register(Histogram(name, help, labels, buckets))
+
+    def callback(
+        self,
+        name: str,
+        help: str,
+        callback: Callable[[], float | dict[tuple[str, ...], float]],
+        labels: Sequence[str] = (),
+        type: str = "gauge",
+    ) -> CallbackMetric:
+        return self.register(CallbackMetric(name, help, callback, labels, type))
+
+    def get(self, name: str) -> Metric | None:
+        return self._metrics.get(name)
+
+    def render(self) -> str:
+        """All metrics in the Prometheus text exposition format."""
+        parts = []
+        for metric in list(self._metrics.values()):
+            try:
+                parts.append(metric.render())
+            except Exception as e:
+                logger.error(f"METRICS_ERROR | Failed to render {metric.name}: {e}")
+        return "".join(parts)
+
+
+# The gateway's metrics, shared by every module that records them
+REGISTRY = Registry()
+
+TOOL_CALLS = REGISTRY.counter(
+    "tramlines_tool_calls_total",
+    "Tool calls handled, by tool and decision",
+    ("tool", "decision"),
+)
+POLICY_SECONDS = REGISTRY.histogram(
+    "tramlines_policy_evaluation_seconds",
+    "Time to evaluate the policy for a call or its result",
+    ("phase",),
+)
+RULE_SECONDS = REGISTRY.histogram(
+    "tramlines_rule_evaluation_seconds",
+    "Time spent evaluating each rule for a call or scanning a result",
+    ("rule", "phase"),
+)
+RULE_BLOCKS = REGISTRY.counter(
+    "tramlines_rule_blocks_total",
+    "Calls and results blocked, by rule",
+    ("rule", "phase"),
+)
+DETECTOR_SECONDS = REGISTRY.histogram(
+    "tramlines_detector_seconds",
+    "Time spent in each text detector per scanned text",
+    ("detector",),
+)
+UPSTREAM_SECONDS = REGISTRY.histogram(
+    "tramlines_upstream_seconds",
+    "Time for upstream servers to execute tool calls",
+    ("tool", "server"),
+)
+
+
+def timed_detector(name: str):
+    """Decorate a detector function to record its run time, and trace its runs."""
+    histogram = DETECTOR_SECONDS.labels(name)
+    span_name = f"detector.{name}"
+
+    def decorate(detect):
+        @functools.wraps(detect)
+        def timed(text, *args, **kwargs):
+            started = time.perf_counter()
+            try:
+                with tracing.span(span_name):
+                    return detect(text, *args, **kwargs)
+            finally:
+                histogram.observe(time.perf_counter() - started)
+
+        return timed
+
+    return decorate
+
+
+# ---------------------------------------------------------------------------
+# Exposition
+# ---------------------------------------------------------------------------
+
+
+def serve_metrics(
+    port: int,
+    host: str = "127.0.0.1",
+    registry: Registry = REGISTRY,
+    render: Callable[[], str] | None = None,
+) -> ThreadingHTTPServer:
+    """
+    Serve GET /metrics on host:port from a background thread.
+
+    The exposition is the registry's, unless `render` is given to build it.
+    """
+    exposition = render or registry.render
+
+    class MetricsHandler(BaseHTTPRequestHandler):
+        def do_GET(self) -> None:
+            if self.path.split("?", 1)[0] != "/metrics":
+                self.send_error(404)
+                return
+            body = exposition().encode()
+            self.send_response(200)
+            self.send_header("Content-Type", CONTENT_TYPE)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format: str, *args: object) -> None:
+            return None
+
+    server = ThreadingHTTPServer((host, port), MetricsHandler)
+    server.daemon_threads = True
+    threading.Thread(
+        target=server.serve_forever, name="tramlines-metrics", daemon=True
+    ).start()
+    logger.info(f"METRICS_SERVE | http://{host}:{server.server_port}/metrics")
+    return server
+
+
+def merge_expositions(texts: Iterable[str], shared: Iterable[str] = ()) -> str:
+    """
+    Sum the expositions of several processes into one.
+
+    Samples with the same name and labels are added up, which is right for
+    counters, histograms and gauges of each process's own state. Families
+    named in `shared` are gauges of state every process reads, such as a
+    shared session store; summing them would count it once per process, so
+    the largest value is kept instead.
+    """
+    shared = frozenset(shared)
+    families: dict[str, tuple[list[str], dict[str, float]]] = {}
+    for text in texts:
+        family = None
+        for line in text.splitlines():
+            if line.startswith("# "):
+                name = line.split(" ", 3)[2]
+                family = families.setdefault(name, ([], {}))
+                if line not in family[0]:
+                    family[0].append(line)
+            elif line and family is not None:
+                sample, text_value = line.rsplit(" ", 1)
+                samples, value = family[1], float(text_value)
+                if name in shared:
+                    samples[sample] = max(samples.get(sample, value), value)
+                else:
+                    samples[sample] = samples.get(sample, 0.0) + value
+    lines = []
+    for comments, samples in families.values():
+        lines.extend(comments)
+        lines.extend(f"{sample} {_number(value)}" for sample, value in samples.items())
+    return "\n".join(lines) + "\n" if lines else ""
+
+
+def serve_merged_metrics(
+    port: int,
+    urls: Sequence[str],
+    host: str = "127.0.0.1",
+    shared: Iterable[str] = (),
+) -> ThreadingHTTPServer:
+    """
+    Serve the sum of the metrics served at each of `urls` on host:port.
+
+    `shared` names gauges that are reported once, see `merge_expositions`.
+    """
+    shared = frozenset(shared)
+
+    def render() -> str:
+        texts = []
+        for url in urls:
+            try:
+                with urllib.request.urlopen(url, timeout=5) as response:
+                    texts.append(response.read().decode())
+            except OSError as e:
+                logger.warning(f"METRICS_ERROR | Cannot scrape {url}: {e}")
+        return merge_expositions(texts, shared)
+
+    return serve_metrics(port, host, render=render)
+
+
+def write_metrics_file(path: Path, registry: Registry = REGISTRY) -> None:
+    """Write the metrics to path, replacing it atomically."""
+    temporary = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+    temporary.write_text(registry.render())
+    os.replace(temporary, path)
+
+
+def export_metrics_file(
+    path: Path, interval: float = 15.0, registry: Registry = REGISTRY
+) -> threading.Thread:
+    """Rewrite the metrics file every interval seconds from a background thread."""
+    path.parent.mkdir(parents=True, exist_ok=True)
+
+    def export() -> None:
+        while True:
+            try:
+                write_metrics_file(path, registry)
+            except OSError as e:
+                logger.error(f"METRICS_ERROR | Failed to write {path}: {e}")
+            time.sleep(interval)
+
+    thread = threading.Thread(target=export, name="tramlines-metrics-file", daemon=True)
+    thread.start()
+    return thread
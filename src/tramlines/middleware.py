@@ -1,68 +1,138 @@
+import asyncio
 import time
-from datetime import datetime, timedelta
-from typing import Dict
+from contextvars import ContextVar
+from datetime import timedelta
+from typing import Callable
 
 import mcp.types as mt
 from fastmcp.exceptions import ToolError
 from fastmcp.server.dependencies import get_context
 from fastmcp.server.middleware import Middleware, MiddlewareContext
 
-from tramlines.guardrail.dsl.evaluator import evaluate_call
+from tramlines import tracing
+from tramlines.audit import AuditLog, AuditRecord
+from tramlines.coalescing import RequestCoalescer
+from tramlines.guardrail.dsl.evaluator import (
+    evaluate_call,
+    evaluate_result,
+    has_result_rules,
+    static_block_rule,
+)
 from tramlines.guardrail.dsl.types import Policy
+from tramlines.guardrail.extensions import detector_invocations
 from tramlines.logger import logger
+from tramlines.metrics import (
+    POLICY_SECONDS,
+    REGISTRY,
+    RULE_BLOCKS,
+    TOOL_CALLS,
+    UNKNOWN_TOOL,
+    UPSTREAM_SECONDS,
+)
+from tramlines.response_cache import ResponseCache
+from tramlines.result_limits import ResultLimiter
+from tramlines.schema import ToolSchemas, tool_key
 from tramlines.session import CallHistory, CallStatus, ToolCall
+from tramlines.session_store import InMemorySessionStore, SessionStore
+
+# Session ID for transports that carry one MCP session per connection but no
+# session header, such as clients attached to the local daemon
+connection_session_id: ContextVar[str | None] = ContextVar(
+    "connection_session_id", default=None
+)
+
+
+def _elapsed_ms(since: float) -> float:
+    return round((time.perf_counter() - since) * 1000, 3)
 
 
 class SessionManager:
-    """Manages session-based call histories with automatic cleanup."""
+    """
+    Resolves sessions and manages their call histories in a session store.
 
-    def __init__(self, max_calls_per_session: int = 30, cleanup_hours: int = 24):
+    Histories live in the configured SessionStore (process-local by default);
+    idle sessions are expired by a background task off the request path.
+    """
+
+    def __init__(
+        self,
+        max_calls_per_session: int = 30,
+        cleanup_hours: int = 24,
+        max_sessions: int = 10_000,
+        sweep_interval_seconds: float = 60.0,
+        store: SessionStore | None = None,
+    ):
         self.max_calls_per_session = max_calls_per_session
         self.cleanup_interval = timedelta(hours=cleanup_hours)
-        self.histories: Dict[str, CallHistory] = {}
-        self.last_cleanup = datetime.now()
+        self.sweep_interval_seconds = sweep_interval_seconds
+        self.store = store or InMemorySessionStore(
+            max_calls_per_session=max_calls_per_session, max_sessions=max_sessions
+        )
+        self._expiry_task: asyncio.Task | None = None
 
     def get_session_id(self) -> str:
         """Get session ID from FastMCP context with fallbacks."""
         try:
             context = get_context()
-            return context.session_id or context.client_id or "default_session"
+            return (
+                context.session_id
+                or context.client_id
+                or connection_session_id.get()
+                or "default_session"
+            )
         except RuntimeError:
             return "fallback_session"
 
     def get_history(self, session_id: str) -> CallHistory:
         """Get or create call history for session."""
-        if session_id not in self.histories:
-            self.histories[session_id] = CallHistory(
-                max_calls=self.max_calls_per_session
-            )
-            logger.debug(
-                f"SESSION_CREATE | session_id={session_id} | Creating new call history"
-            )
-        return self.histories[session_id]
+        return self.store.get_history(session_id)
+
+    def record_call(self, session_id: str, call: ToolCall) -> None:
+        """Persist a finished call to the session store."""
+        self.store.record_call(session_id, call)
+
+    async def load_history(self, session_id: str) -> CallHistory:
+        """get_history, run off the event loop if the store may block."""
+        if self.store.blocking:
+            return await asyncio.to_thread(self.store.get_history, session_id)
+        return self.store.get_history(session_id)
+
+    async def save_call(self, session_id: str, call: ToolCall) -> None:
+        """record_call, run off the event loop if the store may block."""
+        if self.store.blocking:
+            await asyncio.to_thread(self.store.record_call, session_id, call)
+        else:
+            self.store.record_call(session_id, call)
 
     def cleanup_stale_sessions(self) -> None:
         """Remove sessions inactive beyond cleanup interval."""
-        if datetime.now() - self.last_cleanup < self.cleanup_interval:
-            return
+        self.store.expire(self.cleanup_interval.total_seconds())
 
-        cutoff = datetime.now() - self.cleanup_interval
-        stale = [
-            sid
-            for sid, hist in self.histories.items()
-            if not hist.calls or hist.calls[-1].timestamp < cutoff
-        ]
+    def start_expiry(self) -> None:
+        """Start the background expiry task on the running event loop, once."""
+        loop = asyncio.get_running_loop()
+        task = self._expiry_task
+        if task is None or task.done() or task.get_loop() is not loop:
+            self._expiry_task = loop.create_task(self._expire_periodically())
 
-        for session_id in stale:
-            del self.histories[session_id]
+    async def _expire_periodically(self) -> None:
+        while True:
+            await asyncio.sleep(self.sweep_interval_seconds)
+            if self.store.blocking:
+                await asyncio.to_thread(self.cleanup_stale_sessions)
+            else:
+                self.cleanup_stale_sessions()
 
-        self.last_cleanup = datetime.now()
+    def stop_expiry(self) -> None:
+        """Cancel the background expiry task if it is running."""
+        if self._expiry_task is not None:
+            self._expiry_task.cancel()
+            self._expiry_task = None
 
     def stats(self) -> dict:
         """Get session statistics."""
         return {
-            "active_sessions": len(self.histories),
-            "total_calls": sum(len(h.calls) for h in self.histories.values()),
+            **self.store.stats(),
             "max_calls_per_session": self.max_calls_per_session,
         }
 
@@ -79,58 +149,376 @@ class GuardRailMiddleware(Middleware):
         self,
         policy: Policy | None = None,
         disabled_tools: list[str] | None = None,
+        discovery_ttl: float = 300.0,
+        validate_arguments: bool = True,
+        response_cache: ResponseCache | None = None,
+        coalesce: bool = True,
+        coalesce_tools: list[str] | None = None,
+        result_limiter: ResultLimiter | None = None,
+        audit_log: AuditLog | None = None,
         **kwargs,
     ):
         self.policy = policy
         self.disabled_tools = set(disabled_tools or [])
+        self.discovery_ttl = discovery_ttl
+        self.validate_arguments = validate_arguments
+        # Compiled from each tool listing, for validation and scanning scope
+        self.schemas = ToolSchemas(
+            scan_fields=policy.scan_fields if policy else (),
+            skip_fields=policy.skip_fields if policy else (),
+            validated=validate_arguments,
+        )
+        # List method name -> (time filled, filtered listing)
+        self._discovery: dict[str, tuple[float, list]] = {}
+        self.discovery_hits = 0
+        self.discovery_misses = 0
+        # Opt-in; results are still subject to policy and recorded in history
+        self.response_cache = response_cache
+        # Shares one execution between identical concurrent idempotent calls
+        self.coalescer = RequestCoalescer(coalesce_tools or []) if coalesce else None
+        # Caps result sizes once the result rules have seen the whole result
+        self.result_limiter = result_limiter
+        # One record per tool call, written off the request path
+        self.audit_log = audit_log
+        # Maps a tool to the upstream server providing it, for metric labels
+        self.server_of: Callable[[str], str | None] = lambda tool_name: None
+        # Tools of the last listing; other names are clamped in metric labels
+        self._listed_tools: frozenset[str] = frozenset()
         self.sessions = SessionManager(**kwargs)
+        self._register_metrics()
 
     async def on_call_tool(
         self, context: MiddlewareContext[mt.CallToolRequestParams], call_next
     ) -> mt.CallToolResult:
         """Handle tool call with security and tracking."""
-        session_id = self.sessions.get_session_id()
-        history = self.sessions.get_history(session_id)
-        self.sessions.cleanup_stale_sessions()
+        name = context.message.name
+        # A traceparent in the request's _meta continues the client's trace
+        traceparent = getattr(context.message.meta, "traceparent", None)
+        with tracing.trace(f"tools/call {name}", traceparent, {"mcp.tool.name": name}):
+            return await self._call_tool(context, call_next)
+
+    async def _call_tool(
+        self, context: MiddlewareContext[mt.CallToolRequestParams], call_next
+    ) -> mt.CallToolResult:
+        started_at = time.time()
+        clock = time.perf_counter()
+        if self.validate_arguments:
+            with tracing.span("validate_arguments"):
+                error = self.schemas.validate(
+                    context.message.name, context.message.arguments or {}
+                )
+            if error is not None:
+                logger.info(
+                    f"ARGUMENTS_INVALID | tool={context.message.name} | {error}"
+                )
+                if self.audit_log is not None:
+                    await self.audit_log.record(
+                        AuditRecord(
+                            started_at,
+                            self.sessions.get_session_id(),
+                            context.message.name,
+                            context.message.arguments or {},
+                            "invalid",
+                            duration_ms=_elapsed_ms(clock),
+                        )
+                    )
+                TOOL_CALLS.labels(
+                    self._tool_label(context.message.name), "invalid"
+                ).inc()
+                tracing.annotate("tramlines.decision", "invalid")
+                raise ToolError(f"Invalid arguments: {error}")
+
+        with tracing.span("session"):
+            session_id = self.sessions.get_session_id()
+            history = await self.sessions.load_history(session_id)
+            self.sessions.start_expiry()
+        tracing.annotate("tramlines.session_id", session_id)
 
         tool_call = ToolCall(
-            name=context.message.name, arguments=context.message.arguments or {}
+            name=context.message.name,
+            arguments=context.message.arguments or {},
+            scan_scope=self.schemas.scan_scope(context.message.name),
         )
         history.add_call(tool_call)
 
-        # Step 1: Pre-execution guardrail evaluation (only if policy exists)
-        if self.policy:
-            result = evaluate_call(self.policy, history)
+        # Audited outcome: allow, block, result_block or error
+        decision = "error"
+        rule = None
+        policy_ms = None
+        try:
+            # Step 1: Pre-execution guardrail evaluation (only if policy exists)
+            if self.policy:
+                policy_clock = time.perf_counter()
+                with tracing.span("policy.call"):
+                    result = evaluate_call(self.policy, history)
+                POLICY_SECONDS.labels("call").observe(
+                    time.perf_counter() - policy_clock
+                )
+                policy_ms = _elapsed_ms(policy_clock)
+
+                if result.is_blocked:
+                    tool_call.status = CallStatus.BLOCK
+                    decision, rule = "block", result.violated_rule
+                    raise ToolError(f"Tool blocked by policy: {result.message}")
 
-            if result.is_blocked:
+            # Step 2: Execute the tool, or answer from the response cache
+            start_time = time.time()
+            try:
+                call_result = await self._execute(session_id, context, call_next)
+            except Exception:
                 tool_call.status = CallStatus.BLOCK
-                raise ToolError(f"Tool blocked by policy: {result.message}")
+                raise
+            finally:
+                tool_call.execution_duration = round(
+                    (time.time() - start_time) * 1000, 3
+                )
 
-        # Step 2: Execute the tool
-        start_time = time.time()
-        try:
-            call_result = await call_next(context)
-        except Exception:
-            tool_call.status = CallStatus.BLOCK
-            raise
+            # Step 3: Scan the result before it is forwarded
+            if self.policy and has_result_rules(self.policy):
+                result_clock = time.perf_counter()
+                with tracing.span("policy.result"):
+                    verdict = evaluate_result(
+                        self.policy, tool_call, history, call_result
+                    )
+                POLICY_SECONDS.labels("result").observe(
+                    time.perf_counter() - result_clock
+                )
+                if verdict.is_blocked:
+                    tool_call.status = CallStatus.BLOCK
+                    decision, rule = "result_block", verdict.violated_rule
+                    logger.warning(
+                        f"RESULT_BLOCKED | tool={tool_call.name} | "
+                        f"session_id={session_id} | rule='{verdict.violated_rule}'"
+                    )
+                    raise ToolError(f"Tool result blocked by policy: {verdict.message}")
+
+            # Step 4: Cut results over their size cap; spilling writes a file,
+            # so it runs off the event loop
+            limiter = self.result_limiter
+            if limiter is not None and limiter.exceeds(tool_call.name, call_result):
+                with tracing.span("result.limit"):
+                    call_result = await asyncio.to_thread(
+                        limiter.apply, tool_call.name, call_result
+                    )
+
+            # Step 5: If all checks passed, mark as allowed and return result
+            tool_call.status = CallStatus.ALLOW
+            decision = "allow"
+            return call_result  # type: ignore[no-any-return]
         finally:
-            tool_call.execution_duration = round((time.time() - start_time) * 1000, 3)
+            # Persist the call with its final status, whatever the outcome
+            await self.sessions.save_call(session_id, tool_call)
+            TOOL_CALLS.labels(self._tool_label(tool_call.name), decision).inc()
+            tracing.annotate("tramlines.decision", decision)
+            if rule is not None:
+                phase = "result" if decision == "result_block" else "call"
+                RULE_BLOCKS.labels(rule, phase).inc()
+                tracing.annotate("tramlines.rule", rule)
+            if self.audit_log is not None:
+                await self.audit_log.record(
+                    AuditRecord(
+                        started_at,
+                        session_id,
+                        tool_call.name,
+                        tool_call.arguments,
+                        decision,
+                        rule,
+                        duration_ms=_elapsed_ms(clock),
+                        policy_ms=policy_ms,
+                        upstream_ms=tool_call.execution_duration,
+                    )
+                )
+
+    async def _execute(
+        self,
+        session_id: str,
+        context: MiddlewareContext[mt.CallToolRequestParams],
+        call_next,
+    ):
+        name = context.message.name
+        arguments = context.message.arguments or {}
+        coalescer = self.coalescer
+        cache = self.response_cache
+
+        async def upstream():
+            server = self.server_of(name) or ""
+            started = time.perf_counter()
+            try:
+                with tracing.span(
+                    "upstream", {"tramlines.server": server}, tracing.KIND_CLIENT
+                ):
+                    return await call_next(context)
+            finally:
+                UPSTREAM_SECONDS.labels(self._tool_label(name), server).observe(
+                    time.perf_counter() - started
+                )
 
-        # Step 3: If all checks passed, mark as allowed and return result
-        tool_call.status = CallStatus.ALLOW
-        return call_result  # type: ignore[no-any-return]
+        async def execute():
+            if coalescer is None:
+                return await upstream()
+            return await coalescer.run(name, arguments, upstream)
+
+        if cache is None:
+            return await execute()
+
+        cached = cache.get(session_id, name, arguments)
+        if cached is not None:
+            logger.debug("CACHE_HIT | tool=%s | session_id=%s", name, session_id)
+            tracing.annotate("tramlines.cache_hit", True)
+            return cached
+        # A call that may write drops its server's cached reads, both before it
+        # runs and after, in case a read was cached while it was in flight
+        cache.note_call(name)
+        result = await execute()
+        cache.note_call(name)
+        cache.put(session_id, name, arguments, result)
+        return result
+
+    def _tool_label(self, tool_name: str) -> str:
+        """
+        The metric label for a tool, "unknown" for names not in the last
+        listing, so made-up tool names cannot grow the metrics without bound.
+        """
+        return tool_name if tool_name in self._listed_tools else UNKNOWN_TOOL
+
+    def _on_tools_listed(self, tools: list) -> None:
+        self._listed_tools = frozenset(tool_key(tool) for tool in tools)
+        self.schemas.update(tools)
+        if self.response_cache is not None:
+            self.response_cache.update_tools(tools)
+        if self.coalescer is not None:
+            self.coalescer.update_tools(tools)
+
+    async def _cached_listing(
+        self,
+        method: str,
+        context: MiddlewareContext,
+        call_next,
+        keep=None,
+        on_fill=None,
+    ) -> list:
+        """Serve a listing from memory, refilling it through call_next when stale."""
+        cached = self._discovery.get(method)
+        if cached is not None and time.monotonic() - cached[0] < self.discovery_ttl:
+            self.discovery_hits += 1
+            return cached[1]
+
+        self.discovery_misses += 1
+        result = await call_next(context)
+        if on_fill is not None:
+            on_fill(result)
+        listing = [item for item in result if keep(item)] if keep else list(result)
+        if self.discovery_ttl > 0:
+            self._discovery[method] = (time.monotonic(), listing)
+        return listing
+
+    def invalidate_discovery(self, *methods: str) -> None:
+        """Drop cached listings, e.g. when an upstream reports a list change."""
+        for method in methods or list(self._discovery):
+            self._discovery.pop(method, None)
+        if not methods or "list_tools" in methods:
+            self.schemas.clear()
 
     async def on_list_tools(
         self, context: MiddlewareContext[mt.ListToolsRequest], call_next
     ):
-        """Filter disabled tools."""
-        result = await call_next(context)
-        return (
-            [tool for tool in result if tool.name not in self.disabled_tools]
-            if self.disabled_tools
-            else result
+        """
+        Serve tool listings from cache, without disabled tools or tools the
+        policy blocks on name alone, which no call could ever get past.
+        """
+        return await self._cached_listing(
+            "list_tools",
+            context,
+            call_next,
+            keep=self._is_offered,
+            on_fill=self._on_tools_listed,
+        )
+
+    def _is_offered(self, tool) -> bool:
+        if tool.name in self.disabled_tools:
+            return False
+        if self.policy is None:
+            return True
+        # Probe with the name calls will carry, prefixed for mounted servers
+        name = tool_key(tool)
+        rule = static_block_rule(self.policy, name)
+        if rule is not None:
+            logger.debug(
+                "DISCOVERY_HIDE | tool=%s | Always blocked by '%s'", name, rule.name
+            )
+            return False
+        return True
+
+    async def on_list_resources(
+        self, context: MiddlewareContext[mt.ListResourcesRequest], call_next
+    ):
+        """Serve resource listings from cache."""
+        return await self._cached_listing("list_resources", context, call_next)
+
+    async def on_list_resource_templates(
+        self, context: MiddlewareContext[mt.ListResourceTemplatesRequest], call_next
+    ):
+        """Serve resource template listings from cache."""
+        return await self._cached_listing("list_resource_templates", context, call_next)
+
+    async def on_list_prompts(
+        self, context: MiddlewareContext[mt.ListPromptsRequest], call_next
+    ):
+        """Serve prompt listings from cache."""
+        return await self._cached_listing("list_prompts", context, call_next)
+
+    def _register_metrics(self) -> None:
+        """Expose this middleware's statistics, read when metrics are rendered."""
+        REGISTRY.callback(
+            "tramlines_active_sessions",
+            "Sessions with a call history",
+            lambda: self.sessions.stats()["active_sessions"],
+        )
+        REGISTRY.callback(
+            "tramlines_history_calls",
+            "Calls held in session histories",
+            lambda: self.sessions.stats()["total_calls"],
+        )
+        REGISTRY.callback(
+            "tramlines_discovery_requests_total",
+            "Listing requests, by whether they were served from memory",
+            lambda: {
+                ("hit",): self.discovery_hits,
+                ("miss",): self.discovery_misses,
+            },
+            labels=("result",),
+            type="counter",
+        )
+
+        def cache_lookups() -> dict:
+            stats = self.response_cache.stats() if self.response_cache else {}
+            return {
+                ("hit",): stats.get("hits", 0),
+                ("miss",): stats.get("misses", 0),
+            }
+
+        REGISTRY.callback(
+            "tramlines_response_cache_requests_total",
+            "Response cache lookups, by whether they found a fresh result",
+            cache_lookups,
+            labels=("result",),
+            type="counter",
+        )
+        REGISTRY.callback(
+            "tramlines_coalesced_calls_total",
+            "Tool calls that joined an identical call already in flight",
+            lambda: self.coalescer.coalesced if self.coalescer else 0,
+            type="counter",
         )
 
     def get_session_stats(self) -> dict:
         """Get session statistics."""
         return self.sessions.stats()
+
+    def get_scan_stats(self) -> dict:
+        """Get argument validation and text detector statistics."""
+        return {
+            "tool_schemas": len(self.schemas),
+            "rejected_arguments": self.schemas.rejected,
+            "detector_invocations": dict(detector_invocations),
+        }
@@ -1,17 +1,41 @@
-from typing import Any
+from contextlib import asynccontextmanager
+from pathlib import Path
+from typing import Any, AsyncIterator
 
 from fastmcp import FastMCP
-from fastmcp.client import Client
 
+from tramlines.audit import AuditLog
 from tramlines.guardrail.dsl.types import Policy
 from tramlines.logger import logger
 from tramlines.middleware import GuardRailMiddleware
+from tramlines.response_cache import ResponseCache
+from tramlines.result_limits import ResultLimiter
+from tramlines.session_store import SessionStore
+from tramlines.upstream import UpstreamManager
+
+# Last known tool listing of each upstream, used while a server is not running
+TOOL_CATALOGUE_PATH = Path.home() / ".tramlines" / "tool_catalogue.json"
 
 
 def create_guarded_proxy(
     mcp_config: dict[str, Any],
     policy: Policy | None = None,
     disabled_tools: list[str] = [],
+    session_store: SessionStore | None = None,
+    upstream_pool_size: int = 1,
+    upstream_spares: int = 0,
+    upstream_timeout: float = 30.0,
+    upstream_ready_timeout: float = 10.0,
+    lazy_upstreams: bool = False,
+    upstream_idle_timeout: float | None = None,
+    discovery_ttl: float = 300.0,
+    validate_arguments: bool = True,
+    response_cache: ResponseCache | None = None,
+    coalesce: bool = True,
+    coalesce_tools: list[str] | None = None,
+    result_limiter: ResultLimiter | None = None,
+    audit_log: AuditLog | None = None,
+    upstreams: UpstreamManager | None = None,
 ) -> FastMCP:
     """
     Create a FastMCP proxy with unified security middleware.
@@ -20,20 +44,70 @@ def create_guarded_proxy(
         mcp_config: MCP server configuration
         policy: Optional security policy to enforce
         disabled_tools: List of tools to disable
+        session_store: Optional shared session store (process-local by default)
+        upstream_pool_size: Persistent sessions to keep open per upstream server
+        upstream_spares: Initialized standby sessions to keep per upstream server
+        upstream_timeout: Seconds allowed for each upstream server to connect
+        upstream_ready_timeout: Longest wait for upstreams before serving starts
+        lazy_upstreams: Start upstreams on first use, listing cached tools until then
+        upstream_idle_timeout: Seconds without requests before an upstream stops
+        discovery_ttl: Seconds to serve tool/resource/prompt listings from memory
+        validate_arguments: Reject tool arguments that do not fit the tool's
+            inputSchema before evaluating policy or forwarding the call
+        response_cache: Optional cache for results of side-effect-free tools
+        coalesce: Share one upstream execution between identical concurrent
+            calls to tools annotated idempotent or read-only
+        coalesce_tools: Further tools whose identical concurrent calls are shared
+        result_limiter: Optional per-tool caps on the size of forwarded results
+        audit_log: Optional sink for one decision record per tool call
+        upstreams: Optional pre-built upstream manager, e.g. to read its stats
 
     Returns:
         FastMCP proxy server with security middleware applied
     """
-    client: Client = Client(mcp_config)
+    if upstreams is None:
+        upstreams = UpstreamManager.from_config(
+            mcp_config,
+            pool_size=upstream_pool_size,
+            spares=upstream_spares,
+            connect_timeout=upstream_timeout,
+            lazy=lazy_upstreams,
+            idle_timeout=upstream_idle_timeout,
+            discovery_ttl=discovery_ttl,
+            catalogue_path=TOOL_CATALOGUE_PATH,
+        )
+
+    @asynccontextmanager
+    async def connect_upstreams(server: FastMCP) -> AsyncIterator[None]:
+        # Open upstream sessions when serving starts; they then stay open for
+        # the life of the process, across client connections. A slow server
+        # finishes starting in the background rather than delaying the rest.
+        await upstreams.start(ready_timeout=upstream_ready_timeout)
+        yield
 
     # Create the base proxy
-    proxy = FastMCP.as_proxy(client)
+    proxy = upstreams.build_server(lifespan=connect_upstreams)
+
+    if response_cache is not None:
+        response_cache.server_of = upstreams.server_of
 
     # Add single unified middleware
     guard_rail_middleware = GuardRailMiddleware(
-        policy=policy, disabled_tools=disabled_tools
+        policy=policy,
+        disabled_tools=disabled_tools,
+        discovery_ttl=discovery_ttl,
+        validate_arguments=validate_arguments,
+        response_cache=response_cache,
+        coalesce=coalesce,
+        coalesce_tools=coalesce_tools,
+        result_limiter=result_limiter,
+        audit_log=audit_log,
+        store=session_store,
     )
+    guard_rail_middleware.server_of = upstreams.server_of
     proxy.add_middleware(guard_rail_middleware)
+    # Refill cached listings whenever an upstream's listings change
+    upstreams.add_listener(guard_rail_middleware.invalidate_discovery)
 
     # Log initialization
     logger.info("GUARD_PROXY_INIT | Initializing unified middleware proxy")
@@ -42,6 +116,8 @@ def create_guarded_proxy(
     )
     logger.info(f"GUARD_PROXY_INIT | Guard policy loaded: {policy is not None}")
     logger.info(f"GUARD_PROXY_INIT | Disabled tools: {len(disabled_tools)}")
+    store_name = type(guard_rail_middleware.sessions.store).__name__
+    logger.info(f"GUARD_PROXY_INIT | Session store: {store_name}")
 
     return proxy
 
@@ -0,0 +1,149 @@
+"""
+Response cache for side-effect-free tools.
+
+Opt-in: only tools configured by name, or tools of configured servers that
+declare themselves read-only, are cached. Entries are keyed by tool, canonical
+arguments and scope (the calling session, or shared by all sessions), expire
+after a TTL and are evicted least-recently-used beyond a size bound. Calling
+any other tool on the same server may change what the cached reads would
+return, so it drops that server's entries.
+"""
+
+import json
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Iterable, NamedTuple
+
+from tramlines.schema import tool_key
+
+SCOPES = ("session", "shared")
+
+
+class _Entry(NamedTuple):
+    expires_at: float
+    server: str | None
+    result: list
+
+
+def canonical_arguments(arguments: dict[str, Any]) -> str:
+    """Encode arguments so that equal arguments always give the same key."""
+    return json.dumps(arguments, sort_keys=True, separators=(",", ":"), default=str)
+
+
+class ResponseCache:
+    """
+    Cache of successful tool results.
+
+    `tools` and `servers` map tool and server names to TTLs in seconds.
+    `server_of` maps a tool name to the upstream server that provides it.
+    """
+
+    def __init__(
+        self,
+        tools: dict[str, float] | None = None,
+        servers: dict[str, float] | None = None,
+        max_entries: int = 1024,
+        scope: str = "session",
+        server_of: Callable[[str], str | None] = lambda tool_name: None,
+    ):
+        if scope not in SCOPES:
+            raise ValueError(f"Cache scope must be one of {SCOPES}, got {scope!r}")
+        self.tools = dict(tools or {})
+        self.servers = dict(servers or {})
+        self.max_entries = max_entries
+        self.scope = scope
+        self.server_of = server_of
+        self._entries: OrderedDict[tuple[str, str, str], _Entry] = OrderedDict()
+        # Tools whose listing annotations declare them read-only
+        self._read_only: set[str] = set()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def update_tools(self, tools: Iterable[Any]) -> None:
+        """Learn which tools are read-only from a fresh tool listing."""
+        # By the name calls carry, which ttl_for maps to a server by prefix
+        self._read_only = {
+            tool_key(tool)
+            for tool in tools
+            if getattr(getattr(tool, "annotations", None), "readOnlyHint", None) is True
+        }
+
+    def ttl_for(self, tool_name: str) -> float | None:
+        """The TTL for a tool's results, or None if they are not cached."""
+        if tool_name in self.tools:
+            return self.tools[tool_name]
+        server = self.server_of(tool_name)
+        if server in self.servers and tool_name in self._read_only:
+            return self.servers[server]
+        return None
+
+    def _key(self, session_id: str, tool_name: str, arguments: dict) -> tuple:
+        scope = session_id if self.scope == "session" else ""
+        return (scope, tool_name, canonical_arguments(arguments))
+
+    def get(self, session_id: str, tool_name: str, arguments: dict) -> list | None:
+        """Return a fresh cached result for the call, or None."""
+        if self.ttl_for(tool_name) is None:
+            return None
+        key = self._key(session_id, tool_name, arguments)
+        entry = self._entries.get(key)
+        if entry is None or entry.expires_at <= time.monotonic():
+            if entry is not None:
+                del self._entries[key]
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return list(entry.result)
+
+    def put(
+        self, session_id: str, tool_name: str, arguments: dict, result: list
+    ) -> None:
+        """Store a successful result, if the tool is cached."""
+        ttl = self.ttl_for(tool_name)
+        if ttl is None or ttl <= 0:
+            return
+        key = self._key(session_id, tool_name, arguments)
+        self._entries[key] = _Entry(
+            time.monotonic() + ttl, self.server_of(tool_name), list(result)
+        )
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def note_call(self, tool_name: str) -> None:
+        """
+        Drop the entries of tool_name's server if the tool may have side effects.
+        """
+        if self.ttl_for(tool_name) is not None or tool_name in self._read_only:
+            return
+        if not self._entries:
+            return
+        server = self.server_of(tool_name)
+        stale = [
+            key
+            for key, entry in self._entries.items()
+            if server is None or entry.server is None or entry.server == server
+        ]
+        for key in stale:
+            del self._entries[key]
+        self.invalidations += len(stale)
+
+    def clear(self) -> None:
+        """Drop every entry."""
+        self._entries.clear()
+
+    def stats(self) -> dict:
+        """Get cache statistics."""
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+            "evictions": self.evictions,
+            "invalidations": self.invalidations,
+        }
@@ -0,0 +1,224 @@
+"""
+Size caps for tool results.
+
+A file dump or a large query result would otherwise be held by the proxy and
+then serialized again for the client, at whatever size the upstream sent it.
+Results over their tool's cap are cut down before they are forwarded: the
+excess is either dropped (`truncate`) or written to a file the client can read
+(`spill`), and a note saying which is appended. Spilling names a path on the
+gateway's host, so it is only for clients on the same host, over stdio or the
+local daemon. Results within the cap are returned as the same list of the same
+content blocks, without copies.
+
+Sizes count characters of text, and of base64 data for images, audio and
+binary resources.
+"""
+
+import hashlib
+import os
+import tempfile
+import time
+from contextlib import suppress
+from pathlib import Path
+from typing import Iterable
+
+import mcp.types as mt
+
+from tramlines.logger import logger
+
+OVERFLOW_MODES = ("truncate", "spill")
+
+# Where spilled results are written, readable only by the current user
+DEFAULT_SPILL_DIR = Path.home() / ".tramlines" / "spill"
+
+# Least seconds between sweeps of expired spill files
+_PRUNE_INTERVAL = 60.0
+
+
+def block_size(block: mt.Content) -> int:
+    """The size of one content block, as counted against a cap."""
+    if isinstance(block, mt.TextContent):
+        return len(block.text)
+    if isinstance(block, (mt.ImageContent, mt.AudioContent)):
+        return len(block.data)
+    if isinstance(block, mt.EmbeddedResource):
+        resource = block.resource
+        if isinstance(resource, mt.TextResourceContents):
+            return len(resource.text)
+        if isinstance(resource, mt.BlobResourceContents):
+            return len(resource.blob)
+    return 0
+
+
+def _text_of(block: mt.Content) -> str | None:
+    if isinstance(block, mt.TextContent):
+        return block.text
+    if isinstance(block, mt.EmbeddedResource) and isinstance(
+        block.resource, mt.TextResourceContents
+    ):
+        return block.resource.text
+    return None
+
+
+def _truncated(block: mt.Content, length: int) -> mt.Content | None:
+    """The block with its text cut to length, or None if it has no text."""
+    if isinstance(block, mt.TextContent):
+        return block.model_copy(update={"text": block.text[:length]})
+    if isinstance(block, mt.EmbeddedResource) and isinstance(
+        block.resource, mt.TextResourceContents
+    ):
+        resource = block.resource.model_copy(
+            update={"text": block.resource.text[:length]}
+        )
+        return block.model_copy(update={"resource": resource})
+    return None
+
+
+class ResultLimiter:
+    """
+    Enforces per-tool caps on the size of tool results.
+
+    `max_size` applies to every tool without an entry in `tools`; a cap of
+    None or 0 leaves a tool's results unlimited. Spilled results are kept in
+    `spill_dir` for `spill_ttl` seconds.
+    """
+
+    def __init__(
+        self,
+        max_size: int | None = None,
+        tools: dict[str, int] | None = None,
+        overflow: str = "truncate",
+        spill_dir: Path = DEFAULT_SPILL_DIR,
+        spill_ttl: float = 3600.0,
+    ):
+        if overflow not in OVERFLOW_MODES:
+            raise ValueError(
+                f"Overflow mode must be one of {OVERFLOW_MODES}, got {overflow!r}"
+            )
+        self.max_size = max_size
+        self.tools = dict(tools or {})
+        self.overflow = overflow
+        self.spill_dir = Path(spill_dir)
+        self.spill_ttl = spill_ttl
+        self._last_prune = 0.0
+        self.limited = 0
+        self.spilled = 0
+        self.dropped_size = 0
+
+    def limit_for(self, tool_name: str) -> int | None:
+        """The cap on a tool's results, or None if they are unlimited."""
+        limit = self.tools.get(tool_name, self.max_size)
+        return limit or None
+
+    def exceeds(self, tool_name: str, content: Iterable[mt.Content]) -> bool:
+        """Whether a result is over its tool's cap."""
+        limit = self.limit_for(tool_name)
+        return limit is not None and sum(map(block_size, content)) > limit
+
+    def apply(self, tool_name: str, content: list[mt.Content]) -> list[mt.Content]:
+        """
+        Return the result cut down to its tool's cap.
+
+        A result within the cap is returned as is. Otherwise whole blocks are
+        kept in order while they fit, the text of the first block that does not
+        is cut to the space left, and the rest is dropped or spilled.
+        """
+        limit = self.limit_for(tool_name)
+        if limit is None:
+            return content
+        sizes = [block_size(block) for block in content]
+        total = sum(sizes)
+        if total <= limit:
+            return content
+
+        kept: list[mt.Content] = []
+        used = 0
+        for block, size in zip(content, sizes):
+            if used + size <= limit:
+                kept.append(block)
+                used += size
+                continue
+            remaining = limit - used
+            piece = _truncated(block, remaining) if remaining > 0 else None
+            if piece is not None:
+                kept.append(piece)
+                used += remaining
+            break
+
+        self.limited += 1
+        self.dropped_size += total - used
+        note = f"[Result truncated: showing {used} of {total} characters"
+        if self.overflow == "spill":
+            path = self._spill(tool_name, content)
+            note += f"; the full text is saved in {path}"
+        kept.append(mt.TextContent(type="text", text=note + "]"))
+        logger.info(
+            f"RESULT_LIMITED | tool={tool_name} | size={total} | limit={limit} | "
+            f"overflow={self.overflow}"
+        )
+        return kept
+
+    def _spill(self, tool_name: str, content: list[mt.Content]) -> Path:
+        """
+        Write the text of a result to a file, one block at a time.
+
+        Files are named after a digest of the text, so a result seen again,
+        such as a cached one, reuses its file instead of writing a new one.
+        The text is written to a temporary file that is then renamed, so the
+        named file is always complete, even while an identical result limited
+        at the same time is still being written.
+        """
+        self.spill_dir.mkdir(mode=0o700, parents=True, exist_ok=True)
+        self._prune()
+        texts = [text for text in map(_text_of, content) if text is not None]
+        digest = hashlib.sha256()
+        for text in texts:
+            digest.update(text.encode("utf-8", "surrogatepass"))
+            digest.update(b"\0")
+        safe_name = "".join(c if c.isalnum() or c in "-_" else "_" for c in tool_name)
+        path = self.spill_dir / f"{safe_name}-{digest.hexdigest()[:32]}.txt"
+        if path.exists():
+            # Restart the file's TTL from its latest use
+            with suppress(OSError):
+                os.utime(path)
+            return path
+        fd, temp_name = tempfile.mkstemp(
+            prefix=f".{path.stem}-", suffix=".tmp", dir=self.spill_dir
+        )
+        try:
+            with open(fd, "w", encoding="utf-8") as file:
+                for number, text in enumerate(texts):
+                    if number:
+                        file.write("\n")
+                    file.write(text)
+            os.replace(temp_name, path)
+        except OSError:
+            with suppress(OSError):
+                os.unlink(temp_name)
+            raise
+        self.spilled += 1
+        return path
+
+    def _prune(self) -> None:
+        """
+        Delete spill files older than the TTL, at most once a minute, along
+        with temporary files left behind by writes that did not finish.
+        """
+        now = time.time()
+        if now - self._last_prune < _PRUNE_INTERVAL:
+            return
+        self._last_prune = now
+        for path in self.spill_dir.iterdir():
+            try:
+                if now - path.stat().st_mtime > self.spill_ttl:
+                    path.unlink()
+            except OSError:
+                continue
+
+    def stats(self) -> dict:
+        """Get result limiting statistics."""
+        return {
+            "limited": self.limited,
+            "spilled": self.spilled,
+            "dropped_size": self.dropped_size,
+        }
@@ -0,0 +1,558 @@
+"""
+Tool input schemas.
+
+Compiles the JSON Schema a tool publishes as its `inputSchema` into a plain
+Python validator, once per schema, so malformed arguments are rejected at the
+gateway instead of after a round trip to the upstream server. Only the common
+structural keywords are checked; anything the compiler does not understand is
+treated as valid, leaving the final word to the upstream server.
+
+The same schema classifies each argument field as an identifier, an enum or
+free text, so expensive text detectors only scan fields that can carry prose.
+"""
+
+import json
+import math
+import re
+from datetime import date, datetime, time
+from enum import Enum
+from typing import Any, Callable, Iterable, NamedTuple
+
+from tramlines.session import ArgumentLeaf
+
+# Returns an error message for a value at a path, or None if it is valid
+Check = Callable[[Any, str], "str | None"]
+
+
+def tool_key(tool: Any) -> str:
+    """
+    The name clients call a listed tool by.
+
+    Tools of mounted servers keep their own `name` but are listed and called
+    under their prefixed `key`, e.g. `github_get_issue`.
+    """
+    key = getattr(tool, "key", None)
+    return key if isinstance(key, str) else tool.name
+
+
+def _valid(value: Any, path: str) -> None:
+    return None
+
+
+def _is_type(value: Any, type_name: str) -> bool:
+    if type_name == "object":
+        return isinstance(value, dict)
+    if type_name == "array":
+        return isinstance(value, list)
+    if type_name == "string":
+        return isinstance(value, str)
+    if type_name == "boolean":
+        return isinstance(value, bool)
+    if type_name == "null":
+        return value is None
+    if isinstance(value, bool):
+        return False
+    if type_name == "integer":
+        return isinstance(value, int) or (
+            isinstance(value, float) and value.is_integer()
+        )
+    if type_name == "number":
+        return isinstance(value, (int, float)) and not (
+            isinstance(value, float) and math.isnan(value)
+        )
+    # Unknown type names are not ours to reject
+    return True
+
+
+def _describe(path: str) -> str:
+    return path or "arguments"
+
+
+class _Compiler:
+    """Turns one schema document into nested check closures."""
+
+    def __init__(self, root: dict):
+        self.root = root
+        self._refs: dict[str, Check] = {}
+
+    def compile(self, schema: Any) -> Check:
+        if schema is False:
+            return lambda value, path: f"{_describe(path)} is not allowed"
+        if not isinstance(schema, dict):
+            return _valid
+
+        checks: list[Check] = []
+        if "$ref" in schema:
+            checks.append(self._ref(schema["$ref"]))
+        if "type" in schema:
+            checks.append(self._type(schema["type"]))
+        if "enum" in schema and isinstance(schema["enum"], list):
+            checks.append(self._enum(schema["enum"]))
+        if "const" in schema:
+            checks.append(self._enum([schema["const"]]))
+        checks.extend(self._string(schema))
+        checks.extend(self._number(schema))
+        checks.extend(self._object(schema))
+        checks.extend(self._array(schema))
+        checks.extend(self._combinators(schema))
+
+        if not checks:
+            return _valid
+        if len(checks) == 1:
+            return checks[0]
+
+        def check_all(value: Any, path: str) -> str | None:
+            for check in checks:
+                error = check(value, path)
+                if error is not None:
+                    return error
+            return None
+
+        return check_all
+
+    def _ref(self, ref: Any) -> Check:
+        if not isinstance(ref, str) or not ref.startswith("#/"):
+            return _valid
+        if ref in self._refs:
+            return self._refs[ref]
+
+        # Resolved lazily so recursive definitions compile
+        resolved: list[Check] = []
+
+        def check_ref(value: Any, path: str) -> str | None:
+            return resolved[0](value, path)
+
+        self._refs[ref] = check_ref
+        target: Any = self.root
+        for part in ref[2:].split("/"):
+            part = part.replace("~1", "/").replace("~0", "~")
+            if not isinstance(target, dict) or part not in target:
+                target = True
+                break
+            target = target[part]
+        resolved.append(self.compile(target))
+        return check_ref
+
+    def _type(self, type_spec: Any) -> Check:
+        types = [type_spec] if isinstance(type_spec, str) else type_spec
+        if not isinstance(types, list) or not types:
+            return _valid
+        expected = " or ".join(str(t) for t in types)
+
+        def check_type(value: Any, path: str) -> str | None:
+            if any(_is_type(value, t) for t in types):
+                return None
+            return f"{_describe(path)} must be of type {expected}"
+
+        return check_type
+
+    def _enum(self, options: list) -> Check:
+        # Compared by JSON form so 1 and True, or 1 and 1.0, stay distinct
+        allowed = {json.dumps(option, sort_keys=True) for option in options}
+
+        def check_enum(value: Any, path: str) -> str | None:
+            try:
+                encoded = json.dumps(value, sort_keys=True)
+            except (TypeError, ValueError):
+                return None
+            if encoded in allowed:
+                return None
+            return f"{_describe(path)} must be one of {options}"
+
+        return check_enum
+
+    def _string(self, schema: dict) -> Iterable[Check]:
+        min_length = schema.get("minLength")
+        max_length = schema.get("maxLength")
+        pattern = schema.get("pattern")
+        if isinstance(min_length, int):
+
+            def check_min_length(value: Any, path: str) -> str | None:
+                if isinstance(value, str) and len(value) < min_length:
+                    return f"{_describe(path)} must be at least {min_length} characters"
+                return None
+
+            yield check_min_length
+        if isinstance(max_length, int):
+
+            def check_max_length(value: Any, path: str) -> str | None:
+                if isinstance(value, str) and len(value) > max_length:
+                    return f"{_describe(path)} must be at most {max_length} characters"
+                return None
+
+            yield check_max_length
+        if isinstance(pattern, str):
+            try:
+                regex = re.compile(pattern)
+            except re.error:
+                # ECMA-262 syntax Python cannot parse; leave it to the server
+                return
+
+            def check_pattern(value: Any, path: str) -> str | None:
+                if isinstance(value, str) and not regex.search(value):
+                    return f"{_describe(path)} must match pattern {pattern!r}"
+                return None
+
+            yield check_pattern
+
+    def _number(self, schema: dict) -> Iterable[Check]:
+        bounds = [
+            ("minimum", lambda v, b: v >= b, "at least"),
+            ("maximum", lambda v, b: v <= b, "at most"),
+            ("exclusiveMinimum", lambda v, b: v > b, "greater than"),
+            ("exclusiveMaximum", lambda v, b: v < b, "less than"),
+        ]
+        for keyword, holds, wording in bounds:
+            bound = schema.get(keyword)
+            if isinstance(bound, bool) or not isinstance(bound, (int, float)):
+                continue
+            yield self._bound(bound, holds, wording)
+
+    @staticmethod
+    def _bound(
+        bound: float, holds: Callable[[float, float], bool], wording: str
+    ) -> Check:
+        def check_bound(value: Any, path: str) -> str | None:
+            if isinstance(value, bool) or not isinstance(value, (int, float)):
+                return None
+            if holds(value, bound):
+                return None
+            return f"{_describe(path)} must be {wording} {bound}"
+
+        return check_bound
+
+    def _object(self, schema: dict) -> Iterable[Check]:
+        properties = schema.get("properties")
+        properties = properties if isinstance(properties, dict) else {}
+        required = schema.get("required")
+        required = [r for r in required if isinstance(r, str)] if required else []
+        additional = schema.get("additionalProperties", True)
+
+        if required:
+
+            def check_required(value: Any, path: str) -> str | None:
+                if not isinstance(value, dict):
+                    return None
+                for name in required:
+                    if name not in value:
+                        prefix = f"{path}." if path else ""
+                        return f"{prefix}{name} is required"
+                return None
+
+            yield check_required
+
+        property_checks = {
+            name: check
+            for name, sub_schema in properties.items()
+            if (check := self.compile(sub_schema)) is not _valid
+        }
+        additional_check = (
+            None if additional is True or additional == {} else self.compile(additional)
+        )
+        if not property_checks and additional_check is None:
+            return
+
+        def check_properties(value: Any, path: str) -> str | None:
+            if not isinstance(value, dict):
+                return None
+            for name, item in value.items():
+                item_path = f"{path}.{name}" if path else str(name)
+                if name in property_checks:
+                    error = property_checks[name](item, item_path)
+                elif name in properties or additional_check is None:
+                    continue
+                else:
+                    error = additional_check(item, item_path)
+                if error is not None:
+                    return error
+            return None
+
+        yield check_properties
+
+    def _array(self, schema: dict) -> Iterable[Check]:
+        items = schema.get("items")
+        min_items = schema.get("minItems")
+        max_items = schema.get("maxItems")
+        if isinstance(min_items, int) or isinstance(max_items, int):
+
+            def check_length(value: Any, path: str) -> str | None:
+                if not isinstance(value, list):
+                    return None
+                if isinstance(min_items, int) and len(value) < min_items:
+                    return f"{_describe(path)} must have at least {min_items} items"
+                if isinstance(max_items, int) and len(value) > max_items:
+                    return f"{_describe(path)} must have at most {max_items} items"
+                return None
+
+            yield check_length
+        if isinstance(items, dict):
+            item_check = self.compile(items)
+            if item_check is _valid:
+                return
+
+            def check_items(value: Any, path: str) -> str | None:
+                if not isinstance(value, list):
+                    return None
+                for index, item in enumerate(value):
+                    error = item_check(item, f"{path}[{index}]")
+                    if error is not None:
+                        return error
+                return None
+
+            yield check_items
+
+    def _combinators(self, schema: dict) -> Iterable[Check]:
+        for sub_schema in schema.get("allOf") or []:
+            yield self.compile(sub_schema)
+        for keyword in ("anyOf", "oneOf"):
+            options = schema.get(keyword)
+            if not isinstance(options, list) or not options:
+                continue
+            # oneOf is checked as anyOf: overlap between options is rarely
+            # intended in tool schemas, and never worth a false rejection
+            yield self._any_of([self.compile(option) for option in options])
+
+    @staticmethod
+    def _any_of(option_checks: list[Check]) -> Check:
+        def check_any_of(value: Any, path: str) -> str | None:
+            errors = [check(value, path) for check in option_checks]
+            if any(error is None for error in errors):
+                return None
+            return errors[0]
+
+        return check_any_of
+
+
+def compile_schema(schema: Any) -> Check:
+    """Compile a JSON Schema document into a check(value, path) function."""
+    return _Compiler(schema if isinstance(schema, dict) else {}).compile(schema)
+
+
+class FieldKind(Enum):
+    """What an argument field holds, as far as text scanning is concerned."""
+
+    IDENTIFIER = "identifier"
+    ENUM = "enum"
+    FREE_TEXT = "free_text"
+    # Set by a policy's skip_fields: never scanned, whatever the value
+    SKIPPED = "skipped"
+
+
+# Argument names that hold identifiers: owner/repo slugs, IDs and hashes
+IDENTIFIER_NAMES = frozenset({"id", "ids", "owner", "repo", "slug", "sha", "uuid"})
+_IDENTIFIER_SUFFIX = re.compile(r"(?:_id|_ids|Id|Ids|_uuid|_sha|_slug)$")
+
+# String formats whose values are machine-generated, never prose
+IDENTIFIER_FORMATS = frozenset({"uuid", "date", "date-time", "time", "duration"})
+
+_UUID = re.compile(
+    r"[0-9a-fA-F]{8}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{12}"
+)
+_INDEX = re.compile(r"\[\d+\]")
+
+# Field names and formats are chosen by the server and values by the client,
+# so an identifier field is only skipped when its value has the shape of one:
+# a slug or hash with a letter in it, a short number, a UUID, or an ISO date,
+# time or duration. Prose, emails and digit groups such as SSNs are scanned.
+_SLUG = re.compile(
+    r"(?=[^A-Za-z]*[A-Za-z])[A-Za-z0-9](?:[A-Za-z0-9._-]{0,98}[A-Za-z0-9])?"
+)
+_NUMBER = re.compile(r"\d{1,12}")
+_DURATION = re.compile(
+    r"P(?!$)(?:\d+Y)?(?:\d+M)?(?:\d+W)?(?:\d+D)?"
+    r"(?:T(?=\d)(?:\d+H)?(?:\d+M)?(?:\d+(?:\.\d+)?S)?)?"
+)
+
+# Bounds $ref expansion for schemas that refer to themselves
+_MAX_CLASSIFY_DEPTH = 16
+
+
+def field_pattern(path: str) -> str:
+    """Normalise a leaf path such as `items[3].sku` to `items[*].sku`."""
+    return _INDEX.sub("[*]", path)
+
+
+def is_identifier_value(value: str) -> bool:
+    """Whether a string has the shape of an identifier, date or time."""
+    if (
+        _SLUG.fullmatch(value)
+        or _NUMBER.fullmatch(value)
+        or _UUID.fullmatch(value)
+        or _DURATION.fullmatch(value)
+    ):
+        return True
+    for parse in (date.fromisoformat, datetime.fromisoformat, time.fromisoformat):
+        try:
+            parse(value)
+        except ValueError:
+            continue
+        return True
+    return False
+
+
+def _string_kind(schema: dict, name: str) -> FieldKind:
+    if "enum" in schema or "const" in schema:
+        return FieldKind.ENUM
+    if schema.get("format") in IDENTIFIER_FORMATS:
+        return FieldKind.IDENTIFIER
+    if name in IDENTIFIER_NAMES or _IDENTIFIER_SUFFIX.search(name):
+        return FieldKind.IDENTIFIER
+    return FieldKind.FREE_TEXT
+
+
+def classify_fields(schema: Any) -> dict[str, FieldKind]:
+    """
+    Classifies the string fields a tool's inputSchema declares.
+
+    Returns a map from field pattern (see `field_pattern`) to kind. A field
+    that different branches of the schema classify differently is free text.
+    """
+    root = schema if isinstance(schema, dict) else {}
+    kinds: dict[str, FieldKind] = {}
+
+    def record(path: str, kind: FieldKind) -> None:
+        if kinds.get(path, kind) != kind:
+            kind = FieldKind.FREE_TEXT
+        kinds[path] = kind
+
+    def resolve(ref: Any) -> Any:
+        if not isinstance(ref, str) or not ref.startswith("#/"):
+            return None
+        target: Any = root
+        for part in ref[2:].split("/"):
+            if not isinstance(target, dict):
+                return None
+            target = target.get(part.replace("~1", "/").replace("~0", "~"))
+        return target
+
+    def walk(node: Any, path: str, name: str, depth: int) -> None:
+        if not isinstance(node, dict) or depth > _MAX_CLASSIFY_DEPTH:
+            return
+        if "$ref" in node:
+            walk(resolve(node["$ref"]), path, name, depth + 1)
+        for keyword in ("allOf", "anyOf", "oneOf"):
+            for option in node.get(keyword) or []:
+                walk(option, path, name, depth + 1)
+
+        types = node.get("type")
+        types = [types] if isinstance(types, str) else types or []
+        if path and ("string" in types or (not types and "enum" in node)):
+            record(path, _string_kind(node, name))
+
+        properties = node.get("properties")
+        if isinstance(properties, dict):
+            for key, sub_schema in properties.items():
+                sub_path = f"{path}.{key}" if path else key
+                walk(sub_schema, sub_path, key, depth + 1)
+        items = node.get("items")
+        if isinstance(items, dict) and path:
+            # List elements inherit their list's name, e.g. team_ids[*]
+            walk(items, f"{path}[*]", name, depth + 1)
+
+    walk(root, "", "", 0)
+    return kinds
+
+
+class _ToolSchema(NamedTuple):
+    key: str
+    check: Check
+    kinds: dict[str, FieldKind]
+
+
+class ToolSchemas:
+    """
+    Compiled inputSchemas for the tools of the last discovery.
+
+    `update` is called with every freshly fetched tool listing and recompiles
+    only the schemas that changed; `clear` forgets all of them, so calls made
+    before the next listing are forwarded unchecked rather than judged against
+    a schema that may be out of date.
+
+    `scan_fields` and `skip_fields` are field patterns, e.g. `body` or
+    `items[*].note`, that are always or never scanned whatever the schema says.
+    `validated` says whether calls are checked against their schema; when they
+    are not, enum fields may hold anything and are scanned as free text.
+    """
+
+    def __init__(
+        self,
+        scan_fields: Iterable[str] = (),
+        skip_fields: Iterable[str] = (),
+        validated: bool = True,
+    ) -> None:
+        self.overrides: dict[str, FieldKind] = {
+            **{field_pattern(p): FieldKind.SKIPPED for p in skip_fields},
+            **{field_pattern(p): FieldKind.FREE_TEXT for p in scan_fields},
+        }
+        self.validated = validated
+        self._schemas: dict[str, _ToolSchema] = {}
+        self.compiled = 0
+        self.rejected = 0
+
+    def update(self, tools: Iterable[Any]) -> None:
+        """Recompile validators for a fresh tool listing."""
+        schemas = {}
+        for tool in tools:
+            schema = getattr(tool, "parameters", None)
+            if not isinstance(schema, dict):
+                continue
+            try:
+                key = json.dumps(schema, sort_keys=True)
+            except (TypeError, ValueError):
+                continue
+            # Keyed by the name calls carry, so same-named tools of different
+            # mounted servers keep their own schemas
+            name = tool_key(tool)
+            current = self._schemas.get(name)
+            if current is None or current.key != key:
+                kinds = {**classify_fields(schema), **self.overrides}
+                current = _ToolSchema(key, compile_schema(schema), kinds)
+                self.compiled += 1
+            schemas[name] = current
+        self._schemas = schemas
+
+    def clear(self) -> None:
+        """Forget every compiled schema."""
+        self._schemas = {}
+
+    def validate(self, tool_name: str, arguments: dict) -> str | None:
+        """Return why arguments do not fit the tool's schema, or None."""
+        schema = self._schemas.get(tool_name)
+        if schema is None:
+            return None
+        error = schema.check(arguments, "")
+        if error is not None:
+            self.rejected += 1
+        return error
+
+    def scan_scope(self, tool_name: str) -> Callable[[ArgumentLeaf], bool] | None:
+        """
+        Returns a test for which of a tool's argument leaves are free text.
+
+        Identifier fields, and undeclared fields, are only left out when the
+        value looks like an identifier (see `is_identifier_value`); enum fields
+        only when calls are validated. Without a known schema or overrides,
+        None is returned and every string is scanned.
+        """
+        schema = self._schemas.get(tool_name)
+        kinds = schema.kinds if schema is not None else self.overrides
+        if not kinds:
+            return None
+        validated = self.validated
+
+        def is_free_text(leaf: ArgumentLeaf) -> bool:
+            kind = kinds.get(field_pattern(leaf.path))
+            if kind is FieldKind.SKIPPED:
+                return False
+            if kind is FieldKind.ENUM and validated:
+                return False
+            if kind is FieldKind.IDENTIFIER:
+                return not is_identifier_value(leaf.value)
+            if kind is not None:
+                return True
+            return not (isinstance(leaf.value, str) and _UUID.fullmatch(leaf.value))
+
+        return is_free_text
+
+    def __len__(self) -> int:
+        return len(self._schemas)
@@ -1,7 +1,7 @@
 from dataclasses import dataclass, field
 from datetime import datetime
 from enum import Enum
-from typing import Any
+from typing import Any, Callable
 
 
 class CallStatus(Enum):
@@ -11,6 +11,44 @@ class CallStatus(Enum):
     BLOCK = "BLOCK"
 
 
+@dataclass(frozen=True)
+class ArgumentLeaf:
+    """A scalar value found while flattening tool call arguments."""
+
+    path: str
+    value: Any
+    size: int = 0
+
+
+def _join_key(prefix: str, key: Any) -> str:
+    return f"{prefix}.{key}" if prefix else str(key)
+
+
+def flatten_arguments(arguments: dict[str, Any]) -> tuple[ArgumentLeaf, ...]:
+    """
+    Flattens nested arguments into (path, scalar) leaves in a single traversal.
+
+    Paths use dotted keys and bracketed list indices, e.g. `data.items[0].url`.
+    String leaves record their length as size; other scalars have size 0.
+    """
+    leaves: list[ArgumentLeaf] = []
+
+    def walk(value: Any, path: str) -> None:
+        if isinstance(value, dict):
+            for key, item in value.items():
+                walk(item, _join_key(path, key))
+        elif isinstance(value, list):
+            for index, item in enumerate(value):
+                walk(item, f"{path}[{index}]")
+        elif isinstance(value, str):
+            leaves.append(ArgumentLeaf(path, value, len(value)))
+        else:
+            leaves.append(ArgumentLeaf(path, value))
+
+    walk(arguments, "")
+    return tuple(leaves)
+
+
 @dataclass
 class ToolCall:
     """Tool call data for policy evaluation and history tracking."""
@@ -20,6 +58,50 @@ class ToolCall:
     timestamp: datetime = field(default_factory=datetime.now)
     status: CallStatus = CallStatus.ALLOW
     execution_duration: float | None = None
+    _leaves: tuple[ArgumentLeaf, ...] | None = field(
+        default=None, init=False, repr=False, compare=False
+    )
+    _string_leaves: tuple[ArgumentLeaf, ...] | None = field(
+        default=None, init=False, repr=False, compare=False
+    )
+    # Which string leaves are free text, from the tool's schema; None means all
+    scan_scope: Callable[[ArgumentLeaf], bool] | None = field(
+        default=None, repr=False, compare=False
+    )
+    _text_leaves: tuple[ArgumentLeaf, ...] | None = field(
+        default=None, init=False, repr=False, compare=False
+    )
+
+    @property
+    def leaves(self) -> tuple[ArgumentLeaf, ...]:
+        """All scalar argument leaves, flattened once and cached on the call."""
+        if self._leaves is None:
+            self._leaves = flatten_arguments(self.arguments)
+        return self._leaves
+
+    @property
+    def string_leaves(self) -> tuple[ArgumentLeaf, ...]:
+        """The string argument leaves, the input to every text scanner."""
+        if self._string_leaves is None:
+            self._string_leaves = tuple(
+                leaf for leaf in self.leaves if isinstance(leaf.value, str)
+            )
+        return self._string_leaves
+
+    @property
+    def text_leaves(self) -> tuple[ArgumentLeaf, ...]:
+        """
+        The string leaves that may carry free text, the input to expensive
+        detectors. Identifier and enum fields of the tool's schema are left out.
+        """
+        if self._text_leaves is None:
+            scope = self.scan_scope
+            self._text_leaves = (
+                self.string_leaves
+                if scope is None
+                else tuple(leaf for leaf in self.string_leaves if scope(leaf))
+            )
+        return self._text_leaves
 
 
 # --- Actions ---
@@ -28,15 +110,23 @@ class ToolCall:
 class CallHistory:
     """Session call history with automatic size management."""
 
-    def __init__(self, max_calls: int = 100) -> None:
+    def __init__(
+        self,
+        max_calls: int = 100,
+        on_grow: Callable[[], None] | None = None,
+    ) -> None:
         self.calls: list[ToolCall] = []
         self._max_calls = max_calls
+        # Notified whenever a call is added without evicting an older one
+        self._on_grow = on_grow
 
     def add_call(self, call: ToolCall) -> None:
         """Add tool call to history with automatic cleanup."""
         self.calls.append(call)
         if len(self.calls) > self._max_calls:
-            self.calls = self.calls[-self._max_calls :]
+            del self.calls[: len(self.calls) - self._max_calls]
+        elif self._on_grow is not None:
+            self._on_grow()
 
     def __getitem__(self, index: int) -> ToolCall:
         return self.calls[index]
@@ -0,0 +1,329 @@
+"""
+Session history storage backends.
+
+The in-memory store keeps histories in the gateway process. The SQLite store
+keeps them in a WAL-mode database file so several gateway processes on one host
+share session histories, and history-based rules hold across all of them.
+"""
+
+import json
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+from typing import Iterator, Sequence
+
+from tramlines.logger import logger
+from tramlines.session import CallHistory, CallStatus, ToolCall
+
+
+class SessionStore(ABC):
+    """
+    Storage for per-session call histories.
+
+    A tool call is evaluated against `get_history(session_id)` with the call
+    itself added to the returned history, and handed to `record_call` once its
+    final status is known.
+    """
+
+    # Whether calls may block on I/O; the gateway makes them off the event loop
+    blocking = False
+
+    def __init__(self, max_calls_per_session: int = 30, max_sessions: int = 10_000):
+        self.max_calls_per_session = max_calls_per_session
+        self.max_sessions = max_sessions
+
+    @abstractmethod
+    def get_history(self, session_id: str) -> CallHistory:
+        """Get or create the call history for a session, marking it used."""
+
+    @abstractmethod
+    def append(self, session_id: str, calls: Sequence[ToolCall]) -> None:
+        """Append a batch of finished calls to a session's history."""
+
+    @abstractmethod
+    def record_call(self, session_id: str, call: ToolCall) -> None:
+        """Persist a call obtained via get_history once it has finished."""
+
+    @abstractmethod
+    def expire(self, idle_seconds: float) -> int:
+        """Remove sessions idle longer than idle_seconds; return how many."""
+
+    @abstractmethod
+    def stats(self) -> dict:
+        """Get store statistics."""
+
+    def close(self) -> None:
+        """Release any resources held by the store."""
+
+
+class InMemorySessionStore(SessionStore):
+    """
+    Process-local store with LRU eviction.
+
+    Sessions are kept in least-recently-used order, so the oldest idle
+    sessions are always at the front: the cap evicts from there, and expiry
+    only visits sessions that have actually expired.
+    """
+
+    def __init__(self, max_calls_per_session: int = 30, max_sessions: int = 10_000):
+        super().__init__(max_calls_per_session, max_sessions)
+        self.histories: OrderedDict[str, CallHistory] = OrderedDict()
+        self._last_seen: dict[str, float] = {}
+        self._total_calls = 0
+        self._evicted_sessions = 0
+        self._expired_sessions = 0
+
+    def get_history(self, session_id: str) -> CallHistory:
+        self._last_seen[session_id] = time.monotonic()
+        history = self.histories.get(session_id)
+        if history is not None:
+            self.histories.move_to_end(session_id)
+            return history
+
+        history = CallHistory(
+            max_calls=self.max_calls_per_session, on_grow=self._count_call
+        )
+        self.histories[session_id] = history
+        logger.debug(
+            "SESSION_CREATE | session_id=%s | Creating new call history", session_id
+        )
+        while len(self.histories) > self.max_sessions:
+            evicted_id = self._pop_oldest()
+            self._evicted_sessions += 1
+            logger.debug("SESSION_EVICT | session_id=%s | Session cap", evicted_id)
+        return history
+
+    def append(self, session_id: str, calls: Sequence[ToolCall]) -> None:
+        history = self.get_history(session_id)
+        for call in calls:
+            history.add_call(call)
+
+    def record_call(self, session_id: str, call: ToolCall) -> None:
+        # The call already lives in the shared CallHistory object
+        return None
+
+    def _count_call(self) -> None:
+        self._total_calls += 1
+
+    def _pop_oldest(self) -> str:
+        session_id, history = self.histories.popitem(last=False)
+        del self._last_seen[session_id]
+        self._total_calls -= len(history)
+        return session_id
+
+    def expire(self, idle_seconds: float) -> int:
+        cutoff = time.monotonic() - idle_seconds
+        expired = 0
+        while self.histories:
+            oldest_id = next(iter(self.histories))
+            if self._last_seen[oldest_id] >= cutoff:
+                break
+            self._pop_oldest()
+            expired += 1
+        self._expired_sessions += expired
+        return expired
+
+    def stats(self) -> dict:
+        return {
+            "active_sessions": len(self.histories),
+            "total_calls": self._total_calls,
+            "max_sessions": self.max_sessions,
+            "evicted_sessions": self._evicted_sessions,
+            "expired_sessions": self._expired_sessions,
+        }
+
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS sessions (
+    session_id TEXT PRIMARY KEY,
+    last_seen REAL NOT NULL,
+    call_count INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS sessions_last_seen ON sessions (last_seen);
+CREATE TABLE IF NOT EXISTS calls (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    session_id TEXT NOT NULL,
+    name TEXT NOT NULL,
+    arguments TEXT NOT NULL,
+    timestamp REAL NOT NULL,
+    status TEXT NOT NULL,
+    execution_duration REAL
+);
+CREATE INDEX IF NOT EXISTS calls_session_seq ON calls (session_id, seq);
+"""
+
+
+class SqliteSessionStore(SessionStore):
+    """
+    Store shared by every gateway process on a host, backed by SQLite in WAL mode.
+
+    Each lookup reads only the newest `max_calls_per_session` calls of one
+    session through the (session_id, seq) index, and each batch of appends is
+    written in a single transaction.
+
+    A transaction may wait up to `busy_timeout` seconds for another process's
+    write, so the gateway calls this store from worker threads; the one
+    connection is shared between them under a lock.
+    """
+
+    blocking = True
+
+    def __init__(
+        self,
+        path: str | Path,
+        max_calls_per_session: int = 30,
+        max_sessions: int = 10_000,
+        busy_timeout: float = 5.0,
+    ):
+        super().__init__(max_calls_per_session, max_sessions)
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        # Autocommit mode; writes use explicit transactions via _transaction()
+        self._conn = sqlite3.connect(
+            self.path,
+            timeout=busy_timeout,
+            isolation_level=None,
+            check_same_thread=False,
+        )
+        self._lock = threading.Lock()
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(_SCHEMA)
+        self._evicted_sessions = 0
+        self._expired_sessions = 0
+
+    @contextmanager
+    def _transaction(self) -> Iterator[sqlite3.Connection]:
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                yield self._conn
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+            self._conn.execute("COMMIT")
+
+    def get_history(self, session_id: str) -> CallHistory:
+        now = time.time()
+        with self._transaction() as conn:
+            created = conn.execute(
+                "INSERT OR IGNORE INTO sessions (session_id, last_seen) VALUES (?, ?)",
+                (session_id, now),
+            ).rowcount
+            if created:
+                self._enforce_session_cap(conn)
+                rows = []
+            else:
+                conn.execute(
+                    "UPDATE sessions SET last_seen = ? WHERE session_id = ?",
+                    (now, session_id),
+                )
+                rows = conn.execute(
+                    "SELECT name, arguments, timestamp, status, execution_duration "
+                    "FROM calls WHERE session_id = ? ORDER BY seq DESC LIMIT ?",
+                    (session_id, self.max_calls_per_session),
+                ).fetchall()
+
+        history = CallHistory(max_calls=self.max_calls_per_session)
+        history.calls = [_row_to_call(row) for row in reversed(rows)]
+        return history
+
+    def append(self, session_id: str, calls: Sequence[ToolCall]) -> None:
+        if not calls:
+            return
+        with self._transaction() as conn:
+            conn.executemany(
+                "INSERT INTO calls (session_id, name, arguments, timestamp, status, "
+                "execution_duration) VALUES (?, ?, ?, ?, ?, ?)",
+                [_call_to_row(session_id, call) for call in calls],
+            )
+            # Trim to the newest max_calls_per_session calls
+            conn.execute(
+                "DELETE FROM calls WHERE session_id = ? AND seq <= ("
+                "SELECT seq FROM calls WHERE session_id = ? "
+                "ORDER BY seq DESC LIMIT 1 OFFSET ?)",
+                (session_id, session_id, self.max_calls_per_session),
+            )
+            conn.execute(
+                "INSERT INTO sessions (session_id, last_seen, call_count) "
+                "VALUES (?, ?, (SELECT COUNT(*) FROM calls WHERE session_id = ?)) "
+                "ON CONFLICT (session_id) DO UPDATE SET "
+                "last_seen = excluded.last_seen, call_count = excluded.call_count",
+                (session_id, time.time(), session_id),
+            )
+
+    def record_call(self, session_id: str, call: ToolCall) -> None:
+        self.append(session_id, [call])
+
+    def _enforce_session_cap(self, conn: sqlite3.Connection) -> None:
+        (count,) = conn.execute("SELECT COUNT(*) FROM sessions").fetchone()
+        excess = count - self.max_sessions
+        if excess > 0:
+            self._delete_sessions(
+                conn,
+                "SELECT session_id FROM sessions ORDER BY last_seen LIMIT ?",
+                (excess,),
+            )
+            self._evicted_sessions += excess
+
+    @staticmethod
+    def _delete_sessions(conn: sqlite3.Connection, selector: str, params: tuple) -> int:
+        conn.execute(f"DELETE FROM calls WHERE session_id IN ({selector})", params)
+        cursor = conn.execute(
+            f"DELETE FROM sessions WHERE session_id IN ({selector})", params
+        )
+        return int(cursor.rowcount)
+
+    def expire(self, idle_seconds: float) -> int:
+        with self._transaction() as conn:
+            expired = self._delete_sessions(
+                conn,
+                "SELECT session_id FROM sessions WHERE last_seen < ?",
+                (time.time() - idle_seconds,),
+            )
+        self._expired_sessions += expired
+        return expired
+
+    def stats(self) -> dict:
+        with self._lock:
+            sessions, calls = self._conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(call_count), 0) FROM sessions"
+            ).fetchone()
+        return {
+            "active_sessions": sessions,
+            "total_calls": calls,
+            "max_sessions": self.max_sessions,
+            "evicted_sessions": self._evicted_sessions,
+            "expired_sessions": self._expired_sessions,
+        }
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+def _call_to_row(session_id: str, call: ToolCall) -> tuple:
+    return (
+        session_id,
+        call.name,
+        json.dumps(call.arguments, default=str),
+        call.timestamp.timestamp(),
+        call.status.value,
+        call.execution_duration,
+    )
+
+
+def _row_to_call(row: tuple) -> ToolCall:
+    name, arguments, timestamp, status, execution_duration = row
+    return ToolCall(
+        name=name,
+        arguments=json.loads(arguments),
+        timestamp=datetime.fromtimestamp(timestamp),
+        status=CallStatus(status),
+        execution_duration=execution_duration,
+    )
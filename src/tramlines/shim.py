@@ -0,0 +1,70 @@
+"""
+Thin stdio client for the shared local daemon.
+
+Relays an MCP client's stdio to the daemon's Unix domain socket and back. It
+deliberately imports nothing beyond the standard library, so it starts in
+milliseconds and holds no models or upstream servers of its own.
+"""
+
+import argparse
+import os
+import socket
+import sys
+import threading
+
+# Must match tramlines.daemon.DEFAULT_SOCKET_PATH; not imported from there to
+# keep this module free of the gateway's heavy dependencies.
+DEFAULT_SOCKET_PATH = os.path.join(
+    os.path.expanduser("~"), ".tramlines", "tramlines.sock"
+)
+
+_CHUNK_SIZE = 64 * 1024
+
+
+def _pump_stdin(sock: socket.socket) -> None:
+    """Copy stdin to the socket, then signal end of input to the daemon."""
+    try:
+        while chunk := os.read(sys.stdin.fileno(), _CHUNK_SIZE):
+            sock.sendall(chunk)
+    except OSError:
+        pass
+    finally:
+        try:
+            sock.shutdown(socket.SHUT_WR)
+        except OSError:
+            pass
+
+
+def relay(socket_path: str) -> int:
+    """Relay stdio over the daemon socket until either side closes."""
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        sock.connect(socket_path)
+    except OSError as e:
+        print(
+            f"❌ Cannot reach Tramlines daemon at {socket_path}: {e}\n"
+            "   Start it with: tl --daemon",
+            file=sys.stderr,
+        )
+        return 1
+
+    threading.Thread(target=_pump_stdin, args=(sock,), daemon=True).start()
+    stdout = sys.stdout.fileno()
+    with sock:
+        while chunk := sock.recv(_CHUNK_SIZE):
+            os.write(stdout, chunk)
+    return 0
+
+
+def main() -> None:  # pragma: no cover
+    """CLI entrypoint for the `tl-connect` stdio shim."""
+    parser = argparse.ArgumentParser(
+        description="Connect an MCP stdio client to a running Tramlines daemon"
+    )
+    parser.add_argument(
+        "--socket",
+        default=os.environ.get("TRAMLINES_SOCKET", DEFAULT_SOCKET_PATH),
+        help="Daemon socket path (default: $TRAMLINES_SOCKET or %(default)s)",
+    )
+    args = parser.parse_args()
+    sys.exit(relay(args.socket))
@@ -0,0 +1,345 @@
+"""
+Lightweight tracing of tool calls.
+
+Each sampled tool call becomes a trace: a root span for the call, with child
+spans for the stages it goes through (argument validation, session lookup,
+policy evaluation and each rule and detector in it, the upstream call, result
+scanning). The trace context travels to upstream servers as a W3C
+`traceparent` in the request's `_meta`, and a `traceparent` in an incoming
+request's `_meta` continues the caller's trace, keeping its sampling decision.
+
+Finished traces are written by a background thread to a local file, one
+OTLP/JSON `resourceSpans` export per line, which OpenTelemetry collectors and
+most trace viewers can import.
+
+With tracing off, or for calls not sampled, `trace()` and `span()` return a
+shared no-op span: the cost is a context variable read per stage.
+"""
+
+import atexit
+import json
+import os
+import queue
+import random
+import re
+import threading
+import time
+from contextvars import ContextVar
+from pathlib import Path
+from typing import Any
+
+from tramlines.logger import logger
+
+DEFAULT_TRACE_PATH = Path.home() / ".tramlines" / "traces" / "traces.jsonl"
+
+# OTLP span kinds
+KIND_INTERNAL = 1
+KIND_SERVER = 2
+KIND_CLIENT = 3
+
+_STATUS_OK = 1
+_STATUS_ERROR = 2
+
+_TRACEPARENT = re.compile(r"^00-([0-9a-f]{32})-([0-9a-f]{16})-([0-9a-f]{2})$")
+
+
+class _NoopSpan:
+    """Stands in for a span when nothing is being traced."""
+
+    __slots__ = ()
+
+    def __enter__(self) -> "_NoopSpan":
+        return self
+
+    def __exit__(self, *exc_info: object) -> None:
+        return None
+
+    def set(self, key: str, value: Any) -> None:
+        return None
+
+
+_NOOP = _NoopSpan()
+
+
+class _Trace:
+    __slots__ = ("trace_id", "spans")
+
+    def __init__(self, trace_id: str) -> None:
+        self.trace_id = trace_id
+        self.spans: list["Span"] = []
+
+
+class Span:
+    """A timed stage of a traced tool call; use it as a context manager."""
+
+    __slots__ = (
+        "tracer",
+        "trace",
+        "span_id",
+        "parent_id",
+        "name",
+        "kind",
+        "attributes",
+        "start_ns",
+        "end_ns",
+        "error",
+        "root",
+        "_token",
+    )
+
+    def __init__(
+        self,
+        tracer: "Tracer",
+        trace: _Trace,
+        name: str,
+        parent_id: str | None,
+        kind: int,
+        attributes: dict[str, Any],
+        root: bool = False,
+    ) -> None:
+        self.tracer = tracer
+        self.trace = trace
+        self.span_id = random.getrandbits(64).to_bytes(8, "big").hex()
+        self.parent_id = parent_id
+        self.name = name
+        self.kind = kind
+        self.attributes = attributes
+        self.start_ns = 0
+        self.end_ns = 0
+        self.error: str | None = None
+        self.root = root
+        self._token: Any = None
+
+    @property
+    def traceparent(self) -> str:
+        """This span's context in W3C traceparent form."""
+        return f"00-{self.trace.trace_id}-{self.span_id}-01"
+
+    def set(self, key: str, value: Any) -> None:
+        """Set an attribute."""
+        self.attributes[key] = value
+
+    def __enter__(self) -> "Span":
+        self.start_ns = time.time_ns()
+        self._token = _current_span.set(self)
+        return self
+
+    def __exit__(self, exc_type, exc, traceback) -> None:
+        self.end_ns = time.time_ns()
+        if exc is not None:
+            self.error = f"{exc_type.__name__}: {exc}"
+        _current_span.reset(self._token)
+        self.trace.spans.append(self)
+        if self.root:
+            # The root span ends last, so the trace is complete
+            self.tracer.exporter.export(self.tracer, self.trace.spans)
+
+
+_current_span: ContextVar[Span | None] = ContextVar("tramlines_span", default=None)
+
+
+class FileSpanExporter:
+    """
+    Appends finished traces to a file as OTLP/JSON, from a background thread.
+
+    At most `max_queued` traces wait to be written; beyond that, traces are
+    dropped rather than slowing down calls.
+    """
+
+    def __init__(self, path: Path = DEFAULT_TRACE_PATH, max_queued: int = 1000):
+        self.path = Path(path)
+        self._queue: queue.Queue = queue.Queue(maxsize=max_queued)
+        self._thread: threading.Thread | None = None
+        self._lock = threading.Lock()
+        self.exported = 0
+        self.dropped = 0
+
+    def export(self, tracer: "Tracer", spans: list[Span]) -> None:
+        if self._thread is None or not self._thread.is_alive():
+            self._start()
+        try:
+            self._queue.put_nowait((tracer.service_name, spans))
+        except queue.Full:
+            self.dropped += 1
+
+    def flush(self, timeout: float = 5.0) -> None:
+        """Wait until every trace queued so far has been written."""
+        if self._thread is None or not self._thread.is_alive():
+            return
+        done = threading.Event()
+        self._queue.put(done)
+        done.wait(timeout)
+
+    def _start(self) -> None:
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._thread = threading.Thread(
+                target=self._run, name="tramlines-trace-writer", daemon=True
+            )
+            self._thread.start()
+            atexit.register(self.flush)
+
+    def _run(self) -> None:
+        self.path.parent.mkdir(mode=0o700, parents=True, exist_ok=True)
+        fd = os.open(self.path, os.O_WRONLY | os.O_CREAT | os.O_APPEND, 0o600)
+        with open(fd, "a", encoding="utf-8") as file:
+            while True:
+                batch = [self._queue.get()]
+                while True:
+                    try:
+                        batch.append(self._queue.get_nowait())
+                    except queue.Empty:
+                        break
+                lines = [
+                    json.dumps(encode_otlp(*item), separators=(",", ":")) + "\n"
+                    for item in batch
+                    if isinstance(item, tuple)
+                ]
+                try:
+                    file.write("".join(lines))
+                    file.flush()
+                    self.exported += len(lines)
+                except OSError as e:
+                    logger.error(f"TRACE_ERROR | Failed to write traces: {e}")
+                for item in batch:
+                    if isinstance(item, threading.Event):
+                        item.set()
+
+
+def _attribute(key: str, value: Any) -> dict:
+    if isinstance(value, bool):
+        typed: dict[str, Any] = {"boolValue": value}
+    elif isinstance(value, int):
+        typed = {"intValue": str(value)}
+    elif isinstance(value, float):
+        typed = {"doubleValue": value}
+    else:
+        typed = {"stringValue": str(value)}
+    return {"key": key, "value": typed}
+
+
+def encode_otlp(service_name: str, spans: list[Span]) -> dict:
+    """One OTLP/JSON export request holding the spans of one trace."""
+    encoded = []
+    for span in spans:
+        item: dict[str, Any] = {
+            "traceId": span.trace.trace_id,
+            "spanId": span.span_id,
+            "name": span.name,
+            "kind": span.kind,
+            "startTimeUnixNano": str(span.start_ns),
+            "endTimeUnixNano": str(span.end_ns),
+            "attributes": [
+                _attribute(key, value) for key, value in span.attributes.items()
+            ],
+            "status": (
+                {"code": _STATUS_ERROR, "message": span.error}
+                if span.error
+                else {"code": _STATUS_OK}
+            ),
+        }
+        if span.parent_id:
+            item["parentSpanId"] = span.parent_id
+        encoded.append(item)
+    return {
+        "resourceSpans": [
+            {
+                "resource": {"attributes": [_attribute("service.name", service_name)]},
+                "scopeSpans": [{"scope": {"name": "tramlines"}, "spans": encoded}],
+            }
+        ]
+    }
+
+
+class Tracer:
+    """Starts sampled traces and hands finished ones to an exporter."""
+
+    def __init__(
+        self,
+        exporter: FileSpanExporter,
+        sample_ratio: float = 1.0,
+        service_name: str = "tramlines-gateway",
+    ):
+        if not 0.0 <= sample_ratio <= 1.0:
+            raise ValueError("Sample ratio must be between 0 and 1")
+        self.exporter = exporter
+        self.sample_ratio = sample_ratio
+        self.service_name = service_name
+
+    def start_trace(
+        self,
+        name: str,
+        traceparent: str | None = None,
+        attributes: dict[str, Any] | None = None,
+    ) -> Span | _NoopSpan:
+        match = _TRACEPARENT.match(traceparent) if traceparent else None
+        if match:
+            # Follow the caller's sampling decision
+            if not int(match.group(3), 16) & 1:
+                return _NOOP
+            trace_id, parent_id = match.group(1), match.group(2)
+        else:
+            if self.sample_ratio < 1.0 and random.random() >= self.sample_ratio:
+                return _NOOP
+            trace_id, parent_id = (
+                random.getrandbits(128).to_bytes(16, "big").hex(),
+                None,
+            )
+        return Span(
+            self,
+            _Trace(trace_id),
+            name,
+            parent_id,
+            KIND_SERVER,
+            attributes or {},
+            root=True,
+        )
+
+
+_tracer: Tracer | None = None
+
+
+def configure(tracer: Tracer | None) -> None:
+    """Turn tracing on with the given tracer, or off with None."""
+    global _tracer
+    _tracer = tracer
+
+
+def trace(
+    name: str,
+    traceparent: str | None = None,
+    attributes: dict[str, Any] | None = None,
+) -> Span | _NoopSpan:
+    """Start a trace for a tool call, if tracing is on and the call is sampled."""
+    tracer = _tracer
+    if tracer is None:
+        return _NOOP
+    return tracer.start_trace(name, traceparent, attributes)
+
+
+def span(
+    name: str,
+    attributes: dict[str, Any] | None = None,
+    kind: int = KIND_INTERNAL,
+) -> Span | _NoopSpan:
+    """Start a child span of the current span, if there is one."""
+    parent = _current_span.get()
+    if parent is None:
+        return _NOOP
+    return Span(
+        parent.tracer, parent.trace, name, parent.span_id, kind, attributes or {}
+    )
+
+
+def annotate(key: str, value: Any) -> None:
+    """Set an attribute on the current span, if there is one."""
+    current = _current_span.get()
+    if current is not None:
+        current.attributes[key] = value
+
+
+def current_traceparent() -> str | None:
+    """The current span's context in W3C traceparent form, if any."""
+    current = _current_span.get()
+    return current.traceparent if current is not None else None
@@ -0,0 +1,795 @@
+"""
+Upstream MCP connection management.
+
+Every server in `mcpServers` gets a pool of long-lived, already-initialized
+client sessions. Requests borrow the least busy healthy session, so no tool
+call pays for a handshake or subprocess spawn; broken sessions are replaced in
+the background with exponential backoff, and idle ones are health-checked.
+Optional warm spares take the place of broken sessions without a cold start,
+and rarely used servers can be started lazily and stopped when idle, with their
+tool listings served from a cached catalogue in the meantime.
+"""
+
+import asyncio
+import datetime
+import hashlib
+import json
+import os
+import time
+from collections import deque
+from contextlib import asynccontextmanager, suppress
+from pathlib import Path
+from typing import Any, AsyncIterator, Callable
+
+import mcp.types as mt
+from fastmcp import FastMCP
+from fastmcp.client import Client
+from fastmcp.client.messages import MessageHandler
+from fastmcp.client.transports import ClientTransport
+from fastmcp.exceptions import ToolError
+from fastmcp.server.proxy import FastMCPProxy
+from fastmcp.utilities.mcp_config import MCPConfig
+
+from tramlines import tracing
+from tramlines.logger import logger
+
+# Listing requests, cached per server and never left waiting for a server that
+# is not connected yet: it is left out instead of holding up every other server
+_CATALOGUE_METHODS = frozenset(
+    {"list_tools", "list_resources", "list_resource_templates", "list_prompts"}
+)
+
+# Other client methods the proxy layer uses; each runs on a borrowed pooled
+# session, as do the tool calls PooledClient defines itself
+_POOLED_METHODS = _CATALOGUE_METHODS | {
+    "read_resource",
+    "get_prompt",
+    "ping",
+}
+
+
+class UpstreamUnavailableError(ConnectionError):
+    """Raised when no session to an upstream server could be established."""
+
+
+class _Member:
+    """One pooled connection slot."""
+
+    def __init__(self, index: int):
+        self.index = index
+        self.client: Client | None = None
+        self.in_flight = 0
+        self.connects = 0
+        self.reconnecting: asyncio.Task | None = None
+
+    @property
+    def healthy(self) -> bool:
+        return self.client is not None and self.client.is_connected()
+
+
+class ToolCatalogue:
+    """
+    Tool listings of upstream servers, persisted as a JSON file.
+
+    Each entry is keyed by server name and tagged with a fingerprint of the
+    server's configuration, so editing a server's entry in `mcpServers`
+    invalidates what was cached for it. Without a path the catalogue lives
+    only in memory.
+    """
+
+    def __init__(self, path: str | Path | None = None):
+        self.path = Path(path) if path is not None else None
+        self._entries: dict[str, dict[str, Any]] = {}
+        if self.path is None:
+            return
+        try:
+            self._entries = json.loads(self.path.read_text())
+        except FileNotFoundError:
+            pass
+        except (OSError, ValueError) as e:
+            logger.warning(f"CATALOGUE_LOAD_FAIL | {self.path} | {e}")
+
+    def get(self, name: str, fingerprint: str) -> list[mt.Tool] | None:
+        entry = self._entries.get(name)
+        if entry is None or entry.get("fingerprint") != fingerprint:
+            return None
+        return [mt.Tool.model_validate(tool) for tool in entry["tools"]]
+
+    def put(self, name: str, fingerprint: str, tools: list[mt.Tool]) -> None:
+        entry = {
+            "fingerprint": fingerprint,
+            "tools": [
+                tool.model_dump(mode="json", exclude_none=True) for tool in tools
+            ],
+        }
+        if self._entries.get(name) == entry:
+            return
+        self._entries[name] = entry
+        if self.path is None:
+            return
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        # Write then rename, so concurrent readers never see a partial file
+        temp_path = self.path.with_suffix(f".{os.getpid()}.tmp")
+        temp_path.write_text(json.dumps(self._entries))
+        os.replace(temp_path, self.path)
+
+
+class _ListChangedHandler(MessageHandler):
+    """Invalidates a pool's cached listings when its server reports a change."""
+
+    def __init__(self, pool: "UpstreamPool"):
+        self.pool = pool
+
+    async def on_tool_list_changed(self, message: mt.ToolListChangedNotification):
+        self.pool.invalidate_listings("list_tools")
+
+    async def on_resource_list_changed(
+        self, message: mt.ResourceListChangedNotification
+    ):
+        self.pool.invalidate_listings("list_resources", "list_resource_templates")
+
+    async def on_prompt_list_changed(self, message: mt.PromptListChangedNotification):
+        self.pool.invalidate_listings("list_prompts")
+
+
+class UpstreamPool:
+    """
+    A fixed-size pool of persistent sessions to one upstream MCP server.
+
+    Sessions are opened on start and kept open; each request runs on the
+    healthy session with the fewest requests in flight. A session found broken
+    is reconnected in the background, with exponential backoff between failed
+    attempts, while requests continue on the remaining sessions.
+
+    With `spares` set, that many extra sessions are kept initialized on
+    standby, so a broken session is replaced by a warm one at once instead of
+    waiting for a new server process to start; the standby is then refilled
+    in the background.
+
+    A `lazy` pool with a cached tool catalogue is not started until a request
+    needs a session, and with `idle_timeout` set, a pool that has served no
+    request for that long is shut down until it is needed again.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        transport_factory: Callable[[], ClientTransport],
+        size: int = 1,
+        spares: int = 0,
+        health_check_interval: float = 30.0,
+        connect_timeout: float = 30.0,
+        initial_backoff: float = 0.5,
+        max_backoff: float = 30.0,
+        lazy: bool = False,
+        idle_timeout: float | None = None,
+        catalogue: ToolCatalogue | None = None,
+        fingerprint: str = "",
+        discovery_ttl: float = 300.0,
+    ):
+        if size < 1:
+            raise ValueError("Upstream pool size must be at least 1")
+        if spares < 0:
+            raise ValueError("Upstream spares cannot be negative")
+        self.name = name
+        self.transport_factory = transport_factory
+        self.spare_count = spares
+        self.health_check_interval = health_check_interval
+        self.connect_timeout = connect_timeout
+        self.initial_backoff = initial_backoff
+        self.max_backoff = max_backoff
+        self.lazy = lazy
+        self.idle_timeout = idle_timeout
+        self.catalogue = catalogue
+        self.fingerprint = fingerprint
+        self.discovery_ttl = discovery_ttl
+        # List method name -> (time listed, listing); see list()
+        self._listings: dict[str, tuple[float, list]] = {}
+        # Called with the list method names whose listings changed
+        self.listeners: list[Callable[..., None]] = []
+        self.last_used = time.monotonic()
+        self.members = [_Member(i) for i in range(size)]
+        self.spares: deque[Client] = deque()
+        self._available = asyncio.Event()
+        self._start_lock = asyncio.Lock()
+        self._started = False
+        self._start_task: asyncio.Task | None = None
+        self._health_task: asyncio.Task | None = None
+        self._refill_task: asyncio.Task | None = None
+        self.connects = 0
+        self.reconnects = 0
+        self.connect_failures = 0
+        self.requests = 0
+        self.request_failures = 0
+        self.cold_starts = 0
+        self.cold_start_total_ms = 0.0
+        self.cold_start_max_ms = 0.0
+        self.spare_hits = 0
+        self.spare_misses = 0
+        self.idle_shutdowns = 0
+        self.listing_hits = 0
+        self.listing_misses = 0
+
+    @property
+    def active(self) -> bool:
+        """Whether the pool has been started and not shut down since."""
+        return self._started
+
+    @property
+    def cached_tools(self) -> list[mt.Tool] | None:
+        """The server's tools as last listed, if a catalogue has them."""
+        if self.catalogue is None:
+            return None
+        return self.catalogue.get(self.name, self.fingerprint)
+
+    async def start(self) -> None:
+        """Open every session in the pool; safe to call repeatedly."""
+        if self._started:
+            return
+        async with self._start_lock:
+            if self._started:
+                return
+            connected = await asyncio.gather(*(self._connect(m) for m in self.members))
+            for member, ok in zip(self.members, connected):
+                if not ok:
+                    self._schedule_reconnect(member)
+            self._schedule_refill()
+            if self.health_check_interval > 0:
+                self._health_task = asyncio.create_task(self._health_loop())
+            self._started = True
+
+    async def stop(self) -> None:
+        """Close every session and stop background work."""
+        for task in (self._start_task, self._health_task, self._refill_task):
+            if task is not None:
+                task.cancel()
+                with suppress(asyncio.CancelledError):
+                    await task
+        self._health_task = self._refill_task = self._start_task = None
+        await self._release()
+
+    async def _release(self) -> None:
+        """Close every session, spares included, leaving the pool stopped."""
+        self._started = False
+        self._available.clear()
+        for member in self.members:
+            if member.reconnecting is not None:
+                member.reconnecting.cancel()
+            await self._close(member)
+        while self.spares:
+            await self._close_client(self.spares.popleft())
+
+    async def _shut_down_idle(self) -> None:
+        """Stop an idle pool from its own health loop; the loop then exits."""
+        async with self._start_lock:
+            idle_seconds = time.monotonic() - self.last_used
+            for task in (self._start_task, self._refill_task):
+                if task is not None:
+                    task.cancel()
+            self._health_task = self._refill_task = self._start_task = None
+            await self._release()
+        self.idle_shutdowns += 1
+        logger.info(
+            f"UPSTREAM_IDLE_STOP | {self.name} | Idle for {idle_seconds:.0f}s, "
+            "sessions closed until next use"
+        )
+
+    def _is_idle(self) -> bool:
+        if self.idle_timeout is None:
+            return False
+        if any(member.in_flight for member in self.members):
+            return False
+        return time.monotonic() - self.last_used > self.idle_timeout
+
+    async def _open_client(self, label: str) -> Client | None:
+        """Start and initialize a new session, or return None if it failed."""
+        client = Client(
+            self.transport_factory(), message_handler=_ListChangedHandler(self)
+        )
+        error: BaseException | None = None
+        start_time = time.perf_counter()
+        try:
+            await asyncio.wait_for(client.__aenter__(), self.connect_timeout)
+        except Exception as e:
+            error = e
+        if error is not None or not client.is_connected():
+            self.connect_failures += 1
+            logger.warning(
+                f"UPSTREAM_CONNECT_FAIL | {self.name}[{label}] | "
+                f"{error or _runner_error(client)!r}"
+            )
+            await self._discard(client)
+            return None
+
+        elapsed_ms = (time.perf_counter() - start_time) * 1000
+        self.cold_starts += 1
+        self.cold_start_total_ms += elapsed_ms
+        self.cold_start_max_ms = max(self.cold_start_max_ms, elapsed_ms)
+        logger.info(f"UPSTREAM_COLD_START | {self.name}[{label}] | {elapsed_ms:.1f}ms")
+        return client
+
+    def _take_spare(self) -> Client | None:
+        """Hand out a live standby session, dropping any that died idle."""
+        while self.spares:
+            client = self.spares.popleft()
+            if client.is_connected():
+                return client
+            asyncio.create_task(self._close_client(client))
+        return None
+
+    async def _connect(self, member: _Member) -> bool:
+        """Give a member a session, preferring a warm spare; returns success."""
+        client = self._take_spare() if member.connects else None
+        if client is not None:
+            self.spare_hits += 1
+            self._schedule_refill()
+        else:
+            if member.connects:
+                self.spare_misses += 1
+            client = await self._open_client(str(member.index))
+            if client is None:
+                return False
+
+        self.connects += 1
+        if member.connects:
+            self.reconnects += 1
+        member.connects += 1
+        member.client = client
+        self._available.set()
+        # A new session may be to a restarted server with different tools
+        self.invalidate_listings()
+        logger.info(
+            f"UPSTREAM_CONNECT | {self.name}[{member.index}] | "
+            f"connection #{member.connects}"
+        )
+        return True
+
+    def _schedule_refill(self) -> None:
+        if len(self.spares) >= self.spare_count:
+            return
+        if self._refill_task is None or self._refill_task.done():
+            self._refill_task = asyncio.create_task(self._refill())
+
+    async def _refill(self) -> None:
+        delay = self.initial_backoff
+        while len(self.spares) < self.spare_count:
+            client = await self._open_client("spare")
+            if client is None:
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, self.max_backoff)
+                continue
+            delay = self.initial_backoff
+            self.spares.append(client)
+
+    async def _discard(self, client: Client) -> None:
+        """Tear down a client whose session never came up."""
+        # The session runner may still be waiting on the transport; stop it
+        # directly rather than asking it to disconnect.
+        task = client._session_task
+        if task is not None and not task.done():
+            task.cancel()
+        with suppress(Exception):
+            await asyncio.wait_for(client.transport.close(), self.connect_timeout)
+
+    async def _close_client(self, client: Client) -> None:
+        try:
+            await asyncio.wait_for(client.close(), self.connect_timeout)
+        except Exception:
+            await self._discard(client)
+
+    async def _close(self, member: _Member) -> None:
+        client, member.client = member.client, None
+        if client is not None:
+            await self._close_client(client)
+
+    def _schedule_reconnect(self, member: _Member) -> None:
+        if member.reconnecting is None or member.reconnecting.done():
+            member.reconnecting = asyncio.create_task(self._reconnect(member))
+
+    async def _reconnect(self, member: _Member) -> None:
+        await self._close(member)
+        delay = self.initial_backoff
+        while not await self._connect(member):
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, self.max_backoff)
+
+    async def _health_loop(self) -> None:
+        while True:
+            await asyncio.sleep(self.health_check_interval)
+            if logger.is_enabled("DEBUG"):
+                logger.debug("UPSTREAM_STATS | %s | %s", self.name, self.stats())
+            if self._is_idle():
+                await self._shut_down_idle()
+                return
+            for spare in [c for c in self.spares if not c.is_connected()]:
+                self.spares.remove(spare)
+                await self._close_client(spare)
+            self._schedule_refill()
+            for member in self.members:
+                # Busy sessions are evidently alive; only probe idle ones
+                if member.in_flight:
+                    continue
+                if member.healthy and await self._ping(member):
+                    continue
+                self._schedule_reconnect(member)
+
+    async def _ping(self, member: _Member) -> bool:
+        assert member.client is not None
+        try:
+            return await asyncio.wait_for(member.client.ping(), self.connect_timeout)
+        except Exception:
+            return False
+
+    def _start_in_background(self) -> None:
+        if self._start_task is None:
+            self._start_task = asyncio.create_task(self.start())
+
+    async def _acquire(self, wait: bool) -> _Member:
+        while True:
+            healthy = [m for m in self.members if m.healthy]
+            if healthy:
+                return min(healthy, key=lambda m: m.in_flight)
+            if not wait:
+                raise UpstreamUnavailableError(
+                    f"Upstream server '{self.name}' is not connected"
+                )
+            self._available.clear()
+            for member in self.members:
+                self._schedule_reconnect(member)
+            try:
+                await asyncio.wait_for(self._available.wait(), self.connect_timeout)
+            except asyncio.TimeoutError:
+                raise UpstreamUnavailableError(
+                    f"Upstream server '{self.name}' is unavailable"
+                ) from None
+
+    @asynccontextmanager
+    async def session(self, wait: bool = True) -> AsyncIterator[Client]:
+        """
+        Borrow a connected client for the duration of one request.
+
+        With wait=False, fail at once if no session is connected rather than
+        waiting for the server to start or reconnect.
+        """
+        if not self._started:
+            if wait:
+                await self.start()
+            else:
+                self._start_in_background()
+        member = await self._acquire(wait)
+        assert member.client is not None
+        member.in_flight += 1
+        self.requests += 1
+        self.last_used = time.monotonic()
+        try:
+            yield member.client
+        except Exception:
+            self.request_failures += 1
+            if not member.healthy:
+                self._schedule_reconnect(member)
+            raise
+        finally:
+            member.in_flight -= 1
+            self.last_used = time.monotonic()
+
+    async def list_tools(self) -> list[mt.Tool]:
+        """
+        List the server's tools, from the catalogue while the pool is stopped.
+
+        A lazy or idle-stopped pool answers from the cached catalogue instead
+        of starting the server; listings from a running server refresh it.
+        """
+        if not self._started and (self.lazy or self.idle_shutdowns):
+            cached = self.cached_tools
+            if cached is not None:
+                return cached
+        fresh = "list_tools" not in self._listings
+        tools = await self.list("list_tools")
+        if fresh and self.catalogue is not None:
+            self.catalogue.put(self.name, self.fingerprint, tools)
+        return tools
+
+    async def list(self, method: str) -> list:
+        """
+        Run a listing request, serving repeats from memory.
+
+        Listings are kept until discovery_ttl passes or the server reports the
+        list changed. A lazy or idle-stopped pool answers resource and prompt
+        listings with the last ones it got, or empty ones, instead of starting
+        the server: clients send them on connect. Otherwise a pool that nothing
+        has started yet is started; one that is still starting or reconnecting
+        fails at once instead of holding up callers.
+        """
+        cached = self._listings.get(method)
+        if (
+            method != "list_tools"
+            and not self._started
+            and (self.lazy or self.idle_shutdowns)
+        ):
+            return cached[1] if cached is not None else []
+        if cached is not None and time.monotonic() - cached[0] < self.discovery_ttl:
+            self.listing_hits += 1
+            return cached[1]
+
+        self.listing_misses += 1
+        wait = not self._started and not self._start_lock.locked()
+        async with self.session(wait=wait) as client:
+            listing = await getattr(client, method)()
+        if self.discovery_ttl > 0:
+            self._listings[method] = (time.monotonic(), listing)
+        return listing  # type: ignore[no-any-return]
+
+    def invalidate_listings(self, *methods: str) -> None:
+        """Drop cached listings and tell listeners they have changed."""
+        methods = methods or tuple(_CATALOGUE_METHODS)
+        for method in methods:
+            self._listings.pop(method, None)
+        for listener in self.listeners:
+            listener(*methods)
+
+    def stats(self) -> dict:
+        """Get connection, reuse and cold-start statistics for this pool."""
+        replacements = self.spare_hits + self.spare_misses
+        return {
+            "pool_size": len(self.members),
+            "healthy": sum(m.healthy for m in self.members),
+            "in_flight": sum(m.in_flight for m in self.members),
+            "connects": self.connects,
+            "reconnects": self.reconnects,
+            "connect_failures": self.connect_failures,
+            "requests": self.requests,
+            "request_failures": self.request_failures,
+            # Requests served per session opened; higher means more reuse
+            "reuse_ratio": round(self.requests / self.connects, 2)
+            if self.connects
+            else 0.0,
+            "spares_ready": len(self.spares),
+            "spare_hits": self.spare_hits,
+            "spare_misses": self.spare_misses,
+            "spare_hit_rate": round(self.spare_hits / replacements, 2)
+            if replacements
+            else 0.0,
+            "cold_starts": self.cold_starts,
+            "avg_cold_start_ms": round(self.cold_start_total_ms / self.cold_starts, 1)
+            if self.cold_starts
+            else 0.0,
+            "max_cold_start_ms": round(self.cold_start_max_ms, 1),
+            "active": self._started,
+            "idle_shutdowns": self.idle_shutdowns,
+            "listing_hits": self.listing_hits,
+            "listing_misses": self.listing_misses,
+        }
+
+
+def _fingerprint(server_config: str) -> str:
+    return hashlib.sha256(server_config.encode()).hexdigest()[:16]
+
+
+def _runner_error(client: Client) -> BaseException | None:
+    """Returns why a client's session runner stopped, if it did."""
+    task = client._session_task
+    if task is None or not task.done() or task.cancelled():
+        return None
+    return task.exception()
+
+
+class PooledClient:
+    """
+    Stands in for a fastmcp Client inside a proxy server.
+
+    The proxy wraps each request in `async with client:`; here that is a no-op
+    and the request itself runs on a session borrowed from the pool.
+    """
+
+    def __init__(self, pool: UpstreamPool):
+        self.pool = pool
+
+    async def __aenter__(self) -> "PooledClient":
+        return self
+
+    async def __aexit__(self, *exc_info: object) -> None:
+        return None
+
+    async def list_tools(self) -> list[mt.Tool]:
+        return await self.pool.list_tools()
+
+    async def call_tool_mcp(
+        self,
+        name: str,
+        arguments: dict[str, Any],
+        progress_handler: Any = None,
+        timeout: datetime.timedelta | float | None = None,
+    ) -> mt.CallToolResult:
+        traceparent = tracing.current_traceparent()
+        async with self.pool.session() as client:
+            if traceparent is None:
+                return await client.call_tool_mcp(
+                    name, arguments, progress_handler=progress_handler, timeout=timeout
+                )
+            # fastmcp's client cannot set `_meta`, so send the request itself
+            # to pass the trace context on to the upstream server
+            if isinstance(timeout, int | float):
+                timeout = datetime.timedelta(seconds=timeout)
+            request = mt.CallToolRequest(
+                method="tools/call",
+                params=mt.CallToolRequestParams(
+                    name=name,
+                    arguments=arguments,
+                    _meta=mt.RequestParams.Meta.model_validate(
+                        {"traceparent": traceparent}
+                    ),
+                ),
+            )
+            return await client.session.send_request(
+                mt.ClientRequest(request),
+                mt.CallToolResult,
+                request_read_timeout_seconds=timeout,
+                progress_callback=progress_handler or client._progress_handler,
+            )
+
+    async def call_tool(
+        self,
+        name: str,
+        arguments: dict[str, Any] | None = None,
+        timeout: datetime.timedelta | float | None = None,
+        progress_handler: Any = None,
+    ) -> list:
+        result = await self.call_tool_mcp(
+            name, arguments or {}, progress_handler=progress_handler, timeout=timeout
+        )
+        if result.isError:
+            raise ToolError(getattr(result.content[0], "text", "Tool call failed"))
+        return result.content  # type: ignore[return-value]
+
+    def __getattr__(self, name: str) -> Any:
+        if name in _CATALOGUE_METHODS:
+            return lambda: self.pool.list(name)
+        if name not in _POOLED_METHODS:
+            raise AttributeError(name)
+
+        async def pooled_call(*args: Any, **kwargs: Any) -> Any:
+            async with self.pool.session() as client:
+                return await getattr(client, name)(*args, **kwargs)
+
+        return pooled_call
+
+
+class UpstreamManager:
+    """Owns one UpstreamPool per configured upstream MCP server."""
+
+    def __init__(self, pools: dict[str, UpstreamPool]):
+        if not pools:
+            raise ValueError("No MCP servers defined in the config")
+        self.pools = pools
+        self._startup_tasks: dict[str, asyncio.Task] = {}
+
+    @classmethod
+    def from_config(
+        cls,
+        mcp_config: dict[str, Any],
+        pool_size: int = 1,
+        catalogue_path: str | Path | None = None,
+        **pool_kwargs: Any,
+    ) -> "UpstreamManager":
+        """Create a pool for every server in an `mcpServers` configuration."""
+        config = MCPConfig.from_dict(mcp_config)
+        catalogue = ToolCatalogue(catalogue_path)
+        logger.info(
+            f"UPSTREAM_INIT | {len(config.mcpServers)} servers | "
+            f"{pool_size} sessions and {pool_kwargs.get('spares', 0)} spares each"
+        )
+        return cls(
+            {
+                name: UpstreamPool(
+                    name,
+                    server.to_transport,
+                    size=pool_size,
+                    catalogue=catalogue,
+                    fingerprint=_fingerprint(server.model_dump_json()),
+                    **pool_kwargs,
+                )
+                for name, server in config.mcpServers.items()
+            }
+        )
+
+    async def start(self, ready_timeout: float | None = None) -> None:
+        """
+        Connect to every upstream server concurrently.
+
+        Returns once every server is ready or after ready_timeout seconds,
+        whichever is first; servers still starting then finish in the
+        background and join the tool listing when they are ready.
+        """
+        if not self._startup_tasks:
+            self._startup_tasks = {
+                name: asyncio.create_task(self._start_pool(pool))
+                for name, pool in self.pools.items()
+            }
+        start_time = time.perf_counter()
+        _, pending = await asyncio.wait(
+            self._startup_tasks.values(), timeout=ready_timeout
+        )
+        elapsed_ms = (time.perf_counter() - start_time) * 1000
+        for name, task in self._startup_tasks.items():
+            if task in pending:
+                logger.warning(
+                    f"UPSTREAM_SLOW | {name} | Not ready after {elapsed_ms:.0f}ms, "
+                    "continuing to start in the background"
+                )
+        logger.info(
+            f"UPSTREAM_STARTUP | {len(self.pools) - len(pending)}/{len(self.pools)} "
+            f"servers ready in {elapsed_ms:.1f}ms"
+        )
+
+    async def _start_pool(self, pool: UpstreamPool) -> None:
+        if pool.lazy:
+            cached = pool.cached_tools
+            if cached is not None:
+                logger.info(
+                    f"UPSTREAM_LAZY | {pool.name} | {len(cached)} cached tools, "
+                    "starting on first use"
+                )
+                return
+        start_time = time.perf_counter()
+        await pool.start()
+        connected_ms = (time.perf_counter() - start_time) * 1000
+        try:
+            tool_count = len(await pool.list_tools())
+        except Exception as e:
+            logger.warning(
+                f"UPSTREAM_READY_FAIL | {pool.name} | "
+                f"No session after {connected_ms:.1f}ms: {e}"
+            )
+            return
+        listed_ms = (time.perf_counter() - start_time) * 1000 - connected_ms
+        healthy = sum(m.healthy for m in pool.members)
+        logger.info(
+            f"UPSTREAM_READY | {pool.name} | {healthy}/{len(pool.members)} sessions "
+            f"in {connected_ms:.1f}ms | {tool_count} tools listed in {listed_ms:.1f}ms"
+        )
+
+    async def stop(self) -> None:
+        """Close every upstream session."""
+        for task in self._startup_tasks.values():
+            task.cancel()
+        self._startup_tasks = {}
+        await asyncio.gather(*(pool.stop() for pool in self.pools.values()))
+
+    def server_of(self, tool_name: str) -> str | None:
+        """The name of the upstream server that provides a proxied tool."""
+        if len(self.pools) == 1:
+            return next(iter(self.pools))
+        # Mounted servers prefix their tools with "<name>_"; prefer the longest
+        for name in sorted(self.pools, key=len, reverse=True):
+            if tool_name.startswith(f"{name}_"):
+                return name
+        return None
+
+    def add_listener(self, listener: Callable[..., None]) -> None:
+        """Call listener with the list method names whenever a listing changes."""
+        for pool in self.pools.values():
+            pool.listeners.append(listener)
+
+    def build_server(self, **settings: Any) -> FastMCP:
+        """
+        Build the proxy server that fronts the upstreams.
+
+        Mirrors fastmcp's MCPConfig client: a single server is proxied as-is,
+        several are mounted with their name as the tool prefix.
+        """
+        if len(self.pools) == 1:
+            (pool,) = self.pools.values()
+            return FastMCPProxy(client=PooledClient(pool), **settings)  # type: ignore[arg-type]
+
+        server: FastMCP = FastMCP(**settings)
+        for name, pool in self.pools.items():
+            server.mount(
+                prefix=name,
+                server=FastMCPProxy(client=PooledClient(pool)),  # type: ignore[arg-type]
+                as_proxy=False,
+            )
+        return server
+
+    def stats(self) -> dict:
+        """Get per-server connection statistics."""
+        return {name: pool.stats() for name, pool in self.pools.items()}
@@ -0,0 +1,234 @@
+"""
+Multi-process HTTP serving.
+
+A front router owns the public port and forwards each request to one of N
+worker processes, each running its own guarded proxy on a loopback port.
+Requests carrying an MCP session ID always reach the worker that created the
+session, so the session's call history stays local to that worker.
+"""
+
+import itertools
+import multiprocessing
+import os
+import socket
+import time
+import zlib
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Callable, Sequence
+
+import httpx
+import uvicorn
+from starlette.applications import Starlette
+from starlette.background import BackgroundTask
+from starlette.requests import Request
+from starlette.responses import Response, StreamingResponse
+from starlette.routing import Route
+
+from tramlines.logger import logger
+from tramlines.metrics import serve_merged_metrics
+
+MCP_SESSION_HEADER = "mcp-session-id"
+
+# Headers that describe a single connection and must not be forwarded
+_HOP_BY_HOP_HEADERS = {"connection", "keep-alive", "transfer-encoding", "host"}
+
+
+class SessionAffinityRouter:
+    """
+    Routes MCP HTTP requests to workers, pinning each session to one worker.
+
+    New sessions are spread round-robin. The worker that answers with a new
+    session ID owns that session; sessions the router has not seen (for example
+    after a router restart) fall back to a stable hash of the session ID.
+    """
+
+    def __init__(
+        self,
+        worker_urls: list[str],
+        client: httpx.AsyncClient | None = None,
+        max_tracked_sessions: int = 100_000,
+    ):
+        if not worker_urls:
+            raise ValueError("At least one worker URL is required")
+        self.worker_urls = worker_urls
+        self.max_tracked_sessions = max_tracked_sessions
+        self._client = client or httpx.AsyncClient(timeout=None)
+        self._sessions: OrderedDict[str, int] = OrderedDict()
+        self._round_robin = itertools.cycle(range(len(worker_urls)))
+        self.app = Starlette(
+            routes=[
+                Route(
+                    "/{path:path}",
+                    self._forward,
+                    methods=["GET", "POST", "DELETE"],
+                )
+            ],
+            lifespan=self._lifespan,
+        )
+
+    @asynccontextmanager
+    async def _lifespan(self, app: Starlette) -> AsyncIterator[None]:
+        yield
+        await self._client.aclose()
+
+    def pick_worker(self, session_id: str | None) -> int:
+        """Choose the worker index for a request."""
+        if session_id is None:
+            return next(self._round_robin)
+        worker = self._sessions.get(session_id)
+        if worker is None:
+            return zlib.crc32(session_id.encode()) % len(self.worker_urls)
+        self._sessions.move_to_end(session_id)
+        return worker
+
+    def _remember(self, session_id: str, worker: int) -> None:
+        self._sessions[session_id] = worker
+        self._sessions.move_to_end(session_id)
+        if len(self._sessions) > self.max_tracked_sessions:
+            self._sessions.popitem(last=False)
+
+    async def _forward(self, request: Request) -> Response:
+        session_id = request.headers.get(MCP_SESSION_HEADER)
+        worker = self.pick_worker(session_id)
+        upstream_request = self._client.build_request(
+            request.method,
+            self.worker_urls[worker] + request.url.path,
+            params=request.query_params,
+            headers=[
+                (key, value)
+                for key, value in request.headers.items()
+                if key not in _HOP_BY_HOP_HEADERS
+            ],
+            content=request.stream(),
+        )
+        upstream = await self._client.send(upstream_request, stream=True)
+
+        new_session_id = upstream.headers.get(MCP_SESSION_HEADER)
+        if new_session_id and new_session_id != session_id:
+            self._remember(new_session_id, worker)
+        if request.method == "DELETE" and session_id:
+            self._sessions.pop(session_id, None)
+
+        return StreamingResponse(
+            upstream.aiter_raw(),
+            status_code=upstream.status_code,
+            headers={
+                key: value
+                for key, value in upstream.headers.items()
+                if key not in _HOP_BY_HOP_HEADERS
+            },
+            background=BackgroundTask(upstream.aclose),
+        )
+
+
+def _free_port(host: str) -> int:
+    with socket.socket() as sock:
+        sock.bind((host, 0))
+        return int(sock.getsockname()[1])
+
+
+def _wait_for_port(host: str, port: int, timeout: float) -> bool:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            with socket.create_connection((host, port), timeout=0.5):
+                return True
+        except OSError:
+            time.sleep(0.1)
+    return False
+
+
+def _run_worker(entrypoint: Callable[[list[str]], None], argv: list[str]) -> None:
+    # Leave the terminal's process group so Ctrl+C reaches only the router,
+    # which drains its connections before stopping the workers.
+    os.setsid()
+    entrypoint(argv)
+
+
+def serve_with_workers(
+    entrypoint: Callable[[list[str]], None],
+    argv: list[str],
+    host: str,
+    port: int,
+    workers: int,
+    graceful_timeout: float = 30.0,
+    startup_timeout: float = 120.0,
+    metrics_port: int | None = None,
+    shared_metrics: Sequence[str] = (),
+) -> None:
+    """
+    Run `workers` gateway processes behind a session-affinity router.
+
+    Each worker runs `entrypoint(argv + worker overrides)` as a single-process
+    HTTP gateway on a loopback port; the router listens on host:port. On
+    shutdown the router drains open connections before the workers are
+    stopped, and each worker drains its own before exiting.
+
+    With `metrics_port`, each worker serves its metrics on a loopback port of
+    its own and the router serves their sum on `metrics_port`, reporting the
+    gauges named in `shared_metrics` once rather than once per worker.
+    """
+    worker_host = "127.0.0.1"
+    ports = [_free_port(worker_host) for _ in range(workers)]
+    worker_metrics_ports = (
+        [_free_port(worker_host) for _ in range(workers)]
+        if metrics_port is not None
+        else []
+    )
+    context = multiprocessing.get_context("spawn")
+    processes = []
+    for number, worker_port in enumerate(ports):
+        worker_argv = argv + [
+            "--host",
+            worker_host,
+            "--port",
+            str(worker_port),
+            "--workers",
+            "1",
+        ]
+        if worker_metrics_ports:
+            worker_argv += ["--metrics-port", str(worker_metrics_ports[number])]
+        process = context.Process(
+            target=_run_worker, args=(entrypoint, worker_argv), daemon=False
+        )
+        process.start()
+        processes.append(process)
+
+    try:
+        for worker_port in ports:
+            if not _wait_for_port(worker_host, worker_port, startup_timeout):
+                raise RuntimeError(f"Worker on port {worker_port} failed to start")
+        logger.info(f"WORKERS_READY | {workers} workers on ports {ports}")
+
+        if metrics_port is not None:
+            try:
+                serve_merged_metrics(
+                    metrics_port,
+                    [f"http://{worker_host}:{p}/metrics" for p in worker_metrics_ports],
+                    shared=shared_metrics,
+                )
+            except OSError as e:
+                logger.warning(
+                    f"METRICS_ERROR | Cannot serve metrics on port {metrics_port}: {e}"
+                )
+
+        router = SessionAffinityRouter([f"http://{worker_host}:{p}" for p in ports])
+        uvicorn.Server(
+            uvicorn.Config(
+                router.app,
+                host=host,
+                port=port,
+                log_level="warning",
+                timeout_graceful_shutdown=int(graceful_timeout),
+            )
+        ).run()
+    finally:
+        logger.info("WORKERS_SHUTDOWN | Draining worker processes")
+        for process in processes:
+            if process.is_alive():
+                process.terminate()
+        for process in processes:
+            process.join(timeout=graceful_timeout)
+            if process.is_alive():
+                process.kill()
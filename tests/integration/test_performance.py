@@ -6,8 +6,14 @@ import pytest
 from fastmcp import FastMCP
 
 from tramlines.guardrail.dsl.evaluator import evaluate_call
+from tramlines.guardrail.extensions.encoding_detector import detect_encoding
 from tramlines.proxy import create_guarded_proxy
 from tramlines.session import ToolCall
+from tramlines.session_store import (
+    InMemorySessionStore,
+    SessionStore,
+    SqliteSessionStore,
+)
 
 
 def create_performance_server() -> FastMCP:
@@ -130,3 +136,57 @@ class TestPerformance:
 
         avg_session_time_ms = statistics.mean(session_creation_times) * 1000
         assert avg_session_time_ms < 5
+
+
+def _best_scan_time(detector, text: str, runs: int = 3) -> float:
+    """Return the fastest of several runs of a detector over text."""
+    times = []
+    for _ in range(runs):
+        start_time = time.perf_counter()
+        detector(text)
+        times.append(time.perf_counter() - start_time)
+    return min(times)
+
+
+@pytest.mark.performance
+class TestDetectorPerformance:
+    BENIGN_LINE = "The quick brown fox jumps over the lazy dog, again and again. "
+
+    def test_encoding_detector_scales_linearly_on_large_inputs(self):
+        small = self.BENIGN_LINE * 16_000  # ~1 MB
+        large = self.BENIGN_LINE * 64_000  # ~4 MB
+
+        assert detect_encoding(large) is False
+        small_time = _best_scan_time(detect_encoding, small)
+        large_time = _best_scan_time(detect_encoding, large)
+
+        assert large_time < small_time * 6
+        assert large_time < 1.0
+
+
+def _session_round_trip_ms(store: SessionStore, sessions: int = 50) -> float:
+    """Average time for one lookup plus one recorded call, as on_call_tool does."""
+    start_time = time.perf_counter()
+    for i in range(500):
+        session_id = f"session_{i % sessions}"
+        history = store.get_history(session_id)
+        tool_call = ToolCall(name="get_issue", arguments={"owner": "o", "repo": "r"})
+        history.add_call(tool_call)
+        store.record_call(session_id, tool_call)
+    return (time.perf_counter() - start_time) * 1000 / 500
+
+
+@pytest.mark.performance
+class TestSessionStorePerformance:
+    def test_sqlite_store_round_trip_compared_with_in_memory(self, tmp_path):
+        # Best of several runs: the first one also pays for creating sessions
+        in_memory_store = InMemorySessionStore()
+        in_memory_ms = min(_session_round_trip_ms(in_memory_store) for _ in range(3))
+        sqlite_store = SqliteSessionStore(tmp_path / "sessions.db")
+        try:
+            sqlite_ms = _session_round_trip_ms(sqlite_store)
+        finally:
+            sqlite_store.close()
+
+        assert in_memory_ms < 0.1
+        assert sqlite_ms < 5
@@ -0,0 +1,169 @@
+import asyncio
+import json
+
+import pytest
+from fastmcp import Client, FastMCP
+from fastmcp.exceptions import ToolError
+
+from tramlines.audit import (
+    AuditLog,
+    AuditRecord,
+    SegmentIndex,
+    arguments_digest,
+    encode_record,
+)
+from tramlines.audit_query import query
+from tramlines.guardrail.dsl.context import call
+from tramlines.guardrail.dsl.rules import rule
+from tramlines.guardrail.dsl.types import Policy
+from tramlines.middleware import GuardRailMiddleware
+
+
+def read_records(audit_log):
+    audit_log.flush()
+    return list(query(audit_log.directory))
+
+
+class TestAuditLog:
+    def test_records_are_compact_json_without_empty_fields(self):
+        line = encode_record(
+            AuditRecord(1700000000.5, "s1", "get_issue", {"number": 1}, "allow")
+        )
+
+        assert line.endswith(b"\n")
+        assert b" " not in line
+        assert json.loads(line) == {
+            "ts": 1700000000.5,
+            "session": "s1",
+            "tool": "get_issue",
+            "args": arguments_digest({"number": 1}),
+            "decision": "allow",
+        }
+
+    def test_digest_identifies_arguments_without_revealing_them(self):
+        digest = arguments_digest({"token": "secret", "n": 1})
+
+        assert digest == arguments_digest({"n": 1, "token": "secret"})
+        assert digest != arguments_digest({"token": "other", "n": 1})
+        assert "secret" not in digest
+        assert len(digest) == 16
+
+    @pytest.mark.asyncio
+    async def test_records_are_written_in_order(self, tmp_path):
+        audit_log = AuditLog(tmp_path / "audit")
+        for number in range(50):
+            await audit_log.record(
+                AuditRecord(float(number), "s1", "get_issue", {"n": number}, "allow")
+            )
+
+        records = read_records(audit_log)
+        assert [record["ts"] for record in records] == [float(n) for n in range(50)]
+        assert audit_log.stats()["written"] == 50
+        assert audit_log.segment.stat().st_mode & 0o777 == 0o600
+        audit_log.close()
+
+    @pytest.mark.asyncio
+    async def test_full_queue_drops_or_waits(self, tmp_path, monkeypatch):
+        # No writer thread, so queued records stay queued
+        monkeypatch.setattr(AuditLog, "_start", lambda self: None)
+        dropping = AuditLog(tmp_path / "drop", max_queued=1)
+        waiting = AuditLog(tmp_path / "wait", max_queued=1, backpressure="wait")
+        for audit_log in (dropping, waiting):
+            await audit_log.record(AuditRecord(0.0, "s1", "t", {}, "allow"))
+
+        await dropping.record(AuditRecord(1.0, "s1", "t", {}, "allow"))
+        assert dropping.stats()["queued"] == 1
+        assert dropping.stats()["dropped"] == 1
+
+        pending = asyncio.create_task(
+            waiting.record(AuditRecord(1.0, "s1", "t", {}, "allow"))
+        )
+        await asyncio.sleep(0.01)
+        assert not pending.done()
+        waiting._queue.get_nowait()
+        await asyncio.wait_for(pending, 1)
+        assert waiting.stats()["waits"] == 1
+        assert waiting.stats()["queued"] == 1
+
+    @pytest.mark.asyncio
+    async def test_segments_roll_and_are_indexed_when_sealed(self, tmp_path):
+        audit_log = AuditLog(tmp_path, segment_bytes=400)
+        for number in range(10):
+            await audit_log.record(
+                AuditRecord(float(number), f"s{number % 2}", "get_issue", {}, "allow")
+            )
+            audit_log.flush()
+        audit_log.close()
+
+        segments = sorted(tmp_path.glob("audit-*.jsonl"))
+        assert len(segments) > 1
+        indexed = 0
+        for segment in segments:
+            index = SegmentIndex.load(segment.with_suffix(".idx"))
+            assert set(index.keys["session"]) <= {"s0", "s1"}
+            indexed += index.records
+        assert indexed == 10
+
+    def test_index_maps_values_to_blocks(self):
+        index = SegmentIndex(block_size=100)
+        for number in range(4):
+            record = AuditRecord(float(number), f"s{number}", "get_issue", {}, "allow")
+            index.add(number * 60, 60, record)
+
+        assert index.blocks == [[0, 120, 0.0, 1.0], [120, 240, 2.0, 3.0]]
+        assert index.keys["session"] == {"s0": [0], "s1": [0], "s2": [1], "s3": [1]}
+        assert index.keys["tool"] == {"get_issue": [0, 1]}
+        assert index.keys["rule"] == {}
+
+    def test_invalid_policies_are_rejected(self, tmp_path):
+        with pytest.raises(ValueError, match="Fsync"):
+            AuditLog(tmp_path, fsync="sometimes")
+        with pytest.raises(ValueError, match="Backpressure"):
+            AuditLog(tmp_path, backpressure="panic")
+
+
+class TestAuditedToolCalls:
+    @pytest.mark.asyncio
+    async def test_every_call_gets_a_decision_record(self, tmp_path):
+        server = FastMCP("Issues")
+
+        @server.tool
+        def get_issue(number: int) -> str:
+            return f"Issue {number}"
+
+        @server.tool
+        def delete_issue(number: int) -> str:
+            return "deleted"
+
+        policy = Policy(
+            name="No deletes",
+            rules=[
+                rule("No deletes")
+                .when(call.name == "delete_issue")
+                .block("Deleting is not allowed"),
+            ],
+        )
+        audit_log = AuditLog(tmp_path)
+        middleware = GuardRailMiddleware(policy=policy, audit_log=audit_log)
+        server.add_middleware(middleware)
+
+        async with Client(server) as client:
+            await client.list_tools()
+            await client.call_tool("get_issue", {"number": 1})
+            with pytest.raises(ToolError):
+                await client.call_tool("delete_issue", {"number": 1})
+            with pytest.raises(ToolError):
+                await client.call_tool("get_issue", {"number": "one"})
+
+        allowed, blocked, invalid = read_records(audit_log)
+        assert allowed["decision"] == "allow"
+        assert allowed["tool"] == "get_issue"
+        assert allowed["upstream_ms"] <= allowed["ms"]
+        assert "policy_ms" in allowed
+        assert blocked["decision"] == "block"
+        assert blocked["rule"] == "No deletes"
+        assert "upstream_ms" not in blocked
+        assert blocked["session"] == allowed["session"]
+        assert invalid["decision"] == "invalid"
+        audit_log.close()
+        middleware.sessions.stop_expiry()
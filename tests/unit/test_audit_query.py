@@ -0,0 +1,114 @@
+import json
+
+import pytest
+
+from tramlines.audit import AuditLog, AuditRecord, SegmentIndex
+from tramlines.audit_query import main, parse_time, query
+
+
+async def write_log(directory, records, **settings):
+    audit_log = AuditLog(directory, **settings)
+    for record in records:
+        await audit_log.record(record)
+    audit_log.close()
+
+
+RECORDS = [
+    AuditRecord(100.0, "s1", "get_issue", {"n": 1}, "allow"),
+    AuditRecord(200.0, "s2", "delete_issue", {"n": 1}, "block", "No deletes"),
+    AuditRecord(300.0, "s1", "delete_issue", {"n": 2}, "block", "No deletes"),
+    AuditRecord(400.0, "s2", "get_issue", {"n": 2}, "allow"),
+]
+
+
+class TestQuery:
+    @pytest.mark.asyncio
+    async def test_filters_by_indexed_fields_and_time(self, tmp_path):
+        await write_log(tmp_path, RECORDS)
+
+        def timestamps(**filters):
+            return [record["ts"] for record in query(tmp_path, **filters)]
+
+        assert timestamps() == [100.0, 200.0, 300.0, 400.0]
+        assert timestamps(session="s1") == [100.0, 300.0]
+        assert timestamps(rule="No deletes", session="s2") == [200.0]
+        assert timestamps(tool="get_issue", decision="allow") == [100.0, 400.0]
+        assert timestamps(since=150.0, until=350.0) == [200.0, 300.0]
+        assert timestamps(session="s3") == []
+
+    @pytest.mark.asyncio
+    async def test_index_limits_reads_to_matching_blocks(self, tmp_path):
+        records = [
+            AuditRecord(float(n), f"s{n // 100}", "get_issue", {"n": n}, "allow")
+            for n in range(1000)
+        ]
+        await write_log(tmp_path, records)
+        (segment,) = tmp_path.glob("audit-*.jsonl")
+        index = SegmentIndex.load(segment.with_suffix(".idx"))
+
+        assert len(index.blocks) > 1
+        assert len(index.keys["session"]["s0"]) < len(index.blocks)
+        assert [record["ts"] for record in query(tmp_path, session="s9")] == [
+            float(n) for n in range(900, 1000)
+        ]
+
+    @pytest.mark.asyncio
+    async def test_segments_without_an_index_are_scanned(self, tmp_path):
+        await write_log(tmp_path, RECORDS)
+        for index in tmp_path.glob("*.idx"):
+            index.unlink()
+        (segment,) = tmp_path.glob("audit-*.jsonl")
+        with segment.open("ab") as file:
+            file.write(b'{"ts":500.0,"session":"s1"')
+
+        assert [record["ts"] for record in query(tmp_path, session="s1")] == [
+            100.0,
+            300.0,
+        ]
+        assert len(list(query(tmp_path))) == 4
+
+    @pytest.mark.asyncio
+    async def test_queries_span_segments_oldest_first(self, tmp_path):
+        await write_log(tmp_path, RECORDS[:2])
+        await write_log(tmp_path, RECORDS[2:])
+
+        assert len(list(tmp_path.glob("audit-*.jsonl"))) == 2
+        assert [record["ts"] for record in query(tmp_path, rule="No deletes")] == [
+            200.0,
+            300.0,
+        ]
+
+    def test_missing_directory_has_no_records(self, tmp_path):
+        assert list(query(tmp_path / "missing")) == []
+
+
+class TestParseTime:
+    def test_ages_epochs_and_iso_times(self):
+        assert parse_time("7d", now=1_000_000.0) == 1_000_000.0 - 7 * 86400
+        assert parse_time("90m", now=10_000.0) == 10_000.0 - 5400
+        assert parse_time("1700000000") == 1700000000.0
+        assert parse_time("2023-11-14T22:13:20+00:00") == 1700000000.0
+
+    def test_invalid_times_are_rejected(self):
+        with pytest.raises(ValueError, match="Invalid time"):
+            parse_time("last week")
+
+
+class TestAuditCommand:
+    @pytest.mark.asyncio
+    async def test_prints_records_counts_and_groups(self, tmp_path, capsys):
+        await write_log(tmp_path, RECORDS)
+
+        main(["query", "--dir", str(tmp_path), "--session", "s2", "--limit", "1"])
+        (line,) = capsys.readouterr().out.splitlines()
+        assert json.loads(line)["tool"] == "delete_issue"
+
+        main(["query", "--dir", str(tmp_path), "--rule", "No deletes", "--count"])
+        assert capsys.readouterr().out == "2\n"
+
+        main(["query", "--dir", str(tmp_path), "--group-by", "decision"])
+        assert capsys.readouterr().out.splitlines() == ["2\tallow", "2\tblock"]
+
+    def test_invalid_time_exits(self, tmp_path):
+        with pytest.raises(SystemExit):
+            main(["query", "--dir", str(tmp_path), "--since", "soon"])
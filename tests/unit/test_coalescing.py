@@ -0,0 +1,144 @@
+import asyncio
+from types import SimpleNamespace
+
+import mcp.types as mt
+import pytest
+from fastmcp import Client, FastMCP
+
+from tramlines.coalescing import RequestCoalescer
+from tramlines.middleware import GuardRailMiddleware
+
+
+class SlowUpstream:
+    """Counts executions and holds each one until released."""
+
+    def __init__(self):
+        self.executions = 0
+        self.release = asyncio.Event()
+
+    async def call(self, value="result"):
+        self.executions += 1
+        await self.release.wait()
+        if isinstance(value, Exception):
+            raise value
+        return [value]
+
+
+class TestRequestCoalescer:
+    @pytest.mark.asyncio
+    async def test_identical_concurrent_calls_share_one_execution(self):
+        coalescer = RequestCoalescer(["get_issue"])
+        upstream = SlowUpstream()
+
+        calls = [
+            asyncio.create_task(coalescer.run("get_issue", {"n": 1}, upstream.call))
+            for _ in range(3)
+        ]
+        await asyncio.sleep(0)
+        upstream.release.set()
+        results = await asyncio.gather(*calls)
+
+        assert results == [["result"]] * 3
+        assert results[0] is not results[1]
+        assert upstream.executions == 1
+        assert coalescer.stats() == {"in_flight": 0, "executions": 1, "coalesced": 2}
+
+    @pytest.mark.asyncio
+    async def test_different_arguments_and_other_tools_are_not_shared(self):
+        coalescer = RequestCoalescer(["get_issue"])
+        upstream = SlowUpstream()
+        upstream.release.set()
+
+        await asyncio.gather(
+            coalescer.run("get_issue", {"n": 1}, upstream.call),
+            coalescer.run("get_issue", {"n": 2}, upstream.call),
+            coalescer.run("close_issue", {"n": 1}, upstream.call),
+            coalescer.run("close_issue", {"n": 1}, upstream.call),
+        )
+
+        assert upstream.executions == 4
+
+    @pytest.mark.asyncio
+    async def test_errors_reach_every_caller(self):
+        coalescer = RequestCoalescer(["get_issue"])
+        upstream = SlowUpstream()
+
+        calls = [
+            asyncio.create_task(
+                coalescer.run(
+                    "get_issue", {}, lambda: upstream.call(RuntimeError("down"))
+                )
+            )
+            for _ in range(2)
+        ]
+        await asyncio.sleep(0)
+        upstream.release.set()
+        results = await asyncio.gather(*calls, return_exceptions=True)
+
+        assert [str(r) for r in results] == ["down", "down"]
+        assert upstream.executions == 1
+
+    @pytest.mark.asyncio
+    async def test_cancelled_caller_does_not_cancel_the_others(self):
+        coalescer = RequestCoalescer(["get_issue"])
+        upstream = SlowUpstream()
+
+        first = asyncio.create_task(coalescer.run("get_issue", {}, upstream.call))
+        second = asyncio.create_task(coalescer.run("get_issue", {}, upstream.call))
+        await asyncio.sleep(0)
+        first.cancel()
+        await asyncio.sleep(0)
+        upstream.release.set()
+
+        assert await second == ["result"]
+        assert first.cancelled()
+
+    def test_tools_annotated_idempotent_or_read_only_are_coalesced(self):
+        coalescer = RequestCoalescer()
+        coalescer.update_tools(
+            [
+                SimpleNamespace(
+                    name="get_issue",
+                    annotations=mt.ToolAnnotations(readOnlyHint=True),
+                ),
+                SimpleNamespace(
+                    name="set_label",
+                    annotations=mt.ToolAnnotations(idempotentHint=True),
+                ),
+                SimpleNamespace(name="create_issue", annotations=None),
+            ]
+        )
+
+        assert coalescer.applies_to("get_issue")
+        assert coalescer.applies_to("set_label")
+        assert not coalescer.applies_to("create_issue")
+
+
+class TestCoalescedToolCalls:
+    @pytest.mark.asyncio
+    async def test_each_session_records_its_own_call(self):
+        server = FastMCP("Issues")
+        upstream = SlowUpstream()
+
+        @server.tool(annotations=mt.ToolAnnotations(readOnlyHint=True))
+        async def get_issue(number: int) -> str:
+            return (await upstream.call(f"Issue {number}"))[0]
+
+        middleware = GuardRailMiddleware()
+        server.add_middleware(middleware)
+
+        async with Client(server) as first, Client(server) as second:
+            await first.list_tools()
+            calls = [
+                asyncio.create_task(client.call_tool("get_issue", {"number": 1}))
+                for client in (first, second)
+            ]
+            while middleware.coalescer.stats()["coalesced"] < 1:
+                await asyncio.sleep(0.01)
+            upstream.release.set()
+            results = await asyncio.gather(*calls)
+
+        assert [r[0].text for r in results] == ["Issue 1", "Issue 1"]
+        assert upstream.executions == 1
+        assert middleware.get_session_stats()["total_calls"] == 2
+        middleware.sessions.stop_expiry()
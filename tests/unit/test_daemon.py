@@ -0,0 +1,130 @@
+import json
+import tempfile
+from pathlib import Path
+
+import anyio
+import pytest
+from anyio.streams.buffered import BufferedByteReceiveStream
+from fastmcp import FastMCP
+
+from tramlines.daemon import LocalDaemon
+from tramlines.middleware import GuardRailMiddleware
+from tramlines.shim import relay
+
+
+@pytest.fixture
+def socket_path():
+    # Unix socket paths are limited to ~100 characters, so avoid deep tmp_path
+    with tempfile.TemporaryDirectory(prefix="tl-") as directory:
+        yield Path(directory) / "daemon.sock"
+
+
+@pytest.fixture
+def guarded_server():
+    server = FastMCP("test")
+
+    @server.tool
+    def echo(text: str) -> str:
+        return text
+
+    middleware = GuardRailMiddleware()
+    server.add_middleware(middleware)
+    return server, middleware
+
+
+class LineClient:
+    """Minimal newline-delimited JSON-RPC client, as relayed by tl-connect."""
+
+    def __init__(self, stream):
+        self.stream = stream
+        self.buffered = BufferedByteReceiveStream(stream)
+        self.next_id = 0
+
+    async def send(self, method: str, params: dict | None = None, notify=False):
+        message = {"jsonrpc": "2.0", "method": method, "params": params or {}}
+        if not notify:
+            self.next_id += 1
+            message["id"] = self.next_id
+        await self.stream.send(json.dumps(message).encode() + b"\n")
+        if notify:
+            return None
+        return json.loads(await self.buffered.receive_until(b"\n", 1 << 20))
+
+    async def initialize(self):
+        await self.send(
+            "initialize",
+            {
+                "protocolVersion": "2025-03-26",
+                "capabilities": {},
+                "clientInfo": {"name": "test", "version": "1"},
+            },
+        )
+        await self.send("notifications/initialized", notify=True)
+
+
+async def wait_for_socket(path: Path):
+    with anyio.fail_after(5):
+        while not path.exists():
+            await anyio.sleep(0.01)
+
+
+class TestLocalDaemon:
+    @pytest.mark.asyncio
+    async def test_each_connection_is_its_own_session(
+        self, guarded_server, socket_path
+    ):
+        server, middleware = guarded_server
+        daemon = LocalDaemon(server, socket_path)
+
+        async with anyio.create_task_group() as tg:
+            tg.start_soon(daemon.serve)
+            await wait_for_socket(socket_path)
+
+            for _ in range(2):
+                async with await anyio.connect_unix(socket_path) as stream:
+                    client = LineClient(stream)
+                    await client.initialize()
+                    response = await client.send(
+                        "tools/call", {"name": "echo", "arguments": {"text": "hi"}}
+                    )
+                    assert response["result"]["content"][0]["text"] == "hi"
+
+            assert daemon.total_connections == 2
+            assert middleware.get_session_stats()["active_sessions"] == 2
+            tg.cancel_scope.cancel()
+
+        assert not socket_path.exists()
+
+    @pytest.mark.asyncio
+    async def test_refuses_socket_of_running_daemon(self, guarded_server, socket_path):
+        server, _ = guarded_server
+
+        async with anyio.create_task_group() as tg:
+            tg.start_soon(LocalDaemon(server, socket_path).serve)
+            await wait_for_socket(socket_path)
+
+            with pytest.raises(RuntimeError):
+                await LocalDaemon(server, socket_path).serve()
+            tg.cancel_scope.cancel()
+
+    @pytest.mark.asyncio
+    async def test_replaces_stale_socket(self, guarded_server, socket_path):
+        server, _ = guarded_server
+        socket_path.touch()
+
+        async with anyio.create_task_group() as tg:
+            tg.start_soon(LocalDaemon(server, socket_path).serve)
+            with anyio.fail_after(5):
+                while True:
+                    try:
+                        stream = await anyio.connect_unix(socket_path)
+                        break
+                    except OSError:
+                        await anyio.sleep(0.01)
+            await stream.aclose()
+            tg.cancel_scope.cancel()
+
+
+def test_shim_reports_missing_daemon(socket_path, capsys):
+    assert relay(str(socket_path)) == 1
+    assert "tl --daemon" in capsys.readouterr().err
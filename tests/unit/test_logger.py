@@ -0,0 +1,150 @@
+import gzip
+import os
+import time
+
+import pytest
+
+from tramlines.logger import _TramlinesLogger
+
+
+@pytest.fixture
+def make_logger(tmp_path):
+    loggers = []
+
+    def make(**settings):
+        log = _TramlinesLogger(log_dir=tmp_path, echo=False, **settings)
+        loggers.append(log)
+        return log
+
+    yield make
+    for log in loggers:
+        log.close()
+
+
+def lines(log):
+    log.flush()
+    return log.log_file.read_text().splitlines()
+
+
+class TestTramlinesLogger:
+    def test_lines_below_the_level_are_not_written(self, make_logger):
+        log = make_logger(level="INFO")
+        log.debug("CACHE_HIT | tool=get_issue")
+        log.info("TOOL_CALL | tool=get_issue")
+
+        written = lines(log)
+        assert len(written) == 1
+        assert written[0].endswith(" | INFO | TOOL_CALL | tool=get_issue")
+        assert not log.is_enabled("DEBUG")
+
+    def test_arguments_are_only_formatted_when_written(self, make_logger):
+        class Expensive:
+            formatted = 0
+
+            def __str__(self):
+                Expensive.formatted += 1
+                return "stats"
+
+        log = make_logger(level="INFO")
+        log.debug("UPSTREAM_STATS | %s", Expensive())
+        log.info("UPSTREAM_STATS | %s", Expensive())
+
+        assert lines(log)[0].endswith("UPSTREAM_STATS | stats")
+        assert Expensive.formatted == 1
+
+    def test_level_can_be_configured(self, make_logger):
+        log = make_logger(level="WARNING")
+        log.configure(level="debug")
+        log.debug("SESSION_CREATE | session_id=s1")
+
+        assert len(lines(log)) == 1
+        with pytest.raises(AttributeError):
+            log.configure(colour=True)
+
+    def test_repeated_errors_are_rate_limited_per_tag(self, make_logger):
+        log = make_logger(rate_limit=3, rate_window=60.0)
+        for number in range(10):
+            log.error(f"GUARDRAIL_ERROR | Error evaluating rule 'r{number}'")
+        log.error("RESULT_BLOCKED | tool=read_file")
+        log.close()
+
+        written = log.log_file.read_text().splitlines()
+        assert sum("GUARDRAIL_ERROR | Error" in line for line in written) == 3
+        assert any("RESULT_BLOCKED" in line for line in written)
+        assert written[-1].endswith(
+            "LOG_SUPPRESSED | 7 more 'GUARDRAIL_ERROR' lines in 60s were not written"
+        )
+
+    def test_rate_limit_resets_after_the_window(self, make_logger):
+        log = make_logger(rate_limit=1, rate_window=0.05)
+        log.warning("UPSTREAM_RETRY | github")
+        log.warning("UPSTREAM_RETRY | github")
+        time.sleep(0.06)
+        log.warning("UPSTREAM_RETRY | github")
+
+        written = lines(log)
+        assert len(written) == 3
+        assert "LOG_SUPPRESSED | 1 more 'UPSTREAM_RETRY'" in written[1]
+
+    def test_untagged_lines_share_one_rate_limit(self, make_logger):
+        log = make_logger(rate_limit=2, rate_window=60.0)
+        for number in range(5):
+            log.warning(f"Could not reach upstream {number}")
+        log.warning("Upstream says: retry | later")
+        assert set(log._rates) == {("WARNING", "untagged")}
+        log.close()
+
+        written = log.log_file.read_text().splitlines()
+        assert sum("upstream" in line for line in written) == 2
+        assert written[-1].endswith(
+            "LOG_SUPPRESSED | 4 more 'untagged' lines in 60s were not written"
+        )
+
+    def test_ended_rate_windows_are_dropped(self, make_logger, monkeypatch):
+        monkeypatch.setattr("tramlines.logger._MAX_RATE_KEYS", 2)
+        log = make_logger(rate_limit=1, rate_window=0.05)
+        log.error("FIRST_ERROR | a")
+        log.error("FIRST_ERROR | a")
+        log.error("SECOND_ERROR | b")
+        time.sleep(0.06)
+        log.error("THIRD_ERROR | c")
+
+        assert set(log._rates) == {("ERROR", "THIRD_ERROR")}
+        assert "LOG_SUPPRESSED | 1 more 'FIRST_ERROR'" in lines(log)[-2]
+
+    def test_file_is_rotated_and_compressed_when_full(self, make_logger, tmp_path):
+        log = make_logger(max_bytes=100, backups=2)
+        for number in range(4):
+            log.info("X" * 60 + f" {number}")
+            log.flush()
+
+        backups = sorted(tmp_path.glob("tramlines-*.log.gz"))
+        assert len(backups) == 2
+        assert lines(log)[0].endswith(" 3")
+        with gzip.open(backups[-1], "rt") as backup:
+            assert backup.read().strip().endswith(" 2")
+
+    def test_file_is_rotated_when_its_period_has_passed(self, make_logger, tmp_path):
+        log = make_logger()
+        log.log_file.write_text("yesterday\n")
+        two_days_ago = time.time() - 2 * 24 * 3600
+        os.utime(log.log_file, (two_days_ago, two_days_ago))
+
+        log.info("TOOL_CALL | tool=get_issue")
+
+        assert len(lines(log)) == 1
+        (backup,) = tmp_path.glob("tramlines-*.log.gz")
+        with gzip.open(backup, "rt") as content:
+            assert content.read() == "yesterday\n"
+
+    def test_file_replaced_by_another_process_is_reopened(self, make_logger):
+        log = make_logger()
+        log.info("first")
+        log.flush()
+        log.log_file.rename(log.log_file.with_suffix(".old"))
+
+        log.info("second")
+
+        written = lines(log)
+        assert len(written) == 1
+        assert written[0].endswith("second")
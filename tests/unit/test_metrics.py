@@ -0,0 +1,254 @@
+import urllib.error
+import urllib.request
+
+import pytest
+from fastmcp import Client, FastMCP
+from fastmcp.exceptions import ToolError
+
+from tramlines.guardrail.dsl.context import call
+from tramlines.guardrail.dsl.rules import rule
+from tramlines.guardrail.dsl.types import Policy
+from tramlines.metrics import (
+    REGISTRY,
+    SESSION_STORE_GAUGES,
+    Registry,
+    merge_expositions,
+    serve_merged_metrics,
+    serve_metrics,
+    timed_detector,
+    write_metrics_file,
+)
+from tramlines.middleware import GuardRailMiddleware
+
+
+def sample(text, line_start):
+    """The value of the sample whose line starts with line_start."""
+    for line in text.splitlines():
+        if line.startswith(line_start + " "):
+            return float(line.rsplit(" ", 1)[1])
+    return None
+
+
+class TestRegistry:
+    def test_counters_render_with_labels(self):
+        registry = Registry()
+        calls = registry.counter("calls_total", "Calls", ("tool", "decision"))
+        calls.labels("get_issue", "allow").inc()
+        calls.labels("get_issue", "allow").inc(2)
+        calls.labels('say "hi"', "block").inc()
+
+        text = registry.render()
+        assert "# HELP calls_total Calls\n# TYPE calls_total counter\n" in text
+        assert sample(text, 'calls_total{tool="get_issue",decision="allow"}') == 3
+        assert sample(text, 'calls_total{tool="say \\"hi\\"",decision="block"}') == 1
+
+    def test_histograms_render_cumulative_buckets(self):
+        registry = Registry()
+        latency = registry.histogram("latency_seconds", "Latency", buckets=(0.1, 1.0))
+        for value in (0.05, 0.1, 0.5, 3.0):
+            latency.observe(value)
+
+        text = registry.render()
+        assert sample(text, 'latency_seconds_bucket{le="0.1"}') == 2
+        assert sample(text, 'latency_seconds_bucket{le="1"}') == 3
+        assert sample(text, 'latency_seconds_bucket{le="+Inf"}') == 4
+        assert sample(text, "latency_seconds_count") == 4
+        assert sample(text, "latency_seconds_sum") == pytest.approx(3.65)
+
+    def test_callbacks_are_read_when_rendered(self):
+        registry = Registry()
+        sessions = {"count": 1}
+        registry.callback("sessions", "Sessions", lambda: sessions["count"])
+        registry.callback(
+            "lookups_total",
+            "Lookups",
+            lambda: {("hit",): 3, ("miss",): 1},
+            labels=("result",),
+            type="counter",
+        )
+        sessions["count"] = 5
+
+        text = registry.render()
+        assert sample(text, "sessions") == 5
+        assert "# TYPE lookups_total counter" in text
+        assert sample(text, 'lookups_total{result="miss"}') == 1
+
+    def test_label_values_must_match_label_names(self):
+        counter = Registry().counter("calls_total", "Calls", ("tool",))
+        with pytest.raises(ValueError, match="takes labels"):
+            counter.labels("get_issue", "allow")
+
+    def test_failing_callback_does_not_break_rendering(self):
+        registry = Registry()
+        registry.callback("broken", "Broken", lambda: 1 / 0)
+        registry.gauge("up", "Up").set(1)
+
+        assert sample(registry.render(), "up") == 1
+
+    def test_timed_detector_records_each_call(self):
+        @timed_detector("test_detector")
+        def detect(text):
+            """Detects nothing."""
+            return False
+
+        detect("a")
+        detect("b")
+
+        assert detect.__doc__ == "Detects nothing."
+        text = REGISTRY.render()
+        assert (
+            sample(text, 'tramlines_detector_seconds_count{detector="test_detector"}')
+            == 2
+        )
+
+
+class TestExposition:
+    def test_metrics_are_served_over_http(self):
+        registry = Registry()
+        registry.gauge("up", "Up").set(1)
+        server = serve_metrics(0, registry=registry)
+        url = f"http://127.0.0.1:{server.server_port}"
+        try:
+            with urllib.request.urlopen(f"{url}/metrics") as response:
+                assert response.headers["Content-Type"].startswith("text/plain")
+                assert sample(response.read().decode(), "up") == 1
+            with pytest.raises(urllib.error.HTTPError):
+                urllib.request.urlopen(f"{url}/other")
+        finally:
+            server.shutdown()
+            server.server_close()
+
+    def test_expositions_of_workers_are_summed(self):
+        workers = []
+        for calls in (1, 2):
+            registry = Registry()
+            registry.counter("calls_total", "Calls", ("tool",)).labels("a").inc(calls)
+            registry.histogram("latency_seconds", "Latency", buckets=(1.0,)).observe(
+                0.5 * calls
+            )
+            workers.append(registry.render())
+        registry = Registry()
+        registry.counter("calls_total", "Calls", ("tool",)).labels("b").inc()
+        workers.append(registry.render())
+
+        text = merge_expositions(workers)
+
+        assert text.count("# TYPE calls_total counter") == 1
+        assert sample(text, 'calls_total{tool="a"}') == 3
+        assert sample(text, 'calls_total{tool="b"}') == 1
+        assert sample(text, 'latency_seconds_bucket{le="1"}') == 2
+        assert sample(text, "latency_seconds_sum") == 1.5
+
+    def test_gauges_of_a_shared_store_are_reported_once(self):
+        workers = []
+        for sessions in (3, 4):
+            registry = Registry()
+            registry.gauge("tramlines_active_sessions", "Sessions").set(sessions)
+            registry.gauge("in_flight", "In flight").set(sessions)
+            workers.append(registry.render())
+
+        text = merge_expositions(workers, shared=SESSION_STORE_GAUGES)
+
+        assert sample(text, "tramlines_active_sessions") == 4
+        assert sample(text, "in_flight") == 7
+        assert sample(merge_expositions(workers), "tramlines_active_sessions") == 7
+
+    def test_router_serves_the_sum_of_worker_metrics(self):
+        servers = []
+        for value in (1, 2):
+            registry = Registry()
+            registry.counter("calls_total", "Calls").inc(value)
+            servers.append(serve_metrics(0, registry=registry))
+        router = serve_merged_metrics(
+            0, [f"http://127.0.0.1:{s.server_port}/metrics" for s in servers]
+        )
+        servers.append(router)
+        try:
+            url = f"http://127.0.0.1:{router.server_port}/metrics"
+            with urllib.request.urlopen(url) as response:
+                assert sample(response.read().decode(), "calls_total") == 3
+        finally:
+            for server in servers:
+                server.shutdown()
+                server.server_close()
+
+    def test_metrics_file_is_replaced_whole(self, tmp_path):
+        registry = Registry()
+        registry.gauge("up", "Up").set(1)
+        path = tmp_path / "tramlines.prom"
+
+        write_metrics_file(path, registry)
+
+        assert sample(path.read_text(), "up") == 1
+        assert list(tmp_path.iterdir()) == [path]
+
+
+class TestGatewayMetrics:
+    @pytest.mark.asyncio
+    async def test_calls_blocks_and_upstream_time_are_recorded(self):
+        server = FastMCP("Issues")
+
+        @server.tool
+        def get_issue(number: int) -> str:
+            return f"Issue {number}"
+
+        @server.tool
+        def purge_issues() -> str:
+            return "purged"
+
+        policy = Policy(
+            name="No purges",
+            rules=[
+                rule("Metrics no purges")
+                .when(call.name == "purge_issues")
+                .block("Purging is not allowed"),
+            ],
+        )
+        before = REGISTRY.render()
+        middleware = GuardRailMiddleware(policy=policy)
+        middleware.server_of = lambda tool_name: "issues"
+        server.add_middleware(middleware)
+
+        async with Client(server) as client:
+            await client.list_tools()
+            await client.call_tool("get_issue", {"number": 1})
+            with pytest.raises(ToolError):
+                await client.call_tool("purge_issues", {})
+            with pytest.raises(ToolError):
+                await client.call_tool("made_up_tool", {})
+
+        text = REGISTRY.render()
+
+        def increase(line_start):
+            return (sample(text, line_start) or 0) - (sample(before, line_start) or 0)
+
+        assert (
+            increase('tramlines_tool_calls_total{tool="get_issue",decision="allow"}')
+            == 1
+        )
+        assert (
+            increase(
+                'tramlines_rule_blocks_total{rule="Metrics no purges",phase="call"}'
+            )
+            == 1
+        )
+        assert (
+            increase(
+                'tramlines_upstream_seconds_count{tool="get_issue",server="issues"}'
+            )
+            == 1
+        )
+        assert (
+            increase(
+                'tramlines_rule_evaluation_seconds_count{rule="Metrics no purges",'
+                'phase="call"}'
+            )
+            == 3
+        )
+        assert (
+            increase('tramlines_tool_calls_total{tool="unknown",decision="error"}') == 1
+        )
+        assert "made_up_tool" not in text
+        assert sample(text, "tramlines_active_sessions") == 1
+        assert sample(text, "tramlines_history_calls") == 3
+        middleware.sessions.stop_expiry()
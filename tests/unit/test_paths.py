@@ -0,0 +1,107 @@
+import pytest
+
+from tramlines.guardrail.dsl.context import call, history
+from tramlines.guardrail.dsl.paths import ArgumentPath, compile_path
+from tramlines.session import CallHistory, ToolCall
+
+
+@pytest.fixture
+def sql_call():
+    return ToolCall(
+        name="run_sql",
+        arguments={
+            "params": {"sql": "DELETE FROM users", "limit": 10},
+            "items": [{"url": "https://a.example"}, {"url": "https://evil.example"}],
+            "flags": [True, False],
+            "odd.key": "verbatim",
+        },
+    )
+
+
+class TestArgumentPath:
+    def test_resolves_nested_key(self, sql_call):
+        assert ArgumentPath("params.sql").resolve(sql_call) == "DELETE FROM users"
+
+    def test_returns_typed_values(self, sql_call):
+        assert ArgumentPath("params.limit").resolve(sql_call) == 10
+        assert ArgumentPath("params").resolve(sql_call) == {
+            "sql": "DELETE FROM users",
+            "limit": 10,
+        }
+        assert ArgumentPath("flags[0]").resolve(sql_call) is True
+
+    def test_resolves_list_index(self, sql_call):
+        assert ArgumentPath("items[1].url").resolve(sql_call) == "https://evil.example"
+
+    def test_missing_path_returns_none(self, sql_call):
+        assert ArgumentPath("params.missing").resolve(sql_call) is None
+        assert ArgumentPath("items[5].url").resolve(sql_call) is None
+        assert ArgumentPath("params.sql.deeper").resolve(sql_call) is None
+
+    def test_wildcard_returns_all_matching_leaves(self, sql_call):
+        accessor = ArgumentPath("items[*].url")
+        assert accessor.is_wildcard
+        assert accessor.resolve(sql_call) == [
+            "https://a.example",
+            "https://evil.example",
+        ]
+
+    def test_wildcard_over_dict_values(self, sql_call):
+        assert ArgumentPath("params.*").resolve(sql_call) == ["DELETE FROM users", 10]
+
+    def test_wildcard_with_no_matches_returns_empty_list(self, sql_call):
+        assert ArgumentPath("missing[*].url").resolve(sql_call) == []
+
+    def test_key_containing_dots_is_looked_up_verbatim(self, sql_call):
+        assert ArgumentPath("odd.key").resolve(sql_call) == "verbatim"
+
+    @pytest.mark.parametrize("path", ["", ".a", "a..b", "a[", "a[x]", "a.[0]"])
+    def test_invalid_paths_raise(self, path):
+        with pytest.raises(ValueError):
+            ArgumentPath(path)
+
+    def test_compile_path_reuses_accessors(self):
+        assert compile_path("params.sql") is compile_path("params.sql")
+
+
+class TestArgumentPathsInDsl:
+    def test_nested_path_predicate(self, sql_call):
+        predicate = call.arg("params.sql").startswith("DELETE")
+        assert predicate(sql_call, CallHistory()) is True
+
+    def test_arguments_compare_as_text(self, sql_call):
+        assert (call.arg("params.limit") == "10")(sql_call, CallHistory()) is True
+        assert (call.arg("flags[0]") == "true")(sql_call, CallHistory()) is True
+        assert (call.arg("flags[*]") == "false")(sql_call, CallHistory()) is True
+
+    def test_missing_argument_reads_as_empty_text(self, sql_call):
+        assert (call.arg("absent") == "")(sql_call, CallHistory()) is True
+        assert (call.arg("absent") != "low")(sql_call, CallHistory()) is True
+
+    def test_typed_arguments_keep_their_type(self, sql_call):
+        assert (call.typed_arg("params.limit") > 5)(sql_call, CallHistory()) is True
+        predicate = call.typed_arg("params.limit") == "10"
+        assert predicate(sql_call, CallHistory()) is False
+        assert (call.typed_arg("flags[0]") == True)(sql_call, CallHistory()) is True  # noqa: E712
+
+    def test_missing_typed_argument_never_matches(self, sql_call):
+        assert (call.typed_arg("absent") == "")(sql_call, CallHistory()) is False
+        assert (call.typed_arg("absent") != "x")(sql_call, CallHistory()) is False
+
+    def test_wildcard_predicate_matches_any_value(self, sql_call):
+        predicate = call.arg("items[*].url").contains("evil")
+        assert predicate(sql_call, CallHistory()) is True
+
+        predicate = call.arg("items[*].url").contains("nowhere")
+        assert predicate(sql_call, CallHistory()) is False
+
+    def test_historical_call_path_access(self, sql_call):
+        session = CallHistory()
+        session.add_call(sql_call)
+        current = ToolCall("run_sql", {"params": {"sql": "SELECT 1"}})
+        session.add_call(current)
+
+        predicate = (
+            history.select("run_sql").first().arg("params.sql").contains("DELETE")
+        )
+        assert predicate(current, session) is True
@@ -117,6 +117,15 @@ class TestLogicalOperators:
         assert isinstance(not_result, NotPredicate)
         assert not_result(mock_call, mock_history) is False
 
+    def test_composites_are_name_only_when_every_operand_is(self):
+        name_only = ComparisonPredicate(
+            lambda c, h: c.name, lambda a, b: a == b, "x", name_only=True
+        )
+        contextual = MockPredicate(True)
+
+        assert (name_only | ~name_only).name_only is True
+        assert (name_only & contextual).name_only is False
+
 
 class TestValueBuilder:
     def test_value_builder_equality_check_returns_true_on_match(
@@ -0,0 +1,162 @@
+from types import SimpleNamespace
+
+import mcp.types as mt
+import pytest
+from fastmcp import Client, FastMCP
+from fastmcp.exceptions import ToolError
+
+from tramlines.guardrail.dsl.context import call, history
+from tramlines.guardrail.dsl.rules import rule
+from tramlines.guardrail.dsl.types import Policy
+from tramlines.middleware import GuardRailMiddleware
+from tramlines.response_cache import ResponseCache, canonical_arguments
+
+RESULT = [mt.TextContent(type="text", text="issue body")]
+
+
+def servers_by_prefix(tool_name):
+    return tool_name.split("_", 1)[0]
+
+
+class TestResponseCache:
+    def test_canonical_arguments_ignore_key_order(self):
+        assert canonical_arguments({"a": 1, "b": [2]}) == canonical_arguments(
+            {"b": [2], "a": 1}
+        )
+
+    def test_only_configured_tools_are_cached(self):
+        cache = ResponseCache(tools={"get_issue": 30})
+        cache.put("s1", "get_issue", {"n": 1}, RESULT)
+        cache.put("s1", "create_issue", {"n": 1}, RESULT)
+
+        assert cache.get("s1", "get_issue", {"n": 1}) == RESULT
+        assert cache.get("s1", "create_issue", {"n": 1}) is None
+        assert cache.stats()["entries"] == 1
+
+    def test_entries_are_scoped_to_the_session_unless_shared(self):
+        session_cache = ResponseCache(tools={"get_issue": 30})
+        shared_cache = ResponseCache(tools={"get_issue": 30}, scope="shared")
+        for cache in (session_cache, shared_cache):
+            cache.put("s1", "get_issue", {"n": 1}, RESULT)
+
+        assert session_cache.get("s2", "get_issue", {"n": 1}) is None
+        assert shared_cache.get("s2", "get_issue", {"n": 1}) == RESULT
+
+    def test_entries_expire_after_their_ttl(self, monkeypatch):
+        now = [1000.0]
+        monkeypatch.setattr("tramlines.response_cache.time.monotonic", lambda: now[0])
+        cache = ResponseCache(tools={"get_issue": 30})
+        cache.put("s1", "get_issue", {}, RESULT)
+
+        now[0] += 31
+
+        assert cache.get("s1", "get_issue", {}) is None
+        assert cache.stats()["entries"] == 0
+
+    def test_least_recently_used_entries_are_evicted(self):
+        cache = ResponseCache(tools={"get_issue": 30}, max_entries=2)
+        for n in range(3):
+            cache.put("s1", "get_issue", {"n": n}, RESULT)
+
+        assert cache.get("s1", "get_issue", {"n": 0}) is None
+        assert cache.get("s1", "get_issue", {"n": 2}) == RESULT
+        assert cache.stats()["evictions"] == 1
+
+    def test_mutating_call_drops_only_its_own_servers_entries(self):
+        cache = ResponseCache(
+            tools={"github_get_issue": 30, "linear_get_issue": 30},
+            server_of=servers_by_prefix,
+        )
+        cache.put("s1", "github_get_issue", {}, RESULT)
+        cache.put("s1", "linear_get_issue", {}, RESULT)
+
+        cache.note_call("github_get_issue")
+        assert cache.stats()["invalidations"] == 0
+
+        cache.note_call("github_update_issue")
+        assert cache.get("s1", "github_get_issue", {}) is None
+        assert cache.get("s1", "linear_get_issue", {}) == RESULT
+
+    def test_servers_cache_only_tools_annotated_read_only(self):
+        cache = ResponseCache(servers={"github": 10}, server_of=servers_by_prefix)
+        cache.update_tools(
+            [
+                SimpleNamespace(
+                    name="github_get_issue",
+                    annotations=mt.ToolAnnotations(readOnlyHint=True),
+                ),
+                SimpleNamespace(name="github_create_issue", annotations=None),
+            ]
+        )
+
+        assert cache.ttl_for("github_get_issue") == 10
+        assert cache.ttl_for("github_create_issue") is None
+        assert cache.ttl_for("linear_get_issue") is None
+
+    def test_invalid_scope_is_rejected(self):
+        with pytest.raises(ValueError, match="scope"):
+            ResponseCache(scope="tenant")
+
+
+class TestCachedToolCalls:
+    @pytest.fixture
+    def server(self):
+        server = FastMCP("Issues")
+        server.executions = 0
+
+        @server.tool
+        def get_issue(number: int) -> str:
+            server.executions += 1
+            return f"Issue {number}"
+
+        @server.tool
+        def close_issue(number: int) -> str:
+            return "closed"
+
+        return server
+
+    @pytest.mark.asyncio
+    async def test_repeat_calls_are_answered_from_cache_and_still_recorded(
+        self, server
+    ):
+        middleware = GuardRailMiddleware(
+            response_cache=ResponseCache(tools={"get_issue": 30})
+        )
+        server.add_middleware(middleware)
+
+        async with Client(server) as client:
+            first = await client.call_tool("get_issue", {"number": 1})
+            second = await client.call_tool("get_issue", {"number": 1})
+            await client.call_tool("close_issue", {"number": 1})
+            await client.call_tool("get_issue", {"number": 1})
+
+        assert first[0].text == second[0].text == "Issue 1"
+        assert server.executions == 2
+        assert middleware.get_session_stats()["total_calls"] == 4
+        middleware.sessions.stop_expiry()
+
+    @pytest.mark.asyncio
+    async def test_cached_results_are_still_subject_to_policy(self, server):
+        policy = Policy(
+            name="Read once",
+            rules=[
+                rule("No rereads")
+                .when(
+                    (call.name == "get_issue")
+                    & (history.select("^get_issue$").count() >= 2)
+                )
+                .block("Issue already read"),
+            ],
+        )
+        middleware = GuardRailMiddleware(
+            policy=policy, response_cache=ResponseCache(tools={"get_issue": 30})
+        )
+        server.add_middleware(middleware)
+
+        async with Client(server) as client:
+            await client.call_tool("get_issue", {"number": 1})
+            with pytest.raises(ToolError, match="Issue already read"):
+                await client.call_tool("get_issue", {"number": 1})
+
+        assert middleware.response_cache.stats()["hits"] == 0
+        middleware.sessions.stop_expiry()
@@ -0,0 +1,153 @@
+import os
+import time
+
+import mcp.types as mt
+import pytest
+from fastmcp import Client, FastMCP
+
+from tramlines.middleware import GuardRailMiddleware
+from tramlines.result_limits import ResultLimiter, block_size
+
+
+def text(value):
+    return mt.TextContent(type="text", text=value)
+
+
+class TestResultLimiter:
+    def test_results_within_the_cap_are_returned_unchanged(self):
+        limiter = ResultLimiter(max_size=10)
+        content = [text("hello"), text("world")]
+
+        assert limiter.apply("read_file", content) is content
+        assert limiter.stats()["limited"] == 0
+
+    def test_tools_without_a_cap_are_unlimited(self):
+        limiter = ResultLimiter(tools={"read_file": 4, "query": 0})
+        content = [text("x" * 100)]
+
+        assert limiter.apply("query", content) is content
+        assert limiter.apply("list_dir", content) is content
+        assert not limiter.exceeds("list_dir", content)
+
+    def test_per_tool_caps_override_the_default(self):
+        limiter = ResultLimiter(max_size=100, tools={"read_file": 4})
+
+        assert limiter.exceeds("read_file", [text("hello")])
+        assert not limiter.exceeds("query", [text("hello")])
+
+    def test_truncation_keeps_whole_blocks_then_cuts_the_next(self):
+        limiter = ResultLimiter(max_size=8)
+        first = text("abcde")
+        limited = limiter.apply("read_file", [first, text("fghij"), text("klm")])
+
+        assert limited[0] is first
+        assert limited[1].text == "fgh"
+        assert limited[2].text == "[Result truncated: showing 8 of 13 characters]"
+        assert len(limited) == 3
+        assert limiter.stats() == {"limited": 1, "spilled": 0, "dropped_size": 5}
+
+    def test_embedded_text_resources_are_truncated(self):
+        resource = mt.EmbeddedResource(
+            type="resource",
+            resource=mt.TextResourceContents(uri="file:///log", text="0123456789"),
+        )
+        limited = ResultLimiter(max_size=4).apply("read_file", [resource])
+
+        assert limited[0].resource.text == "0123"
+        assert str(limited[0].resource.uri) == "file:///log"
+
+    def test_binary_blocks_that_do_not_fit_are_dropped(self):
+        image = mt.ImageContent(type="image", data="A" * 40, mimeType="image/png")
+        limited = ResultLimiter(max_size=10).apply("screenshot", [text("ok"), image])
+
+        assert block_size(image) == 40
+        assert [block.text for block in limited] == [
+            "ok",
+            "[Result truncated: showing 2 of 42 characters]",
+        ]
+
+    def test_spilled_results_are_written_whole_to_a_private_file(self, tmp_path):
+        limiter = ResultLimiter(max_size=4, overflow="spill", spill_dir=tmp_path)
+        limited = limiter.apply("read/file", [text("first"), text("second")])
+
+        assert limited[0].text == "firs"
+        spilled = list(tmp_path.iterdir())
+        assert len(spilled) == 1
+        assert spilled[0].name.startswith("read_file-")
+        assert spilled[0].read_text() == "first\nsecond"
+        assert spilled[0].stat().st_mode & 0o777 == 0o600
+        assert str(spilled[0]) in limited[-1].text
+        assert limiter.stats()["spilled"] == 1
+
+    def test_a_result_seen_again_reuses_its_spill_file(self, tmp_path):
+        limiter = ResultLimiter(max_size=4, overflow="spill", spill_dir=tmp_path)
+        cached = [text("first"), text("second")]
+
+        notes = [limiter.apply("read_file", cached)[-1].text for _ in range(3)]
+        limiter.apply("read_file", [text("other")])
+
+        assert notes[0] == notes[1] == notes[2]
+        assert len(list(tmp_path.iterdir())) == 2
+        assert limiter.stats()["spilled"] == 2
+
+    def test_spill_files_only_appear_once_written(self, tmp_path, monkeypatch):
+        limiter = ResultLimiter(max_size=4, overflow="spill", spill_dir=tmp_path)
+        visible_while_writing = []
+
+        def spy_open(file, *args, **kwargs):
+            visible_while_writing.extend(tmp_path.glob("*.txt"))
+            return open(file, *args, **kwargs)
+
+        monkeypatch.setattr("tramlines.result_limits.open", spy_open, raising=False)
+        note = limiter.apply("read_file", [text("first"), text("second")])[-1]
+
+        assert visible_while_writing == []
+        (spilled,) = tmp_path.iterdir()
+        assert spilled.read_text() == "first\nsecond"
+        assert spilled.stat().st_mode & 0o777 == 0o600
+        assert str(spilled) in note.text
+
+    def test_expired_spill_files_are_pruned(self, tmp_path):
+        old = tmp_path / "old.txt"
+        unfinished = tmp_path / ".old-x1y2.tmp"
+        two_hours_ago = time.time() - 7200
+        for path in (old, unfinished):
+            path.write_text("stale")
+            os.utime(path, (two_hours_ago, two_hours_ago))
+        limiter = ResultLimiter(max_size=1, overflow="spill", spill_dir=tmp_path)
+
+        limiter.apply("read_file", [text("fresh")])
+
+        assert not old.exists()
+        assert not unfinished.exists()
+        assert len(list(tmp_path.iterdir())) == 1
+
+    def test_invalid_overflow_mode_is_rejected(self):
+        with pytest.raises(ValueError, match="Overflow mode"):
+            ResultLimiter(overflow="compress")
+
+
+class TestLimitedToolCalls:
+    @pytest.mark.asyncio
+    async def test_large_results_are_cut_before_they_are_forwarded(self, tmp_path):
+        server = FastMCP("Files")
+
+        @server.tool
+        def read_file(path: str) -> str:
+            return "line\n" * 1000
+
+        middleware = GuardRailMiddleware(
+            result_limiter=ResultLimiter(
+                tools={"read_file": 20}, overflow="spill", spill_dir=tmp_path
+            )
+        )
+        server.add_middleware(middleware)
+
+        async with Client(server) as client:
+            result = await client.call_tool("read_file", {"path": "big.log"})
+
+        assert result[0].text == "line\n" * 4
+        assert "showing 20 of 5000 characters" in result[1].text
+        (spilled,) = tmp_path.iterdir()
+        assert spilled.read_text() == "line\n" * 1000
+        middleware.sessions.stop_expiry()
@@ -0,0 +1,72 @@
+import mcp.types as mt
+import pytest
+
+from tramlines.guardrail.dsl.context import result
+from tramlines.guardrail.dsl.results import DetectorResultScanner, result_chunks
+
+
+def feed_all(scanner, chunks):
+    scan = scanner.scan()
+    return any(scan.feed(chunk) for chunk in chunks) or scan.finish()
+
+
+class TestRegexResultScanner:
+    def test_matches_within_a_chunk(self):
+        assert feed_all(result.matches("ignore previous"), ["please IGNORE previous"])
+
+    def test_matches_across_chunk_boundaries(self):
+        chunks = ["... ignore prev", "ious instructions ..."]
+
+        assert feed_all(result.contains("ignore previous instructions"), chunks)
+
+    def test_no_match(self):
+        assert not feed_all(result.contains("secret"), ["nothing", " to see"])
+
+
+class TestDetectorResultScanner:
+    def test_detector_sees_bounded_overlapping_windows(self):
+        seen = []
+
+        def detect(text):
+            seen.append(text)
+            return False
+
+        scanner = result.detected_by(detect, window=10, overlap=3)
+        assert not feed_all(scanner, ["abcdefghij", "klmnopqrstuvw"])
+
+        assert seen == ["abcdefghij", "hijklmnopq", "opqrstuvw"]
+        assert max(len(text) for text in seen) <= 10
+
+    def test_short_results_are_scanned_once_finished(self):
+        scanner = result.detected_by(lambda text: "bad" in text, window=100, overlap=10)
+
+        assert feed_all(scanner, ["a bad", " result"])
+
+    def test_stops_at_the_first_matching_window(self):
+        calls = []
+
+        def detect(text):
+            calls.append(text)
+            return True
+
+        scan = result.detected_by(detect, window=4, overlap=0).scan()
+
+        assert scan.feed("12345678")
+        assert calls == ["1234"]
+
+    def test_overlap_must_be_smaller_than_window(self):
+        with pytest.raises(ValueError):
+            DetectorResultScanner(lambda text: False, window=10, overlap=10)
+
+
+def test_result_chunks_cover_text_blocks_only():
+    content = [
+        mt.TextContent(type="text", text="abcdef"),
+        mt.ImageContent(type="image", data="AAAA", mimeType="image/png"),
+        mt.EmbeddedResource(
+            type="resource",
+            resource=mt.TextResourceContents(uri="file:///a.txt", text="xyz"),
+        ),
+    ]
+
+    assert list(result_chunks(content, chunk_size=4)) == ["abcd", "ef", "xyz"]
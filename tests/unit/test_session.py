@@ -0,0 +1,52 @@
+from tramlines.session import ArgumentLeaf, ToolCall, flatten_arguments
+
+
+def test_flatten_arguments_yields_paths_for_nested_values():
+    arguments = {
+        "owner": "acme",
+        "params": {"sql": "SELECT 1", "limit": 10},
+        "items": [{"url": "https://a.example"}, {"url": "https://b.example"}],
+        "tags": ["x", None],
+    }
+
+    leaves = flatten_arguments(arguments)
+
+    assert [(leaf.path, leaf.value) for leaf in leaves] == [
+        ("owner", "acme"),
+        ("params.sql", "SELECT 1"),
+        ("params.limit", 10),
+        ("items[0].url", "https://a.example"),
+        ("items[1].url", "https://b.example"),
+        ("tags[0]", "x"),
+        ("tags[1]", None),
+    ]
+
+
+def test_flatten_arguments_records_string_sizes():
+    leaves = flatten_arguments({"text": "hello", "count": 3})
+
+    assert leaves == (
+        ArgumentLeaf("text", "hello", 5),
+        ArgumentLeaf("count", 3, 0),
+    )
+
+
+def test_flatten_arguments_handles_empty_containers():
+    assert flatten_arguments({}) == ()
+    assert flatten_arguments({"a": {}, "b": []}) == ()
+
+
+def test_tool_call_caches_flattened_leaves():
+    tool_call = ToolCall("update_record", {"data": {"note": "hi"}, "id": 7})
+
+    assert tool_call.leaves is tool_call.leaves
+    assert tool_call.string_leaves is tool_call.string_leaves
+    assert [leaf.path for leaf in tool_call.string_leaves] == ["data.note"]
+
+
+def test_tool_call_equality_ignores_flattening_cache():
+    first = ToolCall("tool", {"a": "b"})
+    second = ToolCall("tool", {"a": "b"}, timestamp=first.timestamp)
+    _ = first.leaves
+
+    assert first == second
@@ -0,0 +1,85 @@
+import pytest
+
+from tramlines.session import CallStatus, ToolCall
+from tramlines.session_store import InMemorySessionStore, SqliteSessionStore
+
+
+@pytest.fixture
+def sqlite_store(tmp_path):
+    store = SqliteSessionStore(tmp_path / "sessions.db", max_calls_per_session=3)
+    yield store
+    store.close()
+
+
+class TestInMemorySessionStore:
+    def test_get_history_returns_same_live_history(self):
+        store = InMemorySessionStore()
+        history = store.get_history("s1")
+        history.add_call(ToolCall("tool", {}))
+
+        assert store.get_history("s1") is history
+        assert store.stats()["total_calls"] == 1
+
+    def test_append_adds_batch(self):
+        store = InMemorySessionStore()
+        store.append("s1", [ToolCall("a", {}), ToolCall("b", {})])
+
+        assert [c.name for c in store.get_history("s1").calls] == ["a", "b"]
+
+
+class TestSqliteSessionStore:
+    def test_recorded_calls_round_trip(self, sqlite_store):
+        call = ToolCall(
+            "run_sql",
+            {"params": {"sql": "SELECT 1"}},
+            status=CallStatus.BLOCK,
+            execution_duration=1.5,
+        )
+        sqlite_store.get_history("s1")
+        sqlite_store.record_call("s1", call)
+
+        loaded = sqlite_store.get_history("s1").calls
+        assert loaded == [call]
+
+    def test_history_is_shared_between_store_instances(self, tmp_path):
+        path = tmp_path / "shared.db"
+        first = SqliteSessionStore(path)
+        second = SqliteSessionStore(path)
+        try:
+            first.record_call("s1", ToolCall("get_issue", {"repo": "a"}))
+
+            history = second.get_history("s1")
+            assert [c.name for c in history.calls] == ["get_issue"]
+        finally:
+            first.close()
+            second.close()
+
+    def test_only_newest_calls_are_kept_and_read(self, sqlite_store):
+        sqlite_store.append("s1", [ToolCall(f"tool_{i}", {}) for i in range(5)])
+
+        history = sqlite_store.get_history("s1")
+        assert [c.name for c in history.calls] == ["tool_2", "tool_3", "tool_4"]
+        assert sqlite_store.stats()["total_calls"] == 3
+
+    def test_expire_removes_idle_sessions(self, sqlite_store):
+        sqlite_store.record_call("s1", ToolCall("tool", {}))
+
+        assert sqlite_store.expire(idle_seconds=3600) == 0
+        assert sqlite_store.expire(idle_seconds=-1) == 1
+        assert sqlite_store.stats()["active_sessions"] == 0
+        assert sqlite_store.get_history("s1").calls == []
+
+    def test_session_cap_evicts_least_recently_used(self, tmp_path):
+        store = SqliteSessionStore(tmp_path / "cap.db", max_sessions=2)
+        try:
+            store.record_call("old", ToolCall("tool", {}))
+            store.get_history("recent")
+            store.get_history("old")
+            store.get_history("new")
+
+            stats = store.stats()
+            assert stats["active_sessions"] == 2
+            assert stats["evicted_sessions"] == 1
+            assert store.get_history("old").calls != []
+        finally:
+            store.close()
@@ -0,0 +1,155 @@
+import json
+
+import pytest
+from fastmcp import Client, Context, FastMCP
+from fastmcp.client.transports import FastMCPTransport
+from fastmcp.exceptions import ToolError
+
+from tramlines import tracing
+from tramlines.guardrail.dsl.context import call
+from tramlines.guardrail.dsl.rules import rule
+from tramlines.guardrail.dsl.types import Policy
+from tramlines.middleware import GuardRailMiddleware
+from tramlines.tracing import FileSpanExporter, Tracer
+from tramlines.upstream import PooledClient, UpstreamPool
+
+
+@pytest.fixture
+def exporter(tmp_path):
+    exporter = FileSpanExporter(tmp_path / "traces.jsonl")
+    tracing.configure(Tracer(exporter))
+    yield exporter
+    tracing.configure(None)
+
+
+def exported_traces(exporter):
+    """Each exported trace as a list of spans, in the order they ended."""
+    exporter.flush()
+    traces = []
+    for line in exporter.path.read_text().splitlines():
+        (resource_spans,) = json.loads(line)["resourceSpans"]
+        (scope_spans,) = resource_spans["scopeSpans"]
+        traces.append(scope_spans["spans"])
+    return traces
+
+
+def attributes(span):
+    return {
+        attribute["key"]: next(iter(attribute["value"].values()))
+        for attribute in span["attributes"]
+    }
+
+
+class TestSpans:
+    def test_spans_nest_and_export_as_otlp_json(self, exporter):
+        with tracing.trace("tools/call get_issue", attributes={"tool": "get_issue"}):
+            with tracing.span("policy.call"):
+                with tracing.span("rule", {"tramlines.rule": "No deletes"}):
+                    pass
+            tracing.annotate("tramlines.decision", "allow")
+
+        ((rule_span, policy_span, root),) = exported_traces(exporter)
+        assert root["name"] == "tools/call get_issue"
+        assert "parentSpanId" not in root
+        assert policy_span["parentSpanId"] == root["spanId"]
+        assert rule_span["parentSpanId"] == policy_span["spanId"]
+        assert {span["traceId"] for span in (root, policy_span, rule_span)} == {
+            root["traceId"]
+        }
+        assert attributes(root) == {"tool": "get_issue", "tramlines.decision": "allow"}
+        assert int(root["endTimeUnixNano"]) >= int(rule_span["endTimeUnixNano"])
+
+    def test_errors_are_recorded_on_the_span(self, exporter):
+        with pytest.raises(ToolError):
+            with tracing.trace("tools/call delete_issue"):
+                raise ToolError("blocked")
+
+        ((root,),) = exported_traces(exporter)
+        assert root["status"] == {"code": 2, "message": "ToolError: blocked"}
+
+    def test_without_a_tracer_spans_are_shared_no_ops(self):
+        first = tracing.trace("tools/call get_issue")
+        with first:
+            assert tracing.span("policy.call") is first
+            assert tracing.current_traceparent() is None
+
+    def test_sampling_ratio_and_caller_decision(self, tmp_path):
+        exporter = FileSpanExporter(tmp_path / "traces.jsonl")
+        tracer = Tracer(exporter, sample_ratio=0.0)
+        trace_id = "4bf92f3577b34da6a3ce929d0e0e4736"
+
+        assert tracer.start_trace("unsampled") is tracing.trace("off")
+        continued = tracer.start_trace(
+            "continued", traceparent=f"00-{trace_id}-00f067aa0ba902b7-01"
+        )
+        assert continued.trace.trace_id == trace_id
+        assert continued.parent_id == "00f067aa0ba902b7"
+        declined = tracer.start_trace(
+            "declined", traceparent=f"00-{trace_id}-00f067aa0ba902b7-00"
+        )
+        assert declined is tracing.trace("off")
+
+    def test_sample_ratio_must_be_a_fraction(self, tmp_path):
+        with pytest.raises(ValueError, match="between 0 and 1"):
+            Tracer(FileSpanExporter(tmp_path / "traces.jsonl"), sample_ratio=2)
+
+
+class TestGatewayTracing:
+    @pytest.mark.asyncio
+    async def test_tool_call_stages_are_traced(self, exporter):
+        server = FastMCP("Issues")
+
+        @server.tool
+        def get_issue(number: int) -> str:
+            return f"Issue {number}"
+
+        policy = Policy(
+            name="No purges",
+            rules=[
+                rule("Tracing no purges")
+                .when(call.name == "purge_issues")
+                .block("Purging is not allowed"),
+            ],
+        )
+        middleware = GuardRailMiddleware(policy=policy)
+        middleware.server_of = lambda tool_name: "issues"
+        server.add_middleware(middleware)
+
+        async with Client(server) as client:
+            await client.call_tool("get_issue", {"number": 1})
+
+        (spans,) = exported_traces(exporter)
+        by_name = {span["name"]: span for span in spans}
+        root = by_name["tools/call get_issue"]
+        assert {
+            "validate_arguments",
+            "session",
+            "policy.call",
+            "rule",
+            "upstream",
+        } <= set(by_name)
+        assert attributes(root)["tramlines.decision"] == "allow"
+        assert attributes(by_name["upstream"]) == {"tramlines.server": "issues"}
+        assert by_name["rule"]["parentSpanId"] == by_name["policy.call"]["spanId"]
+        middleware.sessions.stop_expiry()
+
+    @pytest.mark.asyncio
+    async def test_trace_context_is_passed_upstream(self, exporter):
+        upstream = FastMCP("Issues")
+
+        @upstream.tool
+        def traceparent(ctx: Context) -> str:
+            return getattr(ctx.request_context.meta, "traceparent", None) or ""
+
+        pool = UpstreamPool("issues", lambda: FastMCPTransport(upstream))
+        client = PooledClient(pool)
+        try:
+            untraced = await client.call_tool("traceparent", {})
+            with tracing.trace("tools/call traceparent"):
+                with tracing.span("upstream") as span:
+                    traced = await client.call_tool("traceparent", {})
+        finally:
+            await pool.stop()
+
+        assert untraced[0].text == ""
+        assert traced[0].text == span.traceparent
@@ -0,0 +1,565 @@
+import asyncio
+import contextlib
+import time
+
+import pytest
+from fastmcp import Client, Context, FastMCP
+from fastmcp.client.transports import FastMCPTransport, StdioTransport
+from fastmcp.exceptions import ToolError
+from fastmcp.tools import Tool
+
+from tramlines.guardrail.dsl.context import call
+from tramlines.guardrail.dsl.predicates import custom
+from tramlines.guardrail.dsl.rules import rule
+from tramlines.guardrail.dsl.types import Policy
+from tramlines.proxy import create_guarded_proxy
+from tramlines.response_cache import ResponseCache
+from tramlines.upstream import (
+    PooledClient,
+    ToolCatalogue,
+    UpstreamManager,
+    UpstreamPool,
+    UpstreamUnavailableError,
+)
+
+
+def make_upstream(name: str) -> FastMCP:
+    server = FastMCP(name)
+
+    @server.tool
+    def whoami() -> str:
+        return name
+
+    return server
+
+
+def in_memory_pool(name: str, size: int = 1, **kwargs) -> UpstreamPool:
+    server = make_upstream(name)
+    return UpstreamPool(name, lambda: FastMCPTransport(server), size=size, **kwargs)
+
+
+class SlowTransport(FastMCPTransport):
+    """In-memory transport that takes a while to connect, like a cold npx."""
+
+    def __init__(self, server: FastMCP, delay: float):
+        super().__init__(server)
+        self.delay = delay
+
+    @contextlib.asynccontextmanager
+    async def connect_session(self, **session_kwargs):
+        await asyncio.sleep(self.delay)
+        async with super().connect_session(**session_kwargs) as session:
+            yield session
+
+
+class TestUpstreamPool:
+    @pytest.mark.asyncio
+    async def test_requests_reuse_persistent_sessions(self):
+        pool = in_memory_pool("github", size=2)
+        client = PooledClient(pool)
+        try:
+            for _ in range(10):
+                async with client:
+                    result = await client.call_tool_mcp("whoami", {})
+                assert result.content[0].text == "github"
+
+            stats = pool.stats()
+            assert stats["connects"] == 2
+            assert stats["requests"] == 10
+            assert stats["reuse_ratio"] == 5.0
+        finally:
+            await pool.stop()
+
+    @pytest.mark.asyncio
+    async def test_requests_spread_over_least_busy_session(self):
+        pool = in_memory_pool("github", size=2)
+        try:
+            async with pool.session() as first, pool.session() as second:
+                assert first is not second
+        finally:
+            await pool.stop()
+
+    @pytest.mark.asyncio
+    async def test_broken_session_is_reconnected(self):
+        pool = in_memory_pool("github", initial_backoff=0.01)
+        client = PooledClient(pool)
+        try:
+            await pool.start()
+            await pool.members[0].client.close()
+
+            result = await client.call_tool_mcp("whoami", {})
+
+            assert result.content[0].text == "github"
+            assert pool.stats()["reconnects"] == 1
+        finally:
+            await pool.stop()
+
+    @pytest.mark.asyncio
+    async def test_unreachable_upstream_raises_after_timeout(self):
+        pool = UpstreamPool(
+            "broken",
+            lambda: StdioTransport("nonexistent_command_for_tests", []),
+            connect_timeout=0.2,
+            initial_backoff=0.05,
+        )
+        try:
+            with pytest.raises(UpstreamUnavailableError):
+                async with pool.session():
+                    pass
+            assert pool.stats()["connect_failures"] >= 1
+        finally:
+            await pool.stop()
+
+    @pytest.mark.asyncio
+    async def test_broken_session_is_replaced_by_warm_spare(self):
+        pool = in_memory_pool("github", spares=1)
+        try:
+            await pool.start()
+            await pool._refill_task
+            spare = pool.spares[0]
+            await pool.members[0].client.close()
+
+            async with pool.session() as client:
+                assert client is spare
+
+            stats = pool.stats()
+            assert stats["spare_hits"] == 1
+            assert stats["spare_hit_rate"] == 1.0
+            await pool._refill_task
+            assert pool.stats()["spares_ready"] == 1
+            assert pool.stats()["cold_starts"] == 3
+        finally:
+            await pool.stop()
+
+    @pytest.mark.asyncio
+    async def test_replacement_without_spare_is_a_miss(self):
+        pool = in_memory_pool("github", initial_backoff=0.01)
+        try:
+            await pool.start()
+            await pool.members[0].client.close()
+
+            async with pool.session():
+                pass
+
+            stats = pool.stats()
+            assert stats["spare_misses"] == 1
+            assert stats["spare_hit_rate"] == 0.0
+            assert stats["avg_cold_start_ms"] > 0
+        finally:
+            await pool.stop()
+
+    def test_rejects_empty_pool(self):
+        with pytest.raises(ValueError):
+            in_memory_pool("github", size=0)
+
+
+class TestUpstreamManager:
+    @pytest.mark.asyncio
+    async def test_multiple_servers_are_prefixed_by_name(self):
+        upstreams = UpstreamManager(
+            {"github": in_memory_pool("github"), "slack": in_memory_pool("slack")}
+        )
+        proxy = create_guarded_proxy({}, upstreams=upstreams)
+        try:
+            async with Client(proxy) as client:
+                tools = {tool.name for tool in await client.list_tools()}
+                result = await client.call_tool("slack_whoami", {})
+
+            assert tools == {"github_whoami", "slack_whoami"}
+            assert result[0].text == "slack"
+            assert upstreams.stats()["slack"]["connects"] == 1
+        finally:
+            await upstreams.stop()
+
+    @pytest.mark.asyncio
+    async def test_sessions_outlive_client_connections(self):
+        upstreams = UpstreamManager({"github": in_memory_pool("github")})
+        proxy = create_guarded_proxy({}, upstreams=upstreams)
+        try:
+            for _ in range(3):
+                async with Client(proxy) as client:
+                    await client.call_tool("whoami", {})
+
+            assert upstreams.stats()["github"]["connects"] == 1
+        finally:
+            await upstreams.stop()
+
+    @pytest.mark.asyncio
+    async def test_slow_server_does_not_delay_startup_or_listing(self):
+        slow_server = make_upstream("slack")
+        upstreams = UpstreamManager(
+            {
+                "github": in_memory_pool("github"),
+                "slack": UpstreamPool(
+                    "slack", lambda: SlowTransport(slow_server, delay=0.5)
+                ),
+            }
+        )
+        proxy = create_guarded_proxy(
+            {}, upstreams=upstreams, upstream_ready_timeout=0.1
+        )
+        try:
+            start_time = time.perf_counter()
+            async with Client(proxy) as client:
+                early_tools = {tool.name for tool in await client.list_tools()}
+                assert time.perf_counter() - start_time < 0.4
+                await asyncio.gather(*upstreams._startup_tasks.values())
+                later_tools = {tool.name for tool in await client.list_tools()}
+
+            assert early_tools == {"github_whoami"}
+            assert later_tools == {"github_whoami", "slack_whoami"}
+        finally:
+            await upstreams.stop()
+
+    @pytest.mark.asyncio
+    async def test_servers_start_concurrently(self):
+        servers = {name: make_upstream(name) for name in ("a", "b", "c")}
+        upstreams = UpstreamManager(
+            {
+                name: UpstreamPool(name, lambda s=server: SlowTransport(s, delay=0.3))
+                for name, server in servers.items()
+            }
+        )
+        try:
+            start_time = time.perf_counter()
+            await upstreams.start()
+
+            assert time.perf_counter() - start_time < 0.8
+            assert all(s["healthy"] == 1 for s in upstreams.stats().values())
+        finally:
+            await upstreams.stop()
+
+    def test_requires_servers(self):
+        with pytest.raises(ValueError):
+            UpstreamManager({})
+
+    def test_maps_tools_to_their_server(self):
+        single = UpstreamManager({"github": in_memory_pool("github")})
+        mounted = UpstreamManager(
+            {
+                "github": in_memory_pool("github"),
+                "github_enterprise": in_memory_pool("github_enterprise"),
+            }
+        )
+
+        assert single.server_of("get_issue") == "github"
+        assert mounted.server_of("github_get_issue") == "github"
+        assert mounted.server_of("github_enterprise_get_issue") == "github_enterprise"
+        assert mounted.server_of("get_issue") is None
+
+
+class TestLazyUpstreams:
+    @pytest.mark.asyncio
+    async def test_lazy_server_lists_cached_tools_and_starts_on_first_call(self):
+        catalogue = ToolCatalogue()
+        warm_up = in_memory_pool("github", catalogue=catalogue)
+        await warm_up.list_tools()
+        await warm_up.stop()
+
+        pool = in_memory_pool("github", lazy=True, catalogue=catalogue)
+        upstreams = UpstreamManager({"github": pool})
+        proxy = create_guarded_proxy({}, upstreams=upstreams)
+        try:
+            async with Client(proxy) as client:
+                tools = [tool.name for tool in await client.list_tools()]
+                assert tools == ["whoami"]
+                assert not pool.active
+
+                result = await client.call_tool("whoami", {})
+
+            assert result[0].text == "github"
+            assert pool.active
+        finally:
+            await upstreams.stop()
+
+    @pytest.mark.asyncio
+    async def test_listings_sent_on_connect_do_not_start_a_lazy_server(self):
+        pool = in_memory_pool("github", lazy=True, catalogue=ToolCatalogue())
+        client = PooledClient(pool)
+        try:
+            for method in (
+                "list_resources",
+                "list_resource_templates",
+                "list_prompts",
+            ):
+                assert await getattr(client, method)() == []
+                assert not pool.active
+        finally:
+            await pool.stop()
+
+    @pytest.mark.asyncio
+    async def test_idle_server_is_stopped_and_restarted_on_demand(self):
+        pool = in_memory_pool(
+            "github",
+            catalogue=ToolCatalogue(),
+            health_check_interval=0.05,
+            idle_timeout=0.1,
+        )
+        client = PooledClient(pool)
+        try:
+            await client.list_tools()
+            await asyncio.sleep(0.3)
+
+            assert not pool.active
+            assert pool.stats()["idle_shutdowns"] == 1
+            assert [tool.name for tool in await client.list_tools()] == ["whoami"]
+            assert await client.list_prompts() == []
+            assert not pool.active
+
+            result = await client.call_tool_mcp("whoami", {})
+            assert result.content[0].text == "github"
+            assert pool.active
+        finally:
+            await pool.stop()
+
+
+class TestToolCatalogue:
+    @pytest.mark.asyncio
+    async def test_catalogue_persists_and_is_invalidated_by_config_change(
+        self, tmp_path
+    ):
+        path = tmp_path / "catalogue.json"
+        pool = in_memory_pool("github", catalogue=ToolCatalogue(path), fingerprint="v1")
+        try:
+            await pool.list_tools()
+        finally:
+            await pool.stop()
+
+        reloaded = ToolCatalogue(path)
+        assert [tool.name for tool in reloaded.get("github", "v1")] == ["whoami"]
+        assert reloaded.get("github", "v2") is None
+        assert reloaded.get("slack", "v1") is None
+
+    def test_unreadable_catalogue_starts_empty(self, tmp_path):
+        path = tmp_path / "catalogue.json"
+        path.write_text("{not json")
+
+        assert ToolCatalogue(path).get("github", "") is None
+
+
+class TestDiscoveryCache:
+    @pytest.mark.asyncio
+    async def test_listings_are_served_from_memory(self):
+        pool = in_memory_pool("github")
+        try:
+            for _ in range(3):
+                await pool.list("list_tools")
+
+            stats = pool.stats()
+            assert stats["listing_misses"] == 1
+            assert stats["listing_hits"] == 2
+        finally:
+            await pool.stop()
+
+    @pytest.mark.asyncio
+    async def test_list_changed_notification_refreshes_listing(self):
+        server = make_upstream("github")
+
+        @server.tool
+        async def install_plugin(ctx: Context) -> str:
+            server.add_tool(Tool.from_function(lambda: "hi", name="plugin_tool"))
+            await ctx.send_tool_list_changed()
+            return "installed"
+
+        pool = UpstreamPool("github", lambda: FastMCPTransport(server))
+        changed = []
+        pool.listeners.append(lambda *methods: changed.extend(methods))
+        try:
+            before = {tool.name for tool in await pool.list("list_tools")}
+            changed.clear()
+            async with pool.session() as client:
+                await client.call_tool("install_plugin", {})
+            after = {tool.name for tool in await pool.list("list_tools")}
+
+            assert "plugin_tool" not in before
+            assert "plugin_tool" in after
+            assert set(changed) == {"list_tools"}
+        finally:
+            await pool.stop()
+
+    @pytest.mark.asyncio
+    async def test_zero_ttl_disables_caching(self):
+        pool = in_memory_pool("github", discovery_ttl=0)
+        try:
+            await pool.list("list_tools")
+            await pool.list("list_tools")
+
+            assert pool.stats()["listing_misses"] == 2
+        finally:
+            await pool.stop()
+
+
+def mounted_upstreams(*names: str) -> UpstreamManager:
+    """Several servers with the same tools, mounted under their name prefixes."""
+    return UpstreamManager({name: in_memory_pool(name) for name in names})
+
+
+class TestMountedServers:
+    @pytest.mark.asyncio
+    async def test_policy_hides_and_blocks_the_prefixed_tool_name(self):
+        upstreams = mounted_upstreams("alpha", "beta")
+        policy = Policy(
+            name="No alpha",
+            rules=[
+                rule("No alpha whoami")
+                .when(call.name == "alpha_whoami")
+                .block("Not on alpha"),
+                # Clients never call the bare name, so this blocks nothing
+                rule("No bare whoami").when(call.name == "whoami").block("Never"),
+            ],
+        )
+        proxy = create_guarded_proxy({}, policy=policy, upstreams=upstreams)
+        try:
+            async with Client(proxy) as client:
+                listed = {tool.name for tool in await client.list_tools()}
+                with pytest.raises(ToolError, match="Not on alpha"):
+                    await client.call_tool("alpha_whoami", {})
+                result = await client.call_tool("beta_whoami", {})
+
+            assert listed == {"beta_whoami"}
+            assert result[0].text == "beta"
+        finally:
+            await upstreams.stop()
+
+    @pytest.mark.asyncio
+    async def test_arguments_are_validated_against_each_servers_schema(self):
+        alpha, beta = FastMCP("alpha"), FastMCP("beta")
+
+        @alpha.tool
+        def add(a: int, b: int) -> int:
+            return a + b
+
+        @beta.tool(name="add")
+        def concatenate(a: str, b: str) -> str:
+            return a + b
+
+        upstreams = UpstreamManager(
+            {
+                "alpha": UpstreamPool("alpha", lambda: FastMCPTransport(alpha)),
+                "beta": UpstreamPool("beta", lambda: FastMCPTransport(beta)),
+            }
+        )
+        proxy = create_guarded_proxy({}, upstreams=upstreams)
+        try:
+            async with Client(proxy) as client:
+                await client.list_tools()
+                with pytest.raises(ToolError, match="Invalid arguments"):
+                    await client.call_tool("alpha_add", {"a": "x", "b": 1})
+                result = await client.call_tool("beta_add", {"a": "x", "b": "y"})
+
+            assert result[0].text == "xy"
+        finally:
+            await upstreams.stop()
+
+    @pytest.mark.asyncio
+    async def test_only_free_text_fields_of_prefixed_tools_are_scanned(self):
+        servers = {name: FastMCP(name) for name in ("alpha", "beta")}
+        for server in servers.values():
+
+            @server.tool
+            def comment(issue_id: str, body: str) -> str:
+                return "ok"
+
+        scanned = []
+        policy = Policy(
+            name="Record scans",
+            rules=[
+                rule("Record text leaves")
+                .when(
+                    custom(
+                        lambda call, history: (
+                            scanned.append([leaf.path for leaf in call.text_leaves])
+                            or False
+                        )
+                    )
+                )
+                .block("Never"),
+            ],
+        )
+        upstreams = UpstreamManager(
+            {
+                name: UpstreamPool(name, lambda s=server: FastMCPTransport(s))
+                for name, server in servers.items()
+            }
+        )
+        proxy = create_guarded_proxy({}, policy=policy, upstreams=upstreams)
+        try:
+            async with Client(proxy) as client:
+                await client.list_tools()
+                await client.call_tool(
+                    "alpha_comment", {"issue_id": "ENG-1", "body": "Looks good"}
+                )
+
+            assert scanned == [["body"]]
+        finally:
+            await upstreams.stop()
+
+    @pytest.mark.asyncio
+    async def test_read_only_tools_of_cached_servers_are_cached(self):
+        executions = {"alpha": 0, "beta": 0}
+
+        def make_reader(name: str) -> FastMCP:
+            server = FastMCP(name)
+
+            @server.tool(annotations={"readOnlyHint": True})
+            def get(key: str) -> str:
+                executions[name] += 1
+                return key
+
+            return server
+
+        servers = {name: make_reader(name) for name in executions}
+
+        cache = ResponseCache(servers={"alpha": 60})
+        upstreams = UpstreamManager(
+            {
+                name: UpstreamPool(name, lambda s=server: FastMCPTransport(s))
+                for name, server in servers.items()
+            }
+        )
+        proxy = create_guarded_proxy({}, response_cache=cache, upstreams=upstreams)
+        try:
+            async with Client(proxy) as client:
+                await client.list_tools()
+                for _ in range(3):
+                    await client.call_tool("alpha_get", {"key": "a"})
+                    await client.call_tool("beta_get", {"key": "b"})
+
+            assert executions == {"alpha": 1, "beta": 3}
+            # Uncached reads on beta did not drop alpha's entry
+            assert cache.invalidations == 0
+        finally:
+            await upstreams.stop()
+
+    @pytest.mark.asyncio
+    async def test_identical_calls_to_prefixed_idempotent_tools_are_coalesced(self):
+        executions = []
+        servers = {name: make_upstream(name) for name in ("alpha", "beta")}
+
+        @servers["alpha"].tool(annotations={"idempotentHint": True})
+        async def search(query: str) -> str:
+            executions.append(query)
+            await asyncio.sleep(0.1)
+            return query
+
+        upstreams = UpstreamManager(
+            {
+                name: UpstreamPool(name, lambda s=server: FastMCPTransport(s))
+                for name, server in servers.items()
+            }
+        )
+        proxy = create_guarded_proxy({}, upstreams=upstreams)
+        try:
+            async with Client(proxy) as client:
+                await client.list_tools()
+                results = await asyncio.gather(
+                    *(
+                        client.call_tool("alpha_search", {"query": "q"})
+                        for _ in range(3)
+                    )
+                )
+
+            assert [result[0].text for result in results] == ["q"] * 3
+            assert executions == ["q"]
+        finally:
+            await upstreams.stop()
@@ -0,0 +1,90 @@
+import httpx
+import pytest
+
+from tramlines.workers import MCP_SESSION_HEADER, SessionAffinityRouter
+
+WORKERS = ["http://w0", "http://w1", "http://w2"]
+
+
+def make_router(seen: list[str]) -> SessionAffinityRouter:
+    """Router whose workers hand out a new session ID to every initialize."""
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        worker = request.url.host
+        seen.append(worker)
+        session_id = request.headers.get(MCP_SESSION_HEADER)
+        if session_id is None:
+            session_id = f"{worker}-session-{len(seen)}"
+        # An unread stream, as a real worker connection would deliver
+        body = httpx.ByteStream(worker.encode())
+        return httpx.Response(
+            200, headers={MCP_SESSION_HEADER: session_id}, stream=body
+        )
+
+    client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    return SessionAffinityRouter(WORKERS, client=client)
+
+
+@pytest.fixture
+def seen() -> list[str]:
+    return []
+
+
+@pytest.fixture
+def router_client(seen):
+    router = make_router(seen)
+    client = httpx.AsyncClient(
+        transport=httpx.ASGITransport(app=router.app), base_url="http://gateway"
+    )
+    return router, client
+
+
+class TestSessionAffinityRouter:
+    @pytest.mark.asyncio
+    async def test_new_sessions_spread_round_robin(self, router_client, seen):
+        _, client = router_client
+        for _ in range(3):
+            await client.post("/mcp/", content=b"{}")
+
+        assert seen == ["w0", "w1", "w2"]
+
+    @pytest.mark.asyncio
+    async def test_session_requests_stay_on_owning_worker(self, router_client, seen):
+        _, client = router_client
+        first = await client.post("/mcp/", content=b"{}")
+        await client.post("/mcp/", content=b"{}")
+        session_id = first.headers[MCP_SESSION_HEADER]
+
+        for _ in range(4):
+            response = await client.post(
+                "/mcp/", content=b"{}", headers={MCP_SESSION_HEADER: session_id}
+            )
+            assert response.text == "w0"
+
+    @pytest.mark.asyncio
+    async def test_delete_forgets_session(self, router_client):
+        router, client = router_client
+        first = await client.post("/mcp/", content=b"{}")
+        session_id = first.headers[MCP_SESSION_HEADER]
+
+        await client.delete("/mcp/", headers={MCP_SESSION_HEADER: session_id})
+
+        assert session_id not in router._sessions
+
+    def test_unknown_session_uses_stable_hash(self, seen):
+        router = make_router(seen)
+        picks = {router.pick_worker("restarted-session") for _ in range(5)}
+
+        assert len(picks) == 1
+
+    def test_tracked_sessions_are_bounded(self, seen):
+        router = make_router(seen)
+        router.max_tracked_sessions = 2
+        for i in range(3):
+            router._remember(f"s{i}", i)
+
+        assert list(router._sessions) == ["s1", "s2"]
+
+    def test_requires_workers(self):
+        with pytest.raises(ValueError):
+            SessionAffinityRouter([])